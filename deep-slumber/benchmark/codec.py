@@ -0,0 +1,86 @@
+"""
+Codec micro-benchmark.
+
+Compares bytes and microseconds per event of the JSON and binary codecs,
+for single event frames and for batches.
+
+Usage (from the ``deep-slumber`` directory)::
+
+    python -m benchmark.codec [--events 10000] [--batch-size 256]
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import argparse
+import random
+import timeit
+
+from outpost.codec import BINARY_CODEC, JSON_CODEC
+from outpost.enum import EventType
+from outpost.message import Event, EventBatch
+
+
+HWID = '7c222fb2927d828af22f592134e89324'
+
+
+def create_events(count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    event_types = (EventType.MOVEMENT, EventType.TEMPERATURE, EventType.HUMIDITY, EventType.PRESSURE)
+    events = []
+    for _ in range(count):
+        event = Event(rnd.choice(event_types), value=round(rnd.uniform(0, 1000), 2))
+        event.hwid = HWID
+        events.append(event)
+    return events
+
+
+def measure(fn, count: int, repeat: int = 5) -> float:
+    """
+    :return: {float} Best time per event in microseconds.
+    """
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) / count * 1e6
+
+
+def run(count: int, batch_size: int) -> list:
+    """
+    :return: {list} Rows of (name, bytes per event, µs per event to encode, µs per event to decode).
+    """
+    events = create_events(count)
+    batches = [EventBatch(hwid=HWID, events=events[i:i + batch_size]) for i in range(0, count, batch_size)]
+    rows = []
+
+    for codec in (JSON_CODEC, BINARY_CODEC):
+        frames = [codec.encode(event) for event in events]
+        rows.append((
+            '{} event'.format(codec.name),
+            sum(len(frame) for frame in frames) / count,
+            measure(lambda: [codec.encode(event) for event in events], count),
+            measure(lambda: [codec.decode(frame) for frame in frames], count),
+        ))
+
+        frames = [codec.encode(batch) for batch in batches]
+        rows.append((
+            '{} batch'.format(codec.name),
+            sum(len(frame) for frame in frames) / count,
+            measure(lambda: [codec.encode(batch) for batch in batches], count),
+            measure(lambda: [codec.decode(frame) for frame in frames], count),
+        ))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the JSON and binary event codecs.')
+    parser.add_argument('--events', type=int, default=10000, help='Number of events')
+    parser.add_argument('--batch-size', type=int, default=256, help='Number of events per batch')
+    args = parser.parse_args()
+
+    print('{:<14} {:>12} {:>14} {:>14}'.format('codec', 'bytes/event', 'encode µs/ev', 'decode µs/ev'))
+    for name, size, encode, decode in run(args.events, args.batch_size):
+        print('{:<14} {:>12.1f} {:>14.2f} {:>14.2f}'.format(name, size, encode, decode))
+
+
+if __name__ == '__main__':
+    main()
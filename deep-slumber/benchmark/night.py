@@ -0,0 +1,201 @@
+"""
+Night benchmark.
+
+Drives a whole simulated night through Orchestra -> Logger -> Outpost and
+reports throughput, CPU time and peak memory.
+
+Usage (from the ``deep-slumber`` directory)::
+
+    python -m benchmark.night [--trace record.csv] [--hours 8] [--seed 0]
+                              [--batch-size 256 --batch-latency 1.0 [--compression zlib]] [--codec binary]
+                              [--spool] [--legacy-movements]
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import argparse
+import asyncio
+import json
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import websockets
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.interfaces import LogConsumer
+from logger.enum import BackpressurePolicy
+from logger.logger import Logger
+from orchestra.orchestra import Orchestra
+from outpost.codec import BINARY_CODEC, CODECS
+from outpost.enum import MessageType
+from outpost.message import Event, EventBatch, HelloMessage
+from outpost.outpost import Outpost
+from outpost.spool import EventSpool
+
+
+class CountingConsumer(LogConsumer):
+    """
+    Counts logged events.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def consume_log_message(self, msg):
+        self.count += 1
+
+
+class Measurement:
+    """
+    Wall time, CPU time and peak memory of a benchmark phase.
+    """
+
+    def __enter__(self):
+        tracemalloc.start()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *args):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def run_night(trace: SensorTrace, outpost_options: dict = None, codec: str = None, uplink_timeout: float = 300.0) -> dict:
+    """
+    Simulate a night and upload all resulting events to a local stand-in server.
+    :param trace: {SensorTrace} Sensor trace to replay.
+    :param outpost_options: {dict} Keyword arguments for the Outpost, e.g. batching options.
+    :param codec: {str} Codec the stand-in server selects for events. JSON if omitted.
+    :param uplink_timeout: {float} Maximum time in seconds for the upload phase.
+    :return: {dict} Benchmark results.
+    """
+    loop = asyncio.get_event_loop()
+    frames = {'count': 0, 'bytes': 0, 'events': 0, 'expected': 0}
+    counter = CountingConsumer()
+    outpost = None
+
+    async def on_connection(websocket, *args):
+        async for frame in websocket:
+            frames['count'] += 1
+            frames['bytes'] += len(frame)
+            msg = BINARY_CODEC.decode(frame)
+            if isinstance(msg, HelloMessage) and codec is not None:
+                await websocket.send(json.dumps({'msgType': MessageType.HELLO.value, 'codec': codec}))
+            elif isinstance(msg, EventBatch):
+                frames['events'] += len(msg)
+            elif isinstance(msg, Event):
+                frames['events'] += 1
+
+            if frames['events'] >= frames['expected']:
+                outpost.stop()
+                await websocket.close()
+
+    async def start_server():
+        return await websockets.serve(on_connection, '127.0.0.1', 0)
+
+    server = loop.run_until_complete(start_server())
+    port = server.sockets[0].getsockname()[1]
+
+    backend = SimulatedBackend(trace)
+    outpost = Outpost(server_address='ws://127.0.0.1:{}'.format(port), **(outpost_options or {}))
+    logger = Logger(consumers=[outpost, counter], policies={
+        outpost: BackpressurePolicy.BLOCK, counter: BackpressurePolicy.BLOCK
+    })
+    orchestra = Orchestra(logger=logger, backend=backend)
+
+    # The sleeper enters the room at the start and leaves it once the trace has ended.
+    night_end = SimulatedBackend.TRACE_START + trace.get_duration()
+    backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, (
+        (0.0, 1), (2.0, 0), (night_end, 1), (night_end + 2.0, 0)
+    ))
+    duration = night_end + 2 * Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT
+
+    with Measurement() as simulation:
+        backend.run(duration)
+        logger.flush()
+
+    # Expanded movement intervals arrive as three events each.
+    frames['expected'] = counter.count
+    if (outpost_options or {}).get('legacy_movements'):
+        frames['expected'] += 2 * orchestra.get_movement_statistics()['intervals']
+
+    loop.call_later(uplink_timeout, outpost.stop)
+    with Measurement() as uplink:
+        outpost.connect()
+
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    logger.close()
+
+    return {
+        'simulated_seconds': duration,
+        'final_state': orchestra.get_state().name,
+        'sensor_jitter': orchestra.get_sensor_jitter(),
+        'movement': orchestra.get_movement_statistics(),
+        'events': counter.count,
+        'frames': frames['count'],
+        'bytes': frames['bytes'],
+        'simulation': simulation,
+        'uplink': uplink,
+        'logger': logger.get_statistics(),
+        'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def print_report(results: dict):
+    total_wall = results['simulation'].wall + results['uplink'].wall
+    print('Simulated time:    {:>12.0f} s'.format(results['simulated_seconds']))
+    print('Final state:       {:>12}'.format(results['final_state']))
+    print('Events:            {:>12}'.format(results['events']))
+    print('Frames / bytes:    {:>12} / {}'.format(results['frames'], results['bytes']))
+    print('Movements:         {:>12} in {} intervals'.format(
+        results['movement']['movements'], results['movement']['intervals']))
+    for name in ('simulation', 'uplink'):
+        phase = results[name]
+        print('{:<10} wall {:>8.3f} s | cpu {:>8.3f} s | peak {:>8.1f} KiB'.format(
+            name, phase.wall, phase.cpu, phase.peak_memory / 1024))
+    print('Events per second: {:>12.0f}'.format(results['events'] / total_wall if total_wall else 0))
+    print('Speed-up:          {:>12.0f} x'.format(results['simulated_seconds'] / total_wall if total_wall else 0))
+    print('Max RSS:           {:>12} KiB'.format(results['max_rss_kib']))
+    for name, counters in sorted(results['logger'].items()):
+        print('Logger {:<16} {}'.format(name, ' | '.join('{} {}'.format(k, v) for k, v in sorted(counters.items()))))
+    for name, jitter in sorted(results['sensor_jitter'].items()):
+        print('Jitter {:<11} mean {:>8.3f} ms | max {:>8.3f} ms | {} polls'.format(
+            name, jitter['mean'] * 1000, jitter['max'] * 1000, jitter['count']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a night and measure the event pipeline.')
+    parser.add_argument('--trace', help='CSV trace recorded with experiments/accelerometer.py')
+    parser.add_argument('--hours', type=float, default=8.0, help='Duration of a synthesized night')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthesized night')
+    parser.add_argument('--batch-size', type=int, default=1, help='Maximum number of events per frame')
+    parser.add_argument('--batch-latency', type=float, default=0.0, help='Maximum batching delay in seconds')
+    parser.add_argument('--compression', choices=('zlib',), help='Compression of batch frames')
+    parser.add_argument('--codec', choices=tuple(CODECS), help='Codec selected by the server')
+    parser.add_argument('--spool', action='store_true', help='Spool events on disk instead of queueing them in memory')
+    parser.add_argument('--legacy-movements', action='store_true',
+                        help='Send movement intervals as three MOVEMENT events, like older versions')
+    args = parser.parse_args()
+
+    trace = SensorTrace.from_csv(args.trace) if args.trace else SensorTrace.synthesize(hours=args.hours, seed=args.seed)
+    with tempfile.TemporaryDirectory() as spool_directory:
+        print_report(run_night(trace, outpost_options={
+            'batch_size': args.batch_size,
+            'batch_latency': args.batch_latency,
+            'compression': args.compression,
+            'spool': EventSpool(spool_directory) if args.spool else None,
+            'legacy_movements': args.legacy_movements,
+        }, codec=args.codec))
+
+
+if __name__ == '__main__':
+    main()
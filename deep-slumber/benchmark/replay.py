@@ -0,0 +1,70 @@
+"""
+State machine replay benchmark.
+
+Records the state machine inputs of a few simulated nights and replays them
+through the transition table at full speed, as a regression test of the
+table would.
+
+Usage (from the ``deep-slumber`` directory)::
+
+    python -m benchmark.replay [--nights 5] [--hours 8] [--replays 1000]
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import argparse
+import time
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.logger import Logger
+from orchestra.enums import OrchestraState
+from orchestra.orchestra import Orchestra
+from orchestra.statemachine import StateMachine
+
+
+def record_night(hours: float, seed: int) -> tuple:
+    """
+    :return: {tuple} Input log and transitions of a simulated night.
+    """
+    backend = SimulatedBackend(SensorTrace.synthesize(hours=hours, seed=seed))
+    logger = Logger(consumers=[])
+    orchestra = Orchestra(logger=logger, backend=backend, record_inputs=True)
+
+    night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+    backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0), (night_end, 1), (night_end + 2.0, 0)))
+    backend.run(night_end + 2 * Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT)
+    logger.close()
+
+    return orchestra.get_input_log(), orchestra.get_transitions(), orchestra.get_transition_latency()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded state machine inputs.')
+    parser.add_argument('--nights', type=int, default=5, help='Number of nights to record')
+    parser.add_argument('--hours', type=float, default=8.0, help='Duration of a night')
+    parser.add_argument('--replays', type=int, default=1000, help='Number of nights to replay')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    nights = [record_night(args.hours, seed) for seed in range(args.nights)]
+    print('Recorded {} nights in {:.2f} s, {} inputs'.format(
+        args.nights, time.perf_counter() - start, sum(len(log) for log, _, _ in nights)))
+
+    start = time.perf_counter()
+    for i in range(args.replays):
+        log, transitions, _ = nights[i % len(nights)]
+        if StateMachine.replay(OrchestraState.IDLE, Orchestra.STATE_TABLE, log) != transitions:
+            raise AssertionError('Replay of night {} diverged'.format(i % len(nights)))
+    duration = time.perf_counter() - start
+    print('Replayed {} nights in {:.3f} s ({:.0f} nights/s)'.format(args.replays, duration, args.replays / duration))
+
+    for name, latency in sorted(nights[0][2].items()):
+        print('Latency {:<28} mean {:>8.1f} µs | max {:>8.1f} µs | {} inputs'.format(
+            name, latency['mean'] * 1e6, latency['max'] * 1e6, latency['count']))
+
+
+if __name__ == '__main__':
+    main()
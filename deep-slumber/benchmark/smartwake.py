@@ -0,0 +1,119 @@
+"""
+Smart wake benchmark.
+
+Records the movement samples of a few simulated nights and replays them
+through every wake estimator. The decision window is the last part of each
+night. The nights go through sleep cycles, and each window opens in a deep
+sleep stretch that light sleep follows before the latest wake time, so an
+estimator waking at once wakes from deep sleep. Reports when each estimator
+starts waking, how often that is in light sleep, by the cycles the night has
+been synthesized with, and what a sample costs.
+
+Usage (from the ``deep-slumber`` directory)::
+
+    python -m benchmark.smartwake [--nights 5] [--hours 8] [--window 60]
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.logger import Logger
+from orchestra.orchestra import Orchestra
+from risenshine.decision import ESTIMATORS, WakeDecisionEngine
+from risenshine.risenshine import RiseNShine
+
+
+# Length of a sleep cycle in seconds and the part of it spent in light sleep
+SLEEP_CYCLE = 90 * 60
+LIGHT_FRACTION = 0.4
+
+
+def record_night(hours: float, window: float, seed: int) -> Tuple[List[Tuple[float, float]], float, float]:
+    """
+    :param window: {float} Seconds from the earliest wake time to the end of the night.
+    :return: {tuple} Movement samples of a simulated night as (time, intensity), the time the night ends and the
+    phase of its sleep cycles.
+    """
+    # The window opens in the first half of a deep sleep stretch.
+    deep = (1 - LIGHT_FRACTION) * SLEEP_CYCLE
+    opens_at = LIGHT_FRACTION * SLEEP_CYCLE + random.Random(seed).uniform(0.0, deep / 2)
+    phase = (opens_at - (hours * 3600 - window)) % SLEEP_CYCLE
+    backend = SimulatedBackend(SensorTrace.synthesize(hours=hours, seed=seed, cycle=SLEEP_CYCLE, phase=phase,
+                                                      light_fraction=LIGHT_FRACTION))
+    logger = Logger(consumers=[])
+    orchestra = Orchestra(logger=logger, backend=backend)
+    samples = []
+    orchestra.add_movement_listener(lambda t, intensity: samples.append((t, intensity)))
+
+    night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+    backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0)))
+    backend.run(night_end)
+    logger.close()
+    return samples, night_end, phase
+
+
+def decide(estimator_name: str, samples: List[Tuple[float, float]], earliest: float, latest_start: float) -> tuple:
+    """
+    Replay a night through an estimator.
+    :return: {tuple} Time waking starts and whether it has been forced.
+    """
+    engine = WakeDecisionEngine(ESTIMATORS[estimator_name](), lambda: None)
+    for t, intensity in samples:
+        if t >= earliest and not engine.is_open() and engine.decided_at is None:
+            engine.open(earliest)
+        if t >= latest_start:
+            break
+        engine.add_sample(t, intensity)
+
+    forced = engine.decided_at is None
+    if forced:
+        engine.force(latest_start)
+    return engine.decided_at, forced
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wake estimators on simulated nights.')
+    parser.add_argument('--nights', type=int, default=5, help='Number of nights')
+    parser.add_argument('--hours', type=float, default=8.0, help='Duration of a night')
+    parser.add_argument('--window', type=float, default=60, help='Minutes from the earliest to the latest wake time')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    nights = [record_night(args.hours, args.window * 60, seed) for seed in range(args.nights)]
+    print('Recorded {} nights in {:.2f} s, {} samples'.format(
+        args.nights, time.perf_counter() - start, sum(len(samples) for samples, _, _ in nights)))
+
+    print('{:<12} {:>14} {:>12} {:>8} {:>14}'.format('Estimator', 'Offset (min)', 'Light sleep', 'Forced', 'Cost/sample'))
+    for name in ESTIMATORS:
+        offsets = []
+        light = forced = 0
+        elapsed = 0.0
+        count = 0
+        for samples, night_end, phase in nights:
+            earliest = night_end - args.window * 60
+            latest_start = night_end - RiseNShine.MIN_WAKE_DURATION_SEC
+
+            started = time.perf_counter()
+            decided_at, was_forced = decide(name, samples, earliest, latest_start)
+            elapsed += time.perf_counter() - started
+            count += len(samples)
+
+            offsets.append((decided_at - earliest) / 60)
+            forced += was_forced
+            light += SensorTrace.is_light_sleep(decided_at - SimulatedBackend.TRACE_START, SLEEP_CYCLE, phase,
+                                                LIGHT_FRACTION)
+
+        print('{:<12} {:>14.1f} {:>11.0f}% {:>8} {:>11.2f} µs'.format(
+            name, sum(offsets) / len(offsets), 100.0 * light / len(nights), forced, elapsed / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,25 +10,46 @@ __author__ = 'Samuel Blattner'
 __version__ = '1.0.0'
 
 
+import os
+
+from logger.enum import BackpressurePolicy
 from logger.logger import Logger
+from logger.store import EventStore
 from orchestra.orchestra import Orchestra
 from outpost.outpost import Outpost
+from outpost.resync import ResyncListener
+from outpost.spool import EventSpool
 from risenshine.risenshine import RiseNShine
 
 
-# 1. Create Outpost for server communicatino
-outpost = Outpost()
+SPOOL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool')
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.db')
+
+
+# 1. Create Outpost for server communicatino.
+# Events are spooled on disk until they are sent, so they survive
+# connection losses and reboots.
+outpost = Outpost(spool=EventSpool(SPOOL_DIRECTORY))
 
 # 2. Create logger for logging
-logger = Logger(consumers=[outpost])
+# Sensor threads hand events off without waiting. The outpost must not lose
+# events, so the dispatcher waits for it a short while and then spills its
+# events rather than dropping any.
+# All events are also kept in a local store for queries and resyncs.
+store = EventStore(STORE_PATH)
+logger = Logger(consumers=[outpost, store], policies={outpost: BackpressurePolicy.BLOCK})
+# The server asks for a resync after it has lost data, which is resent from the store.
+outpost.register_listener(ResyncListener(outpost, store.replay), [MessageType.COMMAND])
 
 # 3. Create orchestra for sensor/actuator management
+# Settings pushed by the server retune it while running, commands stop the recording.
 orchestra = Orchestra(logger=logger)
+outpost.register_listener(orchestra, [MessageType.SETTINGS, MessageType.COMMAND])
 
 # 4. Create RiseNShine for waking procedures
 # and sign up as listener to incoming messages from server
 risenshine = RiseNShine(orchestra=orchestra, logger=logger)
-outpost.register_listener(risenshine, [MessageType.SETTINGS])
+outpost.register_listener(risenshine, [MessageType.SETTINGS, MessageType.COMMAND])
 
 # Once all the setup is done we can start the
 # message loop. This loop is blocking and will run forever.
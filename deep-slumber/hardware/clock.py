@@ -0,0 +1,209 @@
+"""
+Clock module.
+
+Time source for all time-dependent routines. The system clock is used on the
+device, the virtual clock lets simulations run a whole night in a fraction
+of the real time.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from datetime import datetime, timedelta
+import heapq
+import threading
+import time
+
+from hardware.timers import TimerThread
+
+
+class SimulationEnd(Exception):
+    """
+    Raised by the virtual clock when time is advanced beyond its limit.
+    """
+    pass
+
+
+class SystemClock:
+    """
+    Clock backed by the operating system.
+    All callbacks are called from one single timer thread.
+    """
+
+    __timer_thread: TimerThread = None
+    __timer_lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def monotonic_ns(self) -> int:
+        return time.monotonic_ns()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time_ns(self) -> int:
+        """
+        :return: {int} Wall-clock time in ns since the epoch.
+        """
+        return time.time_ns()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: float = None) -> bool:
+        """
+        Wait for ``event`` to be set, at most ``timeout`` seconds.
+        :param event: {threading.Event} Event to wait for.
+        :param timeout: {float} Maximum waiting time in seconds.
+        :return: {bool} True if the event has been set.
+        """
+        return event.wait(timeout)
+
+    def call_later(self, delay: float, callback):
+        """
+        Call ``callback`` after ``delay`` seconds.
+        :param delay: {float} Delay in seconds.
+        :param callback: {callable} Function to be called.
+        :return: Handle providing a ``cancel()`` method.
+        """
+        with self.__timer_lock:
+            if self.__timer_thread is None:
+                self.__timer_thread = TimerThread()
+        return self.__timer_thread.call_later(delay, callback)
+
+
+class VirtualTimer:
+    """
+    Handle for a callback scheduled on a virtual clock.
+    """
+
+    def __init__(self, due: float, callback):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Deterministic clock whose time only moves when it is advanced.
+    Sleeping advances the time instantly and fires all callbacks that become due
+    on the way, in order and on the sleeping thread. Simulations therefore must
+    advance the clock from one single thread.
+    """
+
+    __start: datetime = None
+    __time = 0.0
+    __limit: float = None
+    __timers: list = None
+    __sequence = 0
+    __lock: threading.Lock = None
+
+    def __init__(self, start: datetime = None, limit: float = None):
+        self.__start = start if start is not None else datetime(2019, 1, 1, 22, 0)
+        self.__time = 0.0
+        self.__limit = limit
+        self.__timers = []
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+
+    def set_limit(self, limit: float):
+        """
+        Set the time after which advancing raises ``SimulationEnd``.
+        :param limit: {float} Limit in seconds since start of the clock.
+        """
+        self.__limit = limit
+
+    def monotonic(self) -> float:
+        return self.__time
+
+    def monotonic_ns(self) -> int:
+        return int(round(self.__time * 1e9))
+
+    def now(self) -> datetime:
+        return self.__start + timedelta(seconds=self.__time)
+
+    def time_ns(self) -> int:
+        return int(round(self.now().timestamp() * 1e9))
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: float = None) -> bool:
+        """
+        Advance the clock until ``event`` is set by a callback, at most ``timeout`` seconds.
+        Without timeout, the clock is advanced from callback to callback, up to its limit.
+        """
+        if event.is_set():
+            return True
+        if timeout is not None:
+            deadline = self.__time + max(timeout, 0.0)
+            while not event.is_set():
+                next_due = self.next_due()
+                if next_due is None or next_due > deadline:
+                    self.advance_to(deadline)
+                    break
+                self.advance_to(next_due)
+            return event.is_set()
+
+        while not event.is_set():
+            next_due = self.next_due()
+            if next_due is not None:
+                self.advance_to(next_due)
+            elif self.__limit is not None:
+                self.advance_to(self.__limit)
+                if not event.is_set():
+                    raise SimulationEnd()
+            else:
+                return event.wait()
+        return True
+
+    def call_later(self, delay: float, callback) -> VirtualTimer:
+        with self.__lock:
+            timer = VirtualTimer(self.__time + max(delay, 0.0), callback)
+            self.__sequence += 1
+            heapq.heappush(self.__timers, (timer.due, self.__sequence, timer))
+        return timer
+
+    def next_due(self):
+        """
+        :return: {float} Time of the next pending callback or None.
+        """
+        with self.__lock:
+            while self.__timers and self.__timers[0][2].cancelled:
+                heapq.heappop(self.__timers)
+            return self.__timers[0][0] if self.__timers else None
+
+    def advance(self, seconds: float):
+        """
+        Advance the clock by ``seconds``, firing due callbacks on the way.
+        :param seconds: {float} Time to advance in seconds.
+        """
+        self.advance_to(self.__time + max(seconds, 0.0))
+
+    def advance_to(self, target: float):
+        """
+        Advance the clock to ``target``, firing due callbacks on the way.
+        :param target: {float} Target time in seconds since start of the clock.
+        """
+        limited = self.__limit is not None and target > self.__limit
+        if limited:
+            target = self.__limit
+
+        while True:
+            with self.__lock:
+                if not self.__timers or self.__timers[0][0] > target:
+                    self.__time = max(self.__time, target)
+                    break
+                due, _, timer = heapq.heappop(self.__timers)
+                if timer.cancelled:
+                    continue
+                self.__time = max(self.__time, due)
+            timer.callback()
+
+        if limited:
+            raise SimulationEnd()
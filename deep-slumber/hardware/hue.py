@@ -0,0 +1,175 @@
+"""
+Hue module.
+
+Minimal client for the REST API of a Philips Hue bridge. All requests go over
+one persistent HTTP connection, which is reopened if the bridge closed it.
+Also contains a local stand-in for the bridge to test against.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import List, Tuple
+
+from hardware.interfaces import LightBridgeBackend
+
+
+class BridgeError(Exception):
+    """
+    Raised if the bridge cannot be reached or rejects a command.
+    """
+    pass
+
+
+class HueBridge(LightBridgeBackend):
+
+    __address: str = None
+    __port = 80
+    __username: str = None
+    __timeout = 2.0
+    __connection: http.client.HTTPConnection = None
+    __lock: threading.Lock = None
+
+    # Number of connections opened
+    connections = 0
+
+    def __init__(self, address: str, username: str, port: int = 80, timeout: float = 2.0):
+        """
+        :param address: {str} Host name or IP address of the bridge.
+        :param username: {str} User name the bridge has issued to this device.
+        :param port: {int} HTTP port of the bridge.
+        :param timeout: {float} Timeout of connecting and of every request in seconds.
+        """
+        self.__address = address
+        self.__username = username
+        self.__port = port
+        self.__timeout = timeout
+        self.__lock = threading.Lock()
+        self.connections = 0
+
+    def set_group(self, group_id, parameter, value=None, transitiontime=None):
+        """
+        Set the state of all lights of a group, like ``phue.Bridge.set_group()``.
+        :param group_id: {int} Group ID.
+        :param parameter: {dict|str} State to set or name of a single state attribute.
+        :param value: {object} Value of the attribute if ``parameter`` is a name.
+        :param transitiontime: {float} Duration of the transition in tenths of a second.
+        :return: {list} Response of the bridge.
+        """
+        data = dict(parameter) if isinstance(parameter, dict) else {parameter: value}
+        if transitiontime is not None:
+            data['transitiontime'] = int(round(transitiontime))
+        return self.request('PUT', '/api/{}/groups/{}/action'.format(self.__username, group_id), data)
+
+    def request(self, method: str, path: str, data=None):
+        """
+        Send a request to the bridge.
+        :param method: {str} HTTP method.
+        :param path: {str} Path of the resource.
+        :param data: {object} Body to be sent as JSON.
+        :return: {object} Decoded response.
+        """
+        body = json.dumps(data) if data is not None else None
+        with self.__lock:
+            # A kept-alive connection may have been closed by the bridge in the meantime,
+            # in which case the request is repeated once on a new connection.
+            # All requests sent are idempotent.
+            for retry in (False, True):
+                reused = self.__connection is not None
+                if not reused:
+                    self.__connection = http.client.HTTPConnection(self.__address, self.__port, timeout=self.__timeout)
+                    self.connections += 1
+                try:
+                    self.__connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                    response = self.__connection.getresponse()
+                    raw = response.read()
+                    break
+                except (http.client.HTTPException, OSError) as e:
+                    self.close_connection()
+                    if retry or not reused:
+                        raise BridgeError('Bridge not reachable: {}'.format(e)) from e
+
+        if response.status != 200:
+            raise BridgeError('Bridge responded with status {}'.format(response.status))
+        try:
+            result = json.loads(raw.decode('utf-8'))
+        except ValueError as e:
+            raise BridgeError('Invalid response from bridge') from e
+        if isinstance(result, list):
+            for entry in result:
+                if isinstance(entry, dict) and 'error' in entry:
+                    raise BridgeError(entry['error'].get('description', 'Unknown error'))
+        return result
+
+    def close_connection(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+
+class StandInBridge:
+    """
+    Local HTTP server answering group actions like a Hue bridge. Records all
+    commands and the connections they arrived on. Responses can be delayed to
+    simulate a slow bridge, and connections closed after every response.
+    """
+
+    __server: ThreadingHTTPServer = None
+    __thread: threading.Thread = None
+
+    def __init__(self, delay: float = 0.0):
+        """
+        :param delay: {float} Time in seconds to wait before responding.
+        """
+        self.delay = delay
+        self.commands: List[Tuple[float, int, dict]] = []
+        self.connections = set()
+        self.fail = False
+        self.keep_alive = True
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_PUT(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+                if stand_in.delay:
+                    time.sleep(stand_in.delay)
+                parts = self.path.strip('/').split('/')
+                if stand_in.fail:
+                    response = [{'error': {'type': 901, 'address': self.path, 'description': 'Internal error'}}]
+                elif len(parts) == 5 and parts[2] == 'groups' and parts[4] == 'action':
+                    stand_in.connections.add(self.client_address)
+                    stand_in.commands.append((time.monotonic(), int(parts[3]), body))
+                    response = [{'success': {'/groups/{}/action/{}'.format(parts[3], key): value}}
+                                for key, value in body.items()]
+                else:
+                    response = [{'error': {'type': 3, 'address': self.path, 'description': 'resource not available'}}]
+                raw = json.dumps(response).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                self.close_connection = not stand_in.keep_alive
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='StandInBridge', daemon=True)
+        self.__thread.start()
+
+    def get_port(self) -> int:
+        return self.__server.server_address[1]
+
+    def close(self):
+        self.__server.shutdown()
+        self.__server.server_close()
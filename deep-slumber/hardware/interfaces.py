@@ -0,0 +1,116 @@
+"""
+Hardware interfaces module.
+
+Describes the device APIs the rest of the system relies on. The real
+Raspberry Pi drivers (``RPi.GPIO``, ``sense_hat``, ``phue``) already provide
+these methods, simulated backends implement them on top of recorded traces.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from abc import ABCMeta, abstractmethod
+
+
+class GPIOBackend:
+    """
+    Subset of the ``RPi.GPIO`` module API used by the system.
+    Constants carry the same values as in ``RPi.GPIO``.
+    """
+
+    __metaclass__ = ABCMeta
+
+    BCM = 11
+    IN = 1
+    OUT = 0
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    @abstractmethod
+    def setmode(self, mode):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def setup(self, pin, direction):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def input(self, pin) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def cleanup(self):
+        raise NotImplementedError()
+
+
+class SenseHatBackend:
+    """
+    Subset of the ``sense_hat.SenseHat`` API used by the system.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get_temperature(self) -> float:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_pressure(self) -> float:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_humidity(self) -> float:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_gyroscope_raw(self) -> dict:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_accelerometer_raw(self) -> dict:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set_imu_config(self, compass_enabled, gyro_enabled, accel_enabled):
+        raise NotImplementedError()
+
+
+class LightBridgeBackend:
+    """
+    Subset of the ``phue.Bridge`` API used by the system.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def set_group(self, group_id, parameter, value=None, transitiontime=None):
+        raise NotImplementedError()
+
+
+class DeviceBackend:
+    """
+    A DeviceBackend bundles all devices and the clock the system runs on.
+    """
+
+    __metaclass__ = ABCMeta
+
+    clock = None
+    gpio: GPIOBackend = None
+
+    @abstractmethod
+    def create_sensehat(self) -> SenseHatBackend:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def create_bridge(self) -> LightBridgeBackend:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def create_executor(self):
+        raise NotImplementedError()
@@ -0,0 +1,56 @@
+"""
+Raspberry Pi backend module.
+
+Provides the real device drivers. The driver packages are only imported when
+the backend is instantiated, so the rest of the system can be imported on any
+machine.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from concurrent.futures import ThreadPoolExecutor
+
+from hardware.clock import SystemClock
+from hardware.hue import HueBridge
+from hardware.interfaces import DeviceBackend
+
+
+class RaspberryPiBackend(DeviceBackend):
+    """
+    Backend using ``RPi.GPIO``, ``sense_hat`` and the Hue bridge's REST API.
+    """
+
+    __bridge_address: str = None
+    __bridge_username: str = None
+
+    def __init__(self, bridge_address: str = None, bridge_username: str = None):
+        """
+        :param bridge_address: {str} IP address of the Philips Hue bridge. No bridge is used if omitted.
+        :param bridge_username: {str} User name issued by the bridge. If omitted, it is obtained with ``phue``,
+        which registers with the bridge on first use.
+        """
+        from RPi import GPIO
+
+        self.clock = SystemClock()
+        self.gpio = GPIO
+        self.__bridge_address = bridge_address
+        self.__bridge_username = bridge_username
+
+    def create_sensehat(self):
+        from sense_hat import SenseHat
+        return SenseHat()
+
+    def create_bridge(self):
+        if self.__bridge_address is None:
+            return None
+
+        username = self.__bridge_username
+        if username is None:
+            from phue import Bridge
+            username = Bridge(self.__bridge_address).username
+        return HueBridge(self.__bridge_address, username)
+
+    def create_executor(self):
+        return ThreadPoolExecutor()
@@ -0,0 +1,213 @@
+"""
+Simulated backend module.
+
+Deterministic stand-ins for GPIO, Sense Hat and Hue bridge. All devices run on
+a virtual clock and replay a sensor trace, which allows whole nights to be
+simulated faster than real time.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Dict, List, Tuple
+
+from hardware.clock import SimulationEnd, VirtualClock
+from hardware.interfaces import DeviceBackend, GPIOBackend, LightBridgeBackend, SenseHatBackend
+from hardware.trace import SensorTrace
+
+
+class SimulatedGPIO(GPIOBackend):
+    """
+    GPIO whose input levels are driven by scheduled edges.
+    """
+
+    __clock: VirtualClock = None
+    __levels: Dict[int, int] = None
+    __callbacks: Dict[int, List[Tuple[int, object]]] = None
+
+    def __init__(self, clock: VirtualClock):
+        self.__clock = clock
+        self.__levels = {}
+        self.__callbacks = {}
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, direction):
+        self.__levels.setdefault(pin, 0)
+
+    def input(self, pin) -> int:
+        return self.__levels.get(pin, 0)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.__callbacks.setdefault(pin, []).append((edge, callback))
+
+    def cleanup(self):
+        self.__callbacks.clear()
+
+    def set_input(self, pin, level: int):
+        """
+        Set the level of an input pin and notify interrupt callbacks.
+        :param pin: {int} BCM pin number.
+        :param level: {int} New level, 0 or 1.
+        """
+        if self.__levels.get(pin, 0) == level:
+            return
+        self.__levels[pin] = level
+        edge = self.RISING if level else self.FALLING
+        for detect_edge, callback in list(self.__callbacks.get(pin, ())):
+            if callback is not None and detect_edge in (edge, self.BOTH):
+                callback(pin)
+
+    def schedule_edges(self, pin, edges: List[Tuple[float, int]]):
+        """
+        Schedule level changes on the virtual clock.
+        :param pin: {int} BCM pin number.
+        :param edges: {List[Tuple[float, int]]} Pairs of (offset in seconds, level).
+        """
+        for offset, level in edges:
+            self.__clock.call_later(offset, lambda level=level: self.set_input(pin, level))
+
+
+class SimulatedSenseHat(SenseHatBackend):
+    """
+    Sense Hat replaying a sensor trace relative to the virtual clock.
+    """
+
+    __clock: VirtualClock = None
+    __trace: SensorTrace = None
+    __trace_start = 0.0
+
+    # IMU sensors enabled (compass, gyroscope, accelerometer)
+    imu_config = (True, True, True)
+
+    def __init__(self, clock: VirtualClock, trace: SensorTrace, trace_start: float = 0.0):
+        self.__clock = clock
+        self.__trace = trace
+        self.__trace_start = trace_start
+        self.imu_config = (True, True, True)
+
+    def __sample(self):
+        return self.__trace.sample_at(self.__clock.monotonic() - self.__trace_start)
+
+    def get_temperature(self) -> float:
+        return self.__sample().temperature
+
+    def get_pressure(self) -> float:
+        return self.__sample().pressure
+
+    def get_humidity(self) -> float:
+        return self.__sample().humidity
+
+    def get_gyroscope_raw(self) -> dict:
+        x, y, z = self.__sample().gyro
+        return {'x': x, 'y': y, 'z': z}
+
+    def get_accelerometer_raw(self) -> dict:
+        x, y, z = self.__sample().accel
+        return {'x': x, 'y': y, 'z': z}
+
+    def set_imu_config(self, compass_enabled, gyro_enabled, accel_enabled):
+        self.imu_config = (compass_enabled, gyro_enabled, accel_enabled)
+
+
+class SimulatedBridge(LightBridgeBackend):
+    """
+    Hue bridge recording all commands it receives.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def set_group(self, group_id, parameter, value=None, transitiontime=None):
+        self.commands.append((group_id, parameter, value, transitiontime))
+
+
+class SimulationExecutor(Executor):
+    """
+    Executor that defers submitted jobs until the simulation runs them
+    on its own thread.
+    """
+
+    def __init__(self):
+        self.__jobs = deque()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        self.__jobs.append((future, fn, args, kwargs))
+        return future
+
+    def run_pending(self) -> bool:
+        """
+        Run the oldest pending job.
+        :return: {bool} True if a job has been run.
+        """
+        if not self.__jobs:
+            return False
+
+        future, fn, args, kwargs = self.__jobs.popleft()
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        return True
+
+
+class SimulatedBackend(DeviceBackend):
+    """
+    Backend replaying a sensor trace on a virtual clock.
+    """
+
+    # Delay between the start of the simulation and the start of the trace,
+    # giving the system time to settle before the first movement.
+    TRACE_START = 5.0
+
+    trace: SensorTrace = None
+    bridge: SimulatedBridge = None
+    sensehats: List[SimulatedSenseHat] = None
+
+    __executor: SimulationExecutor = None
+
+    def __init__(self, trace: SensorTrace, clock: VirtualClock = None):
+        self.clock = clock if clock is not None else VirtualClock()
+        self.gpio = SimulatedGPIO(self.clock)
+        self.trace = trace
+        self.bridge = SimulatedBridge()
+        self.sensehats = []
+        self.__executor = SimulationExecutor()
+
+    def create_sensehat(self):
+        sensehat = SimulatedSenseHat(self.clock, self.trace, trace_start=self.TRACE_START)
+        self.sensehats.append(sensehat)
+        return sensehat
+
+    def create_bridge(self):
+        return self.bridge
+
+    def create_executor(self):
+        return self.__executor
+
+    def run(self, duration: float):
+        """
+        Run the simulation on the calling thread until ``duration`` seconds
+        of virtual time have passed.
+        :param duration: {float} Simulated time in seconds.
+        """
+        self.clock.set_limit(duration)
+        try:
+            while self.clock.monotonic() < duration:
+                if self.__executor.run_pending():
+                    continue
+                next_due = self.clock.next_due()
+                self.clock.advance_to(next_due if next_due is not None else duration)
+        except SimulationEnd:
+            pass
+
+        # Jobs interrupted by the end of the simulation hold
+        # the SimulationEnd exception in their future.
+        while self.__executor.run_pending():
+            pass
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from hardware.hue import BridgeError, HueBridge, StandInBridge
+
+
+class TestHueBridge(TestCase):
+
+    def setUp(self):
+        self.stand_in = StandInBridge()
+        self.bridge = HueBridge('127.0.0.1', 'user', port=self.stand_in.get_port())
+
+    def tearDown(self):
+        self.bridge.close_connection()
+        self.stand_in.close()
+
+    def test_commands_share_one_connection(self):
+        """
+        ATC-1501: Test that group commands are sent over one kept-alive connection, and that errors of the bridge are raised.
+        """
+        for bri in (10, 20, 30):
+            self.bridge.set_group(1, {'on': True, 'bri': bri}, transitiontime=1)
+        self.bridge.set_group(1, 'on', False)
+
+        self.assertEqual(
+            [{'on': True, 'bri': 10, 'transitiontime': 1}, {'on': True, 'bri': 20, 'transitiontime': 1},
+             {'on': True, 'bri': 30, 'transitiontime': 1}, {'on': False}],
+            [command for _, _, command in self.stand_in.commands])
+        self.assertEqual(1, self.bridge.connections)
+        self.assertEqual(1, len(self.stand_in.connections))
+
+        self.stand_in.fail = True
+        with self.assertRaises(BridgeError):
+            self.bridge.set_group(1, 'on', True)
+
+    def test_reconnect_after_close(self):
+        """
+        ATC-1502: Test that a command is repeated on a new connection if the bridge has closed the kept-alive one.
+        """
+        self.stand_in.keep_alive = False
+        for bri in (10, 20, 30):
+            self.bridge.set_group(1, 'bri', bri)
+        self.assertEqual([{'bri': 10}, {'bri': 20}, {'bri': 30}], [command for _, _, command in self.stand_in.commands])
+        self.assertEqual(3, self.bridge.connections)
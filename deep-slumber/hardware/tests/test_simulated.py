@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from hardware.clock import SimulationEnd, VirtualClock
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.interfaces import LogConsumer
+from logger.enum import BackpressurePolicy
+from logger.logger import Logger
+from orchestra.enums import OrchestraState
+from orchestra.orchestra import Orchestra
+from outpost.enum import EventType
+
+
+class RecordingConsumer(LogConsumer):
+
+    def __init__(self):
+        self.events = []
+
+    def consume_log_message(self, msg):
+        self.events.append(msg)
+
+
+class TestSimulatedBackend(TestCase):
+
+    def test_virtual_clock_fires_in_order(self):
+        """
+        ATC-0101: Test that the virtual clock fires callbacks in order of their due time.
+        """
+        clock = VirtualClock()
+        fired = []
+        clock.call_later(5, lambda: fired.append((5, clock.monotonic())))
+        clock.call_later(1, lambda: fired.append((1, clock.monotonic())))
+        clock.call_later(3, lambda: fired.append((3, clock.monotonic()))).cancel()
+
+        clock.sleep(10)
+
+        self.assertEqual([(1, 1.0), (5, 5.0)], fired)
+        self.assertEqual(10.0, clock.monotonic())
+
+    def test_virtual_clock_limit(self):
+        """
+        ATC-0102: Test that advancing the virtual clock beyond its limit ends the simulation.
+        """
+        clock = VirtualClock(limit=30)
+        clock.sleep(20)
+        with self.assertRaises(SimulationEnd):
+            clock.sleep(20)
+        self.assertEqual(30.0, clock.monotonic())
+
+    def test_simulated_night(self):
+        """
+        ATC-0103: Test that a simulated night is recorded and ends in IDLE state.
+        """
+        runs = []
+        for _ in range(2):
+            backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=1))
+            consumer = RecordingConsumer()
+            logger = Logger(consumers=[consumer], policies={consumer: BackpressurePolicy.BLOCK})
+            orchestra = Orchestra(logger=logger, backend=backend)
+
+            night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+            backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0), (night_end, 1), (night_end + 2.0, 0)))
+            backend.run(night_end + 2 * Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT)
+            logger.close()
+
+            event_types = [event.event_type for event in consumer.events]
+            self.assertEqual(OrchestraState.IDLE, orchestra.get_state())
+            self.assertIn(EventType.START_REC, event_types)
+            self.assertIn(EventType.MOVEMENT_INTERVAL, event_types)
+            self.assertEqual(EventType.STOP_REC, event_types[-2])
+            runs.append([(event.event_type, event.value) for event in consumer.events])
+
+        # Simulations are deterministic
+        self.assertEqual(runs[0], runs[1])
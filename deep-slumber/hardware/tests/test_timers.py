@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+import threading
+
+from hardware.clock import SystemClock
+from hardware.timers import TimerWheel
+
+
+class TestTimerWheel(TestCase):
+
+    def test_virtual_time(self):
+        """
+        ATC-1101: Test that timers fire in deadline order, not before their deadline and also beyond one revolution.
+        """
+        wheel = TimerWheel(tick=0.1, slots=8)
+        fired = []
+        for deadline in (0.35, 0.05, 5.0, 0.3, 2.45):
+            wheel.arm(deadline, lambda d=deadline: fired.append(d))
+        self.assertEqual(5, len(wheel))
+
+        wheel.advance(0.3)
+        self.assertEqual([0.05, 0.3], fired)
+
+        # 5.0 shares its slot with 0.2 + n * 0.8, but must wait for its own revolution
+        wheel.advance(4.9)
+        self.assertEqual([0.05, 0.3, 0.35, 2.45], fired)
+
+        wheel.advance(100.0)
+        self.assertEqual([0.05, 0.3, 0.35, 2.45, 5.0], fired)
+        self.assertEqual(0, len(wheel))
+
+    def test_cancel(self):
+        """
+        ATC-1102: Test that cancelled timers do not fire and that fired timers cannot be cancelled.
+        """
+        wheel = TimerWheel(tick=0.1, slots=8)
+        fired = []
+        first = wheel.arm(1.0, lambda: fired.append(1))
+        second = wheel.arm(1.0, lambda: fired.append(2))
+
+        self.assertTrue(first.cancel())
+        self.assertFalse(first.cancel())
+        wheel.advance(1.0)
+        self.assertEqual([2], fired)
+        self.assertFalse(second.cancel())
+
+        # Timers armed in the past fire on the next tick
+        wheel.arm(0.5, lambda: fired.append(3))
+        wheel.advance(1.05)
+        self.assertEqual([2], fired)
+        wheel.advance(1.1)
+        self.assertEqual([2, 3], fired)
+
+    def test_next_deadline(self):
+        """
+        ATC-1104: Test that the wheel reports when its next timer is due, also for past and far-ahead timers.
+        """
+        wheel = TimerWheel(tick=0.1, slots=8)
+        self.assertIsNone(wheel.next_deadline())
+
+        # 5.0 shares its slot with 0.2 + n * 0.8, but is not due within this revolution
+        far = wheel.arm(5.0, lambda: None)
+        self.assertAlmostEqual(0.9, wheel.next_deadline())
+        wheel.arm(0.35, lambda: None)
+        self.assertAlmostEqual(0.35, wheel.next_deadline())
+
+        wheel.advance(0.35)
+        self.assertAlmostEqual(0.9 + 0.3, wheel.next_deadline())
+        wheel.arm(0.1, lambda: None)
+        self.assertAlmostEqual(0.4, wheel.next_deadline())
+
+        wheel.advance(0.4)
+        far.cancel()
+        self.assertIsNone(wheel.next_deadline())
+
+    def test_system_clock(self):
+        """
+        ATC-1103: Test that the system clock calls all callbacks from one single timer thread.
+        """
+        clock = SystemClock()
+        threads = set()
+        done = threading.Event()
+        threads_before = threading.active_count()
+
+        for i in range(20):
+            clock.call_later(0.01 * i, lambda: threads.add(threading.current_thread().ident))
+        clock.call_later(0.3, done.set)
+        clock.call_later(0.2, lambda: threads.add(None)).cancel()
+
+        self.assertLessEqual(threading.active_count(), threads_before + 1)
+        self.assertTrue(done.wait(2))
+        self.assertEqual(1, len(threads))
+        self.assertNotIn(None, threads)
@@ -0,0 +1,193 @@
+"""
+Timers module.
+
+Hashed timer wheel holding all timeouts of a clock. Arming and cancelling a
+timer is O(1); expiring costs O(1) per tick plus the expired timers. The wheel
+itself does not know about real time, it is advanced by its owner, which
+makes it testable in virtual time.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+log = logging.getLogger(__name__)
+
+
+class WheelTimer:
+    """
+    Handle for a callback armed on a timer wheel.
+    """
+
+    __slots__ = ('deadline', 'callback', 'slot', 'state', 'wheel')
+
+    PENDING = 0
+    FIRED = 1
+    CANCELLED = 2
+
+    def __init__(self, wheel, deadline: float, callback: Callable, slot: int):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.slot = slot
+        self.state = self.PENDING
+
+    def cancel(self) -> bool:
+        """
+        :return: {bool} True if the timer has been cancelled before it fired.
+        """
+        return self.wheel.cancel(self)
+
+
+class TimerWheel:
+
+    __tick = 0.0
+    __slots: List[Dict[int, WheelTimer]] = None
+    __current_tick = 0
+    __count = 0
+    __lock: threading.Lock = None
+
+    def __init__(self, tick: float = 0.05, slots: int = 512, start: float = 0.0):
+        """
+        :param tick: {float} Resolution of the wheel in seconds. Timers fire up to one tick late.
+        :param slots: {int} Number of slots. Timers further ahead than one revolution wait for more revolutions.
+        :param start: {float} Time in seconds the wheel starts at.
+        """
+        self.__tick = tick
+        self.__slots = [{} for _ in range(slots)]
+        self.__current_tick = int(start / tick)
+        self.__count = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return self.__count
+
+    def get_tick(self) -> float:
+        return self.__tick
+
+    def arm(self, deadline: float, callback: Callable) -> WheelTimer:
+        """
+        Arm a timer.
+        :param deadline: {float} Time in seconds at which ``callback`` is due.
+        :param callback: {Callable} Function to be called.
+        :return: {WheelTimer} Handle to cancel the timer with.
+        """
+        with self.__lock:
+            # Timers are never placed in the current or a past slot, since those have been expired already.
+            tick = max(int(deadline / self.__tick), self.__current_tick + 1)
+            slot = tick % len(self.__slots)
+            timer = WheelTimer(self, deadline, callback, slot)
+            self.__slots[slot][id(timer)] = timer
+            self.__count += 1
+            return timer
+
+    def cancel(self, timer: WheelTimer) -> bool:
+        with self.__lock:
+            if timer.state != WheelTimer.PENDING:
+                return False
+            del self.__slots[timer.slot][id(timer)]
+            timer.state = WheelTimer.CANCELLED
+            self.__count -= 1
+            return True
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        :return: {float} Time in seconds at which the next timer is expired, None if no timer is armed. If all timers
+        are more than one revolution ahead, the time after one revolution, when the wheel has to be looked at again.
+        """
+        with self.__lock:
+            if not self.__count:
+                return None
+            for tick in range(self.__current_tick + 1, self.__current_tick + len(self.__slots) + 1):
+                slot = self.__slots[tick % len(self.__slots)]
+                if not slot:
+                    continue
+                end = (tick + 1) * self.__tick
+                due = [timer.deadline for timer in slot.values() if timer.deadline < end]
+                if due:
+                    # Timers armed in the past are not expired before their slot's tick
+                    return max(min(due), tick * self.__tick)
+            return (self.__current_tick + len(self.__slots) + 1) * self.__tick
+
+    def expire(self, now: float) -> List[WheelTimer]:
+        """
+        Advance the wheel to ``now`` and collect all timers that are due.
+        The collected timers count as fired, i.e. they cannot be cancelled anymore.
+        :param now: {float} Current time in seconds.
+        :return: {List[WheelTimer]} Due timers ordered by deadline.
+        """
+        expired = []
+        with self.__lock:
+            target = int(now / self.__tick)
+            # One revolution visits every slot, so more ticks than slots need not be visited one by one.
+            first = max(self.__current_tick + 1, target - len(self.__slots) + 1)
+            for tick in range(first, target + 1):
+                slot = self.__slots[tick % len(self.__slots)]
+                if not slot:
+                    continue
+                for key, timer in list(slot.items()):
+                    if timer.deadline <= now:
+                        del slot[key]
+                        timer.state = WheelTimer.FIRED
+                        expired.append(timer)
+            self.__current_tick = max(self.__current_tick, target)
+            self.__count -= len(expired)
+
+        expired.sort(key=lambda t: t.deadline)
+        return expired
+
+    def advance(self, now: float):
+        """
+        Advance the wheel to ``now`` and call all due callbacks on the calling thread.
+        :param now: {float} Current time in seconds.
+        """
+        for timer in self.expire(now):
+            timer.callback()
+
+
+class TimerThread:
+    """
+    Drives a timer wheel in real time from one single thread, which calls
+    all callbacks. The thread sleeps until the next timer is due.
+    """
+
+    __wheel: TimerWheel = None
+    __condition: threading.Condition = None
+    __thread: threading.Thread = None
+
+    def __init__(self, tick: float = 0.05, slots: int = 512):
+        self.__wheel = TimerWheel(tick, slots, start=time.monotonic())
+        self.__condition = threading.Condition()
+        self.__thread = threading.Thread(target=self.__run, name='TimerThread', daemon=True)
+        self.__thread.start()
+
+    def call_later(self, delay: float, callback: Callable) -> WheelTimer:
+        timer = self.__wheel.arm(time.monotonic() + max(delay, 0.0), callback)
+        with self.__condition:
+            self.__condition.notify()
+        return timer
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                # call_later notifies after arming, so an earlier timer shortens the wait
+                while True:
+                    deadline = self.__wheel.next_deadline()
+                    if deadline is None:
+                        self.__condition.wait()
+                        continue
+                    delay = deadline - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self.__condition.wait(delay)
+            for timer in self.__wheel.expire(time.monotonic()):
+                try:
+                    timer.callback()
+                except Exception:
+                    log.exception('Timer callback failed')
@@ -0,0 +1,172 @@
+"""
+Sensor trace module.
+
+Recorded or synthesized sensor readings that simulated devices replay.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from bisect import bisect_right
+import csv
+from datetime import datetime
+import math
+import random
+from typing import List, Tuple
+
+
+class TraceSample:
+    """
+    A single sensor reading at a given offset from the start of the trace.
+    """
+
+    __slots__ = ('offset', 'gyro', 'accel', 'temperature', 'humidity', 'pressure')
+
+    def __init__(self, offset: float, gyro: Tuple[float, float, float], temperature: float = 20.0,
+                 humidity: float = 40.0, pressure: float = 1013.0, accel: Tuple[float, float, float] = (0.0, 0.0, 1.0)):
+        self.offset = offset
+        self.gyro = gyro
+        self.accel = accel
+        self.temperature = temperature
+        self.humidity = humidity
+        self.pressure = pressure
+
+
+class SensorTrace:
+    """
+    Time-ordered sequence of sensor samples. Readings between two samples
+    hold the value of the earlier sample.
+    """
+
+    __samples: List[TraceSample] = None
+    __offsets: List[float] = None
+
+    def __init__(self, samples: List[TraceSample]):
+        self.__samples = sorted(samples, key=lambda s: s.offset)
+        self.__offsets = [s.offset for s in self.__samples]
+
+    def __len__(self):
+        return len(self.__samples)
+
+    def get_duration(self) -> float:
+        return self.__offsets[-1] if self.__offsets else 0.0
+
+    def get_samples(self) -> List[TraceSample]:
+        return self.__samples
+
+    def sample_at(self, offset: float) -> TraceSample:
+        """
+        Return the sample valid at ``offset``.
+        :param offset: {float} Seconds since start of the trace.
+        :return: {TraceSample} Latest sample at or before ``offset``, the first sample if none.
+        """
+        index = bisect_right(self.__offsets, offset) - 1
+        return self.__samples[max(index, 0)]
+
+    @classmethod
+    def from_csv(cls, path: str):
+        """
+        Load a trace recorded with ``experiments/accelerometer.py``.
+        :param path: {str} Path to the CSV file.
+        :return: {SensorTrace} Loaded trace.
+        """
+        samples = []
+        start = None
+        with open(path, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                timestamp = cls.__parse_timestamp(row['timestamp'])
+                if start is None:
+                    start = timestamp
+                samples.append(TraceSample(
+                    offset=(timestamp - start).total_seconds(),
+                    gyro=(float(row['roll']), float(row['pitch']), float(row['yaw'])),
+                    temperature=float(row.get('temp') or 20.0),
+                    humidity=float(row.get('humid') or 40.0),
+                ))
+        return cls(samples)
+
+    # Movement rate in light and deep sleep relative to the average, for nights with sleep cycles
+    LIGHT_SLEEP_RATE = 2.0
+    DEEP_SLEEP_RATE = 0.1
+
+    @staticmethod
+    def is_light_sleep(offset: float, cycle: float, phase: float = 0.0, light_fraction: float = 0.4) -> bool:
+        """
+        Ground truth of a night synthesized with sleep cycles.
+        :param offset: {float} Seconds since start of the trace.
+        :param cycle: {float} Length of a sleep cycle in seconds.
+        :param phase: {float} Seconds into its cycle the night starts.
+        :param light_fraction: {float} Part of each cycle spent in light sleep, at its start.
+        :return: {bool} True if the sleeper is in light sleep at ``offset``.
+        """
+        return (offset + phase) % cycle < light_fraction * cycle
+
+    @classmethod
+    def synthesize(cls, hours: float = 8.0, movements_per_hour: float = 30.0, seed: int = 0, cycle: float = None,
+                   phase: float = 0.0, light_fraction: float = 0.4):
+        """
+        Create a deterministic night of sensor readings.
+        Movements occur in short bursts. Without sleep cycles they are more frequent in the first and last hour,
+        with sleep cycles they are frequent in light sleep and rare in the deep sleep stretches in between.
+        :param hours: {float} Duration of the night.
+        :param movements_per_hour: {float} Average number of movement bursts per hour.
+        :param seed: {int} Seed of the random generator.
+        :param cycle: {float} Length of a sleep cycle in seconds, None for a night without cycles.
+        :param phase: {float} Seconds into its cycle the night starts, see ``is_light_sleep()``.
+        :param light_fraction: {float} Part of each cycle spent in light sleep.
+        :return: {SensorTrace} Synthesized trace.
+        """
+        rnd = random.Random(seed)
+        duration = hours * 3600
+        samples = []
+
+        # The night starts with getting into bed.
+        t = 0.0
+        while t < duration:
+            temperature = 20.0 + 1.5 * math.sin(t / duration * math.pi)
+            humidity = 40.0 + 5.0 * math.cos(t / duration * math.pi)
+            for i in range(rnd.randint(1, 4)):
+                samples.append(TraceSample(
+                    offset=t + i,
+                    gyro=tuple(rnd.uniform(-0.5, 0.5) for _ in range(3)),
+                    accel=tuple(rnd.uniform(-0.1, 0.1) + (1.0 if axis == 2 else 0.0) for axis in range(3)),
+                    temperature=temperature,
+                    humidity=humidity,
+                ))
+            t += i + 1
+            samples.append(TraceSample(t, (0.0, 0.0, 0.0), temperature=temperature, humidity=humidity))
+
+            if cycle:
+                t = cls.__next_movement(rnd, t, movements_per_hour, cycle, phase, light_fraction)
+            else:
+                restless = t < 3600 or t > duration - 3600
+                t += rnd.expovariate(movements_per_hour * (2.0 if restless else 1.0) / 3600)
+
+        samples.append(TraceSample(duration, (0.0, 0.0, 0.0)))
+        return cls(samples)
+
+    @classmethod
+    def __next_movement(cls, rnd: random.Random, t: float, movements_per_hour: float, cycle: float, phase: float,
+                        light_fraction: float) -> float:
+        """
+        :return: {float} Offset of the next movement burst after ``t`` in a night with sleep cycles.
+        """
+        while True:
+            position = (t + phase) % cycle
+            light = position < light_fraction * cycle
+            change = (light_fraction * cycle if light else cycle) - position
+            gap = rnd.expovariate(movements_per_hour * (cls.LIGHT_SLEEP_RATE if light else cls.DEEP_SLEEP_RATE) / 3600)
+            if gap < change:
+                return t + gap
+            # Movements are memoryless, the gap is drawn anew at the rate of the next stage.
+            t += max(change, 1e-6)
+
+    @staticmethod
+    def __parse_timestamp(raw: str) -> datetime:
+        for fmt in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
+            try:
+                return datetime.strptime(raw, fmt)
+            except ValueError:
+                continue
+        raise ValueError('Unknown timestamp format: {}'.format(raw))
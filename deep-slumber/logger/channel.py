@@ -0,0 +1,188 @@
+"""
+Channel module.
+
+Bounded queue between the logger's dispatcher and a single consumer.
+Every channel delivers on its own thread, so a slow consumer only
+holds up its own events. With the BLOCK policy the dispatcher waits for
+room a short while at most; past that the channel spills its events
+beyond its capacity rather than stall the other consumers.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque, OrderedDict
+import threading
+import time
+
+from logger.enum import BackpressurePolicy
+from logger.interfaces import LogConsumer
+
+
+class ConsumerChannel:
+
+    # Statics
+    BLOCK_TIMEOUT = 0.05
+    SPILL_CAPACITY = 2**14
+
+    __consumer: LogConsumer = None
+    __policy = BackpressurePolicy.DROP_OLDEST
+    __capacity = 0
+    __block_timeout = 0.0
+    __spill_capacity = 0
+
+    # Pending events. Keyed by event type if events are coalesced.
+    __pending = None
+    __condition: threading.Condition = None
+    __delivering = False
+    __closed = False
+    __thread: threading.Thread = None
+
+    # Counters
+    queued = 0
+    delivered = 0
+    dropped = 0
+    spilled = 0
+    coalesced = 0
+    errors = 0
+
+    def __init__(self, consumer: LogConsumer, policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+                 capacity: int = 1024, block_timeout: float = BLOCK_TIMEOUT, spill_capacity: int = SPILL_CAPACITY):
+        """
+        :param consumer: {LogConsumer} Consumer to deliver events to.
+        :param policy: {BackpressurePolicy} What to do if the consumer falls behind by more than ``capacity`` events.
+        :param capacity: {int} Maximum number of pending events.
+        :param block_timeout: {float} Maximum time in seconds the BLOCK policy waits for room before spilling.
+        :param spill_capacity: {int} Maximum number of events the BLOCK policy spills beyond ``capacity``. The oldest
+        are dropped beyond this.
+        """
+        self.__consumer = consumer
+        self.__policy = policy
+        self.__capacity = capacity
+        self.__block_timeout = block_timeout
+        self.__spill_capacity = spill_capacity
+        self.__pending = OrderedDict() if policy == BackpressurePolicy.COALESCE else deque()
+        self.__condition = threading.Condition()
+        self.__delivering = False
+        self.__closed = False
+        self.queued = self.delivered = self.dropped = self.spilled = self.coalesced = self.errors = 0
+
+        self.__thread = threading.Thread(
+            target=self.__run, name='LogChannel-{}'.format(type(consumer).__name__), daemon=True)
+        self.__thread.start()
+
+    def get_consumer(self) -> LogConsumer:
+        return self.__consumer
+
+    def put(self, event):
+        """
+        Queue an event for delivery, applying the backpressure policy if the channel is full.
+        Only blocks with the BLOCK policy, for ``block_timeout`` at most.
+        :param event: {Event} Event to be delivered.
+        """
+        with self.__condition:
+            if self.__policy == BackpressurePolicy.COALESCE:
+                key = getattr(event, 'event_type', None)
+                if key in self.__pending:
+                    self.__pending[key] = event
+                    self.coalesced += 1
+                    return
+                if len(self.__pending) >= self.__capacity:
+                    self.__pending.popitem(last=False)
+                    self.dropped += 1
+                self.__pending[key] = event
+
+            else:
+                if self.__policy == BackpressurePolicy.BLOCK:
+                    self.__wait_for_room()
+                    if len(self.__pending) >= self.__capacity:
+                        self.spilled += 1
+                        if len(self.__pending) >= self.__capacity + self.__spill_capacity:
+                            self.__pending.popleft()
+                            self.dropped += 1
+                elif len(self.__pending) >= self.__capacity:
+                    self.__pending.popleft()
+                    self.dropped += 1
+                self.__pending.append(event)
+
+            self.queued += 1
+            self.__condition.notify_all()
+
+    def __wait_for_room(self):
+        # Once spilling, events are queued without waiting until the consumer has caught up.
+        if len(self.__pending) > self.__capacity:
+            return
+        deadline = time.monotonic() + self.__block_timeout
+        while len(self.__pending) >= self.__capacity and not self.__closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.__condition.wait(remaining)
+
+    def __take(self):
+        if self.__policy == BackpressurePolicy.COALESCE:
+            return self.__pending.popitem(last=False)[1]
+        return self.__pending.popleft()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                self.__delivering = False
+                self.__condition.notify_all()
+                while not self.__pending and not self.__closed:
+                    self.__condition.wait()
+                if not self.__pending:
+                    return
+                event = self.__take()
+                self.__delivering = True
+                self.__condition.notify_all()
+
+            try:
+                self.__consumer.consume_log_message(event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1
+
+    def is_idle(self) -> bool:
+        with self.__condition:
+            return not self.__pending and not self.__delivering
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """
+        Wait until all pending events have been delivered.
+        :param timeout: {float} Maximum time to wait in seconds, None to wait indefinitely.
+        :return: {bool} True if the channel is idle.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while self.__pending or self.__delivering:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__condition.wait(remaining)
+        return True
+
+    def close(self):
+        """
+        Stop the delivery thread once all pending events have been delivered.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def get_statistics(self) -> dict:
+        """
+        :return: {dict} Counters of the channel and the number of currently pending events.
+        """
+        with self.__condition:
+            return {
+                'pending': len(self.__pending),
+                'queued': self.queued,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+            }
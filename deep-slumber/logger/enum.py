@@ -0,0 +1,19 @@
+"""
+Logger enums
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from enum import Enum
+
+
+class BackpressurePolicy(Enum):
+    # Discard the oldest queued event to make room for a new one.
+    DROP_OLDEST = 0
+    # Hold up the dispatcher until the consumer has made room, for a short while at most. Past that the events are
+    # spilled beyond the channel's capacity instead of dropped.
+    BLOCK = 1
+    # Keep only the latest queued event per event type.
+    COALESCE = 2
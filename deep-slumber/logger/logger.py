@@ -2,30 +2,134 @@
 Logger module.
 
 Collects and dispatches logging messages.
+
+Events are handed off to a dispatcher thread and delivered to every consumer
+through its own ``ConsumerChannel``, so logging never waits for a consumer.
 """
 
 __author__ = 'Samuel Blattner'
 __version__ = '1.0.0'
 
 
-from typing import List
+from collections import deque
+import threading
+import time
+from typing import Dict, List
 
+from logger.channel import ConsumerChannel
+from logger.enum import BackpressurePolicy
 from logger.interfaces import LogConsumer
 from outpost.message import Event
 
 
 class Logger:
 
+    # Statics
+    HANDOFF_SIZE = 2**14
+    CHANNEL_CAPACITY = 1024
+
     __consumers: List[LogConsumer] = []
+    __channels: List[ConsumerChannel] = []
+
+    # Handoff from the logging threads to the dispatcher. Appending to and popping
+    # from a deque are atomic, so logging threads only take a lock to count drops.
+    __handoff: deque = None
+    __handoff_ready: threading.Event = None
+    __drop_lock: threading.Lock = None
+    __dispatching = False
+    __closed = False
+    __dispatcher: threading.Thread = None
 
-    def __init__(self, consumers: List[LogConsumer]):
+    handoff_dropped = 0
+
+    def __init__(self, consumers: List[LogConsumer], policies: Dict[LogConsumer, BackpressurePolicy] = None,
+                 channel_capacity: int = CHANNEL_CAPACITY, handoff_size: int = HANDOFF_SIZE):
+        """
+        :param consumers: {List[LogConsumer]} Consumers every event is delivered to.
+        :param policies: {Dict[LogConsumer, BackpressurePolicy]} Backpressure policy per consumer. Defaults to DROP_OLDEST.
+        :param channel_capacity: {int} Maximum number of events pending per consumer.
+        :param handoff_size: {int} Maximum number of events not yet dispatched. The oldest are dropped beyond this size.
+        """
+        policies = policies or {}
         self.__consumers = consumers
+        self.__channels = [
+            ConsumerChannel(consumer, policies.get(consumer, BackpressurePolicy.DROP_OLDEST), channel_capacity)
+            for consumer in consumers
+        ]
+        self.__handoff = deque(maxlen=handoff_size)
+        self.__handoff_ready = threading.Event()
+        self.__drop_lock = threading.Lock()
+        self.__dispatching = False
+        self.__closed = False
+        self.handoff_dropped = 0
+
+        self.__dispatcher = threading.Thread(target=self.__dispatch, name='LogDispatcher', daemon=True)
+        self.__dispatcher.start()
 
     def log_event(self, event: Event):
         """
         Log an event.
-        Calls all consumers and passes the event to be logged.
+        Hands the event off to the dispatcher, which passes it on to all consumers.
+        Never blocks.
         :param event: {Event} Event to be logged
         """
-        for consumer in self.__consumers:
-            consumer.consume_log_message(event)
+        if len(self.__handoff) == self.__handoff.maxlen:
+            with self.__drop_lock:
+                self.handoff_dropped += 1
+        self.__handoff.append(event)
+        self.__handoff_ready.set()
+
+    def __dispatch(self):
+        while True:
+            self.__handoff_ready.wait()
+            self.__handoff_ready.clear()
+
+            self.__dispatching = True
+            while True:
+                try:
+                    event = self.__handoff.popleft()
+                except IndexError:
+                    break
+                for channel in self.__channels:
+                    channel.put(event)
+            self.__dispatching = False
+
+            if self.__closed:
+                return
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until all logged events have been delivered to all consumers.
+        :param timeout: {float} Maximum time to wait in seconds, None to wait indefinitely.
+        :return: {bool} True if all events have been delivered.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.__handoff or self.__dispatching:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+
+        for channel in self.__channels:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not channel.wait_idle(remaining):
+                return False
+        return True
+
+    def close(self):
+        """
+        Deliver all pending events and stop the dispatcher and channel threads.
+        """
+        self.__closed = True
+        self.__handoff_ready.set()
+        self.__dispatcher.join()
+        for channel in self.__channels:
+            channel.close()
+
+    def get_statistics(self) -> dict:
+        """
+        :return: {dict} Handoff counters and the counters of every consumer channel, keyed by consumer class name.
+        """
+        statistics = {'handoff': {'pending': len(self.__handoff), 'dropped': self.handoff_dropped}}
+        for channel in self.__channels:
+            statistics[type(channel.get_consumer()).__name__] = channel.get_statistics()
+        return statistics
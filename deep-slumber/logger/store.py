@@ -0,0 +1,240 @@
+"""
+Store module.
+
+Keeps a local history of all logged events in an SQLite database in WAL mode.
+Events are collected in memory and written in one transaction per flush
+interval. The history can be queried, e.g. for the movements of the last
+minutes, and replayed to the server after a resync request.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from datetime import datetime, timedelta
+import sqlite3
+import threading
+from typing import Iterator, List, Optional, Tuple, Union
+
+from logger.interfaces import LogConsumer
+from outpost.enum import EventType
+from outpost.message import Event, MovementInterval
+from outpost.timing import to_epoch_ms
+
+
+class EventStore(LogConsumer):
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS events ('
+        ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        ' event_type INTEGER NOT NULL,'
+        ' timestamp INTEGER NOT NULL,'
+        ' value REAL,'
+        ' duration INTEGER,'
+        ' seq INTEGER,'
+        ' monotonic_ns INTEGER'
+        ')',
+        'CREATE INDEX IF NOT EXISTS events_type_timestamp ON events (event_type, timestamp)',
+        'CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp)',
+    )
+
+    # Columns added after the first release, with their type
+    ADDED_COLUMNS = (
+        ('duration', 'INTEGER'),
+        ('seq', 'INTEGER'),
+        ('monotonic_ns', 'INTEGER'),
+    )
+    COLUMNS = 'event_type, timestamp, value, duration, seq, monotonic_ns'
+
+    __path: str = None
+    __flush_interval = 1.0
+    __batch_size = 0
+
+    __connection: sqlite3.Connection = None
+    __lock: threading.Lock = None
+    __pending: List[tuple] = None
+    __flush_requested: threading.Event = None
+    __closed = False
+    __flusher: threading.Thread = None
+
+    # Counters
+    written = 0
+    transactions = 0
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 1024):
+        """
+        :param path: {str} Path of the database file.
+        :param flush_interval: {float} Time in seconds between two write transactions.
+        :param batch_size: {int} Number of pending events that triggers a write before the flush interval has passed.
+        """
+        self.__path = path
+        self.__flush_interval = flush_interval
+        self.__batch_size = batch_size
+        self.__lock = threading.Lock()
+        self.__pending = []
+        self.__flush_requested = threading.Event()
+        self.__closed = False
+        self.written = 0
+        self.transactions = 0
+
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        with self.__connection:
+            for statement in self.SCHEMA:
+                self.__connection.execute(statement)
+            # Older databases lack the duration of movement intervals and the stamps of the events.
+            columns = [row[1] for row in self.__connection.execute('PRAGMA table_info(events)')]
+            for name, column_type in self.ADDED_COLUMNS:
+                if name not in columns:
+                    self.__connection.execute('ALTER TABLE events ADD COLUMN {} {}'.format(name, column_type))
+
+        self.__flusher = threading.Thread(target=self.__run_flusher, name='EventStore', daemon=True)
+        self.__flusher.start()
+
+    @staticmethod
+    def __to_event(event_type: int, timestamp: int, value: Optional[float], duration: Optional[int] = None,
+                   seq: Optional[int] = None, monotonic_ns: Optional[int] = None) -> Event:
+        """
+        Restore a stored event with its original stamps, so the server can deduplicate it when it is resent.
+        """
+        value = int(value) if value is not None and value.is_integer() else value
+        if duration is not None:
+            event = MovementInterval(intensity=value, stamped=False)
+            event.end_ms = timestamp + duration
+        else:
+            event = Event(EventType(event_type), value=value, stamped=False)
+        event.epoch_ms = timestamp
+        event.seq = seq
+        event.monotonic_ns = monotonic_ns
+        return event
+
+    # ================================ Writing ========================================
+    def consume_log_message(self, msg: Event):
+        """
+        Queue an event for the next write transaction.
+        :param msg: {Event} Event to be stored.
+        """
+        with self.__lock:
+            duration = msg.end_ms - msg.epoch_ms if isinstance(msg, MovementInterval) else None
+            self.__pending.append((msg.event_type.value, msg.epoch_ms, msg.value, duration, msg.seq, msg.monotonic_ns))
+            if len(self.__pending) >= self.__batch_size:
+                self.__flush_requested.set()
+
+    def __run_flusher(self):
+        while not self.__closed:
+            self.__flush_requested.wait(self.__flush_interval)
+            self.__flush_requested.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending events in one transaction.
+        """
+        with self.__lock:
+            pending, self.__pending = self.__pending, []
+            if not pending:
+                return
+            with self.__connection:
+                self.__connection.executemany(
+                    'INSERT INTO events ({}) VALUES (?, ?, ?, ?, ?, ?)'.format(self.COLUMNS), pending)
+            self.written += len(pending)
+            self.transactions += 1
+
+    def close(self):
+        self.__closed = True
+        self.__flush_requested.set()
+        self.__flusher.join()
+        self.flush()
+        self.__connection.close()
+
+    # ================================ Queries ========================================
+    def __query(self, sql: str, parameters: tuple) -> list:
+        self.flush()
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+    def get_events(self, event_type: Union[EventType, Tuple[EventType, ...]] = None, since: datetime = None,
+                   until: datetime = None, limit: int = None) -> List[Event]:
+        """
+        Query stored events in chronological order.
+        :param event_type: {EventType} Only return events of this type, or of these types. All types if omitted.
+        :param since: {datetime} Only return events at or after this time.
+        :param until: {datetime} Only return events before this time.
+        :param limit: {int} Maximum number of events.
+        :return: {List[Event]} Matching events.
+        """
+        conditions, parameters = [], []
+        if isinstance(event_type, EventType):
+            conditions.append('event_type = ?')
+            parameters.append(event_type.value)
+        elif event_type is not None:
+            conditions.append('event_type IN ({})'.format(', '.join('?' * len(event_type))))
+            parameters.extend(t.value for t in event_type)
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            parameters.append(to_epoch_ms(since))
+        if until is not None:
+            conditions.append('timestamp < ?')
+            parameters.append(to_epoch_ms(until))
+
+        sql = 'SELECT {} FROM events'.format(self.COLUMNS)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY timestamp, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+
+        return [self.__to_event(*row) for row in self.__query(sql, tuple(parameters))]
+
+    def get_recent_movements(self, minutes: float, now: datetime = None) -> List[Event]:
+        """
+        :param minutes: {float} Length of the period in minutes.
+        :param now: {datetime} End of the period. Defaults to the current time.
+        :return: {List[Event]} Movement events and movement intervals starting within the last ``minutes`` minutes.
+        """
+        now = now or datetime.now()
+        return self.get_events(
+            (EventType.MOVEMENT, EventType.MOVEMENT_INTERVAL), since=now - timedelta(minutes=minutes), until=now)
+
+    def count_events(self, event_type: EventType, since: datetime, until: datetime = None) -> int:
+        """
+        :return: {int} Number of events of the given type in the given period.
+        """
+        sql = 'SELECT COUNT(*) FROM events WHERE event_type = ? AND timestamp >= ?'
+        parameters = (event_type.value, to_epoch_ms(since))
+        # No upper bound rather than datetime.max, which is out of range as epoch time east of UTC.
+        if until is not None:
+            sql += ' AND timestamp < ?'
+            parameters += (to_epoch_ms(until),)
+        return self.__query(sql, parameters)[0][0]
+
+    def explain(self, sql: str, parameters: tuple = ()) -> str:
+        """
+        :return: {str} SQLite's query plan for the given query.
+        """
+        return '\n'.join(row[-1] for row in self.__query('EXPLAIN QUERY PLAN ' + sql, parameters))
+
+    # ================================ Replay =========================================
+    def replay(self, since: datetime, until: datetime = None, chunk_size: int = 1024) -> Iterator[List[Event]]:
+        """
+        Read the stored events of a period in chunks, e.g. to resend them after the server asked for a resync.
+        Pages by row ID, so events stored while replaying do not shift the chunks.
+        :param since: {datetime} Start of the period.
+        :param until: {datetime} End of the period. Defaults to the current time.
+        :param chunk_size: {int} Maximum number of events per chunk.
+        :return: {Iterator[List[Event]]} Chunks of events in insertion order.
+        """
+        since_ms = to_epoch_ms(since)
+        until_ms = to_epoch_ms(until or datetime.now())
+        last_id = 0
+        while True:
+            rows = self.__query(
+                'SELECT id, {} FROM events'
+                ' WHERE id > ? AND timestamp >= ? AND timestamp < ? ORDER BY id LIMIT ?'.format(self.COLUMNS),
+                (last_id, since_ms, until_ms, chunk_size))
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [self.__to_event(*row[1:]) for row in rows]
@@ -0,0 +1,118 @@
+from unittest import TestCase
+
+import threading
+import time
+
+from logger.enum import BackpressurePolicy
+from logger.interfaces import LogConsumer
+from logger.logger import Logger
+from outpost.enum import EventType
+from outpost.message import Event
+
+
+class GatedConsumer(LogConsumer):
+    """
+    Records events, but only once the gate has been opened.
+    """
+
+    def __init__(self, open_gate: bool = True):
+        self.events = []
+        self.gate = threading.Event()
+        if open_gate:
+            self.gate.set()
+
+    def consume_log_message(self, msg):
+        self.gate.wait()
+        self.events.append(msg)
+
+
+class StalledConsumer(GatedConsumer):
+
+    def __init__(self):
+        super().__init__(open_gate=False)
+
+
+class TestLogger(TestCase):
+
+    def test_slow_consumer_does_not_block(self):
+        """
+        ATC-0801: Test that logging does not wait for a stalled consumer and other consumers keep receiving events.
+        """
+        stalled = StalledConsumer()
+        fast = GatedConsumer()
+        logger = Logger(consumers=[stalled, fast], channel_capacity=10, policies={fast: BackpressurePolicy.BLOCK})
+
+        start = time.monotonic()
+        for value in range(100):
+            logger.log_event(Event(EventType.MOVEMENT, value=value))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        self.assertFalse(logger.flush(timeout=0.5))
+        self.assertEqual(list(range(100)), [e.value for e in fast.events])
+
+        stalled.gate.set()
+        self.assertTrue(logger.flush(timeout=5))
+        self.assertEqual(0, logger.get_statistics()['handoff']['dropped'])
+        statistics = logger.get_statistics()['StalledConsumer']
+        self.assertEqual(100, statistics['queued'])
+        self.assertEqual(100, len(stalled.events) + statistics['dropped'])
+        self.assertLessEqual(len(stalled.events), 11)
+        self.assertEqual(99, stalled.events[-1].value)
+        logger.close()
+
+    def test_policies(self):
+        """
+        ATC-0802: Test that the BLOCK policy delivers every event and the COALESCE policy keeps the latest per event type.
+        """
+        blocking = GatedConsumer(open_gate=False)
+        coalescing = GatedConsumer(open_gate=False)
+        logger = Logger(consumers=[blocking, coalescing], channel_capacity=5, policies={
+            blocking: BackpressurePolicy.BLOCK,
+            coalescing: BackpressurePolicy.COALESCE,
+        })
+
+        for value in range(20):
+            logger.log_event(Event(EventType.TEMPERATURE, value=value))
+            logger.log_event(Event(EventType.HUMIDITY, value=100 + value))
+
+        blocking.gate.set()
+        deadline = time.monotonic() + 5
+        while len(blocking.events) < 40 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        coalescing.gate.set()
+        self.assertTrue(logger.flush(timeout=5))
+        logger.close()
+
+        self.assertEqual(40, len(blocking.events))
+        self.assertEqual(0, logger.get_statistics()['handoff']['dropped'])
+
+        # The first events may have been taken before the consumer stalled, the last are the latest values.
+        self.assertEqual({19, 119}, {e.value for e in coalescing.events[-2:]})
+        self.assertLessEqual(len(coalescing.events), 3)
+
+    def test_blocking_consumer_spills(self):
+        """
+        ATC-0803: Test that a stalled consumer with the BLOCK policy does not hold up other consumers and loses no events.
+        """
+        stalled = StalledConsumer()
+        fast = GatedConsumer()
+        logger = Logger(consumers=[stalled, fast], channel_capacity=5, policies={
+            stalled: BackpressurePolicy.BLOCK,
+            fast: BackpressurePolicy.BLOCK,
+        })
+
+        for value in range(50):
+            logger.log_event(Event(EventType.MOVEMENT, value=value))
+        deadline = time.monotonic() + 1
+        while len(fast.events) < 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(range(50)), [e.value for e in fast.events])
+
+        stalled.gate.set()
+        self.assertTrue(logger.flush(timeout=5))
+        logger.close()
+
+        self.assertEqual(list(range(50)), [e.value for e in stalled.events])
+        statistics = logger.get_statistics()['StalledConsumer']
+        self.assertEqual(0, statistics['dropped'])
+        self.assertGreater(statistics['spilled'], 0)
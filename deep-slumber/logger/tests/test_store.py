@@ -0,0 +1,170 @@
+from unittest import TestCase
+
+import asyncio
+from datetime import datetime, timedelta
+import os
+import shutil
+import tempfile
+import json
+import time
+
+import websockets
+
+from logger.store import EventStore
+from outpost.codec import JSON_CODEC
+from outpost.enum import AckStatus, CommandType, EventType, MessageType
+from outpost.message import Command, CommandAck, Event, MovementInterval
+from outpost.outpost import Outpost
+from outpost.resync import ResyncListener
+from outpost.spool import EventSpool
+from outpost.timing import to_epoch_ms
+
+
+class TestEventStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'events.db')
+        self.start = datetime(2019, 1, 1, 22, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def store_events(self, store, count):
+        for i in range(count):
+            event = Event(EventType.MOVEMENT if i % 2 else EventType.TEMPERATURE, value=i)
+            event.timestamp = self.start + timedelta(seconds=i)
+            store.consume_log_message(event)
+
+    def test_batched_writes_and_queries(self):
+        """
+        ATC-0901: Test that events are written in batches and recent movements are queried via the index.
+        """
+        store = EventStore(self.path, flush_interval=60, batch_size=10**6)
+        self.store_events(store, 1000)
+        store.flush()
+        self.assertEqual(1000, store.written)
+        self.assertEqual(1, store.transactions)
+
+        now = self.start + timedelta(seconds=1000)
+        movements = store.get_recent_movements(minutes=1, now=now)
+        self.assertEqual(list(range(941, 1000, 2)), [e.value for e in movements])
+        self.assertEqual({EventType.MOVEMENT}, {e.event_type for e in movements})
+        self.assertEqual(500, store.count_events(EventType.MOVEMENT, since=self.start))
+        self.assertIn(
+            'events_type_timestamp',
+            store.explain('SELECT * FROM events WHERE event_type = ? AND timestamp >= ?', (1000, 0)))
+        store.close()
+
+    def test_persistence_and_replay(self):
+        """
+        ATC-0902: Test that stored events survive a reopen and are replayed in chunks.
+        """
+        store = EventStore(self.path)
+        self.store_events(store, 25)
+        store.close()
+
+        store = EventStore(self.path)
+        chunks = list(store.replay(since=self.start + timedelta(seconds=5), until=self.start + timedelta(seconds=20),
+                                   chunk_size=4))
+        self.assertEqual([4, 4, 4, 3], [len(chunk) for chunk in chunks])
+        self.assertEqual(list(range(5, 20)), [e.value for chunk in chunks for e in chunk])
+        self.assertEqual(self.start + timedelta(seconds=5), chunks[0][0].timestamp)
+        store.close()
+
+    def test_resync_keeps_stamps(self):
+        """
+        ATC-2503: Test that events replayed from the store are resent with their original sequence numbers.
+        """
+        store = EventStore(self.path)
+        events = [Event(EventType.TEMPERATURE, value=21.5), MovementInterval(intensity=0.5)]
+        for event in events:
+            store.consume_log_message(event)
+        store.close()
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            store = EventStore(self.path)
+            stored = store.get_events()
+            spool = EventSpool(os.path.join(self.directory, 'spool'))
+            Outpost(spool=spool).resync(store.replay(since=datetime.now() - timedelta(minutes=1)))
+            store.close()
+            resent, _ = spool.read(10)
+            spool.close()
+        finally:
+            loop.close()
+            asyncio.set_event_loop(asyncio.new_event_loop())
+
+        self.assertEqual([(e.seq, e.monotonic_ns) for e in events], [(e.seq, e.monotonic_ns) for e in stored])
+        self.assertEqual([(e.event_type, e.seq, e.epoch_ms) for e in events],
+                         [(e.event_type, e.seq, e.epoch_ms) for e in resent])
+
+    def test_count_east_of_utc(self):
+        """
+        ATC-0903: Test that events are counted without upper bound in a time zone east of UTC.
+        """
+        tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Zurich'
+        time.tzset()
+        try:
+            store = EventStore(self.path)
+            self.store_events(store, 10)
+            self.assertEqual(5, store.count_events(EventType.TEMPERATURE, since=self.start))
+            self.assertEqual(2, store.count_events(EventType.TEMPERATURE, since=self.start,
+                                                   until=self.start + timedelta(seconds=4)))
+            store.close()
+        finally:
+            if tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = tz
+            time.tzset()
+
+    def test_resync_command(self):
+        """
+        ATC-0904: Test that the events of the period of a resync command are resent from the store and acknowledged.
+        """
+        store = EventStore(self.path)
+        self.store_events(store, 10)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            received, acks = loop.run_until_complete(asyncio.wait_for(self.run_resync(store), 10))
+        finally:
+            store.close()
+            loop.close()
+            asyncio.set_event_loop(asyncio.new_event_loop())
+
+        self.assertEqual([2, 3, 4, 5], received)
+        self.assertEqual([('r', AckStatus.OK), ('bad', AckStatus.FAILED)], [(ack.id, ack.get_status()) for ack in acks])
+
+    async def run_resync(self, store: EventStore):
+        received = []
+        acks = []
+        since, until = to_epoch_ms(self.start + timedelta(seconds=2)), to_epoch_ms(self.start + timedelta(seconds=6))
+
+        async def on_connection(websocket, *args):
+            await websocket.send(json.dumps({'msgType': MessageType.HELLO.value, 'codec': JSON_CODEC.name}))
+            await websocket.send(Command(CommandType.RESYNC, {'since': since, 'until': until}, id='r').serialize())
+            await websocket.send(Command(CommandType.RESYNC, {'until': until}, id='bad').serialize())
+            async for frame in websocket:
+                msg = JSON_CODEC.decode(frame)
+                if isinstance(msg, CommandAck):
+                    acks.append(msg)
+                elif isinstance(msg, Event):
+                    received.append(msg.value)
+
+        server = await websockets.serve(on_connection, '127.0.0.1', 0)
+        outpost = Outpost(server_address='ws://127.0.0.1:{}'.format(server.sockets[0].getsockname()[1]))
+        outpost.register_listener(ResyncListener(outpost, store.replay), [MessageType.COMMAND])
+        task = asyncio.ensure_future(outpost.run())
+
+        while len(acks) < 2 or len(received) < 4:
+            await asyncio.sleep(0.01)
+        outpost.stop()
+        await task
+        server.close()
+        await server.wait_closed()
+        return received, acks
+
@@ -0,0 +1,129 @@
+"""
+Config module.
+
+Tuning of the Orchestra: thresholds, sampling intervals and state timeouts.
+A configuration is never changed once created. Settings pushed by the server
+produce a new configuration, which replaces the current one as a whole.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from typing import Dict
+
+from outpost.message import Settings
+
+
+class OrchestraConfig:
+
+    # Name of the IMU and movement sampling jobs, the environmental jobs are named after their sensor.
+    IMU_JOB = 'IMU'
+    MOVEMENT_JOB = 'Movement'
+
+    # Factor by which a sensitivity of 1 scales a sensor's weight in the movement intensity.
+    MAX_SENSITIVITY_GAIN = 2.0
+
+    movement_threshold = 0.0
+    # Interval in seconds by sampling job name
+    intervals: Dict[str, float] = None
+    ready_to_idle_timeout = 0.0
+    ready_to_recording_timeout = 0.0
+    paused_to_idle_timeout = 0.0
+    data_density = 1.0
+    ir_sensitivity = 1.0
+    acc_sensitivity = 0.0
+    gyr_sensitivity = 0.0
+
+    def __init__(self, movement_threshold: float, intervals: Dict[str, float], ready_to_idle_timeout: float,
+                 ready_to_recording_timeout: float, paused_to_idle_timeout: float, data_density: float = 1.0,
+                 ir_sensitivity: float = 1.0, acc_sensitivity: float = 0.0, gyr_sensitivity: float = 0.0):
+        """
+        :param movement_threshold: {float} Intensities above this are movements.
+        :param intervals: {Dict[str, float]} Interval in seconds by sampling job name.
+        :param ready_to_idle_timeout: {float} Time in seconds without movement after which READY falls back to IDLE.
+        :param ready_to_recording_timeout: {float} Time in seconds in bed after which the recording starts.
+        :param paused_to_idle_timeout: {float} Time in seconds out of bed after which the recording stops.
+        :param data_density: {float} Scale of the number of environmental readings logged, see ``Deadband``.
+        :param ir_sensitivity: {float} Sensitivity of the IR sensor from 0 to 1. Defaults to accepting every
+        debounced pulse.
+        :param acc_sensitivity: {float} Sensitivity of the movement detection to the accelerometer from 0 to 1.
+        :param gyr_sensitivity: {float} Sensitivity of the movement detection to the gyroscope from 0 to 1.
+        """
+        self.movement_threshold = movement_threshold
+        self.intervals = dict(intervals)
+        self.ready_to_idle_timeout = ready_to_idle_timeout
+        self.ready_to_recording_timeout = ready_to_recording_timeout
+        self.paused_to_idle_timeout = paused_to_idle_timeout
+        self.data_density = data_density if data_density and data_density > 0 else 1.0
+        self.ir_sensitivity = self.__clamp(ir_sensitivity)
+        self.acc_sensitivity = self.__clamp(acc_sensitivity)
+        self.gyr_sensitivity = self.__clamp(gyr_sensitivity)
+
+    @staticmethod
+    def __clamp(sensitivity: float) -> float:
+        return max(0.0, min(1.0, sensitivity or 0.0))
+
+    def __eq__(self, other):
+        return isinstance(other, OrchestraConfig) and vars(self) == vars(other)
+
+    def replace(self, **changes):
+        """
+        :param changes: Attributes to be changed.
+        :return: {OrchestraConfig} Copy of this configuration with the given changes.
+        """
+        attributes = dict(vars(self))
+        attributes.update(changes)
+        return OrchestraConfig(**attributes)
+
+    def apply_settings(self, settings: Settings):
+        """
+        :param settings: {Settings} Settings pushed by the server. Missing and invalid values are ignored.
+        :return: {OrchestraConfig} Copy of this configuration with the settings applied.
+        """
+        def number(value):
+            # Settings are parsed from JSON, which may hold strings, lists or booleans where numbers are expected.
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        def positive(value):
+            return number(value) and value > 0
+
+        changes = {}
+        if positive(settings.movementThreshold):
+            changes['movement_threshold'] = settings.movementThreshold
+        for name, value in (('ready_to_idle_timeout', settings.readyToIdleTimeout),
+                            ('ready_to_recording_timeout', settings.readyToRecordingTimeout),
+                            ('paused_to_idle_timeout', settings.pausedToIdleTimeout)):
+            if positive(value):
+                changes[name] = value
+        for name, value in (('data_density', settings.dataDensity),
+                            ('ir_sensitivity', settings.irSensitivity),
+                            ('acc_sensitivity', settings.accSensitivity),
+                            ('gyr_sensitivity', settings.gyrSensitivity)):
+            if number(value):
+                changes[name] = value
+
+        intervals = dict(self.intervals)
+        if positive(settings.imuSampleRate):
+            intervals[self.IMU_JOB] = 1.0 / settings.imuSampleRate
+        if positive(settings.movementPollInterval):
+            intervals[self.MOVEMENT_JOB] = settings.movementPollInterval
+        if positive(settings.environmentPollInterval):
+            for name in intervals:
+                if name not in (self.IMU_JOB, self.MOVEMENT_JOB):
+                    intervals[name] = settings.environmentPollInterval
+        changes['intervals'] = intervals
+
+        return self.replace(**changes)
+
+    def get_movement_window(self) -> int:
+        """
+        :return: {int} Number of IMU samples per movement poll.
+        """
+        return max(2, int(round(self.intervals[self.MOVEMENT_JOB] / self.intervals[self.IMU_JOB])))
+
+    def get_gyro_gain(self) -> float:
+        return 1.0 + (self.MAX_SENSITIVITY_GAIN - 1.0) * self.gyr_sensitivity
+
+    def get_accel_gain(self) -> float:
+        return 1.0 + (self.MAX_SENSITIVITY_GAIN - 1.0) * self.acc_sensitivity
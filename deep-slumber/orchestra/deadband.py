@@ -0,0 +1,68 @@
+"""
+Deadband module.
+
+Suppresses readings of slowly changing sensors that do not differ
+noticeably from the last reported reading.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+class Deadband:
+    """
+    Reports a reading if it differs from the last reported reading by more
+    than the tolerance, or if nothing has been reported for ``max_silence``
+    seconds. The comparison is against the last *reported* reading, so slow
+    drifts are reported once they add up to the tolerance.
+    """
+
+    __tolerance = 0.0
+    __max_silence = 0.0
+    __last_value: float = None
+    __last_time: float = None
+
+    suppressed = 0
+
+    def __init__(self, tolerance: float, max_silence: float):
+        """
+        :param tolerance: {float} Change required for a reading to be reported.
+        :param max_silence: {float} Maximum time in seconds between two reported readings.
+        """
+        self.__tolerance = tolerance
+        self.__max_silence = max_silence
+        self.suppressed = 0
+        self.reset()
+
+    def get_tolerance(self) -> float:
+        return self.__tolerance
+
+    def get_max_silence(self) -> float:
+        return self.__max_silence
+
+    def configure(self, tolerance: float, max_silence: float):
+        self.__tolerance = tolerance
+        self.__max_silence = max_silence
+
+    def reset(self):
+        """
+        Forget the last reported reading, so that the next reading is reported.
+        """
+        self.__last_value = None
+        self.__last_time = None
+
+    def update(self, value: float, now: float) -> bool:
+        """
+        :param value: {float} New reading.
+        :param now: {float} Monotonic time of the reading in seconds.
+        :return: {bool} True if the reading is to be reported.
+        """
+        if (self.__last_value is None
+                or abs(value - self.__last_value) > self.__tolerance
+                or now - self.__last_time >= self.__max_silence):
+            self.__last_value = value
+            self.__last_time = now
+            return True
+
+        self.suppressed += 1
+        return False
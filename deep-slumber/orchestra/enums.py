@@ -7,3 +7,21 @@ class OrchestraState(Enum):
     READY = 2
     RECORDING = 3
     PAUSED = 4
+
+
+class StateInput(Enum):
+
+    IR_ACTIVITY = 1
+    MOVEMENT = 2
+    READY_TO_IDLE_TIMEOUT = 3
+    READY_TO_RECORDING_TIMEOUT = 4
+    PAUSED_TO_IDLE_TIMEOUT = 5
+    STOP_COMMAND = 6
+    START_COMMAND = 7
+
+
+class SleepStage(Enum):
+
+    WAKE = 0
+    LIGHT = 1
+    DEEP = 2
@@ -0,0 +1,155 @@
+"""
+IMU module.
+
+Buffers high-rate gyroscope and accelerometer samples and detects
+movements over windows of samples.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import numpy as np
+
+
+class ImuRingBuffer:
+    """
+    Fixed-size, preallocated ring buffer of IMU samples.
+    Each row holds gyroscope x, y, z (rad/s) followed by accelerometer x, y, z (g).
+    """
+
+    COLUMNS = 6
+
+    __data: np.ndarray = None
+    __capacity = 0
+    __index = 0
+    __count = 0
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: {int} Maximum number of samples held.
+        """
+        self.__data = np.zeros((capacity, self.COLUMNS), dtype=np.float64)
+        self.__capacity = capacity
+        self.__index = 0
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def get_capacity(self) -> int:
+        return self.__capacity
+
+    def push(self, gyro: dict, accel: dict):
+        """
+        Append a sample, overwriting the oldest one if the buffer is full.
+        :param gyro: {dict} Raw gyroscope reading with keys x, y, z.
+        :param accel: {dict} Raw accelerometer reading with keys x, y, z.
+        """
+        self.__data[self.__index] = (gyro['x'], gyro['y'], gyro['z'], accel['x'], accel['y'], accel['z'])
+        self.__index = (self.__index + 1) % self.__capacity
+        if self.__count < self.__capacity:
+            self.__count += 1
+
+    def latest(self, n: int) -> np.ndarray:
+        """
+        Return the latest ``n`` samples in chronological order.
+        :param n: {int} Number of samples. Limited to the number of buffered samples.
+        :return: {np.ndarray} Array of shape (n, 6).
+        """
+        n = min(n, self.__count)
+        start = self.__index - n
+        if start >= 0:
+            return self.__data[start:self.__index]
+        return np.concatenate((self.__data[start:], self.__data[:self.__index]))
+
+    def clear(self):
+        self.__index = 0
+        self.__count = 0
+
+
+class MovementScore:
+    """
+    Features of a window of IMU samples.
+    """
+
+    __slots__ = ('rms', 'highpass_energy', 'variance', 'intensity')
+
+    def __init__(self, rms: float, highpass_energy: float, variance: np.ndarray, gyro_gain: float = 1.0,
+                 accel_gain: float = 1.0):
+        """
+        :param rms: {float} RMS of the bias-corrected angular rate (rad/s).
+        :param highpass_energy: {float} Mean energy of the first difference of the acceleration (g^2).
+        :param variance: {np.ndarray} Variance per axis (gyro x, y, z, accel x, y, z).
+        :param gyro_gain: {float} Weight of the gyroscope in the intensity.
+        :param accel_gain: {float} Weight of the accelerometer in the intensity.
+        """
+        self.rms = rms
+        self.highpass_energy = highpass_energy
+        self.variance = variance
+        self.intensity = gyro_gain * rms + accel_gain * float(np.sqrt(highpass_energy))
+
+    def __str__(self):
+        return 'Movement rms={:.4f} hp={:.6f} intensity={:.4f}'.format(self.rms, self.highpass_energy, self.intensity)
+
+
+class MovementDetector:
+    """
+    Scores windows of IMU samples. All arithmetic is done on whole windows,
+    so the cost per sample does not depend on the sampling rate.
+    """
+
+    # Windows with a gyro variance below this value are considered quiet
+    # and are used to track the gyroscope's zero-rate bias.
+    QUIET_VARIANCE = 1e-4
+    BIAS_ADAPTION = 0.1
+
+    __buffer: ImuRingBuffer = None
+    __window_size = 0
+    __gyro_gain = 1.0
+    __accel_gain = 1.0
+    __bias: np.ndarray = None
+
+    def __init__(self, buffer: ImuRingBuffer, window_size: int):
+        """
+        :param buffer: {ImuRingBuffer} Buffer to read samples from.
+        :param window_size: {int} Number of samples per window.
+        """
+        self.__buffer = buffer
+        self.__window_size = window_size
+        self.__bias = np.zeros(3)
+
+    def configure(self, window_size: int, gyro_gain: float = 1.0, accel_gain: float = 1.0):
+        """
+        Must be called on the thread calling ``score()``.
+        :param window_size: {int} Number of samples per window, at most the capacity of the buffer.
+        :param gyro_gain: {float} Weight of the gyroscope in the movement intensity.
+        :param accel_gain: {float} Weight of the accelerometer in the movement intensity.
+        """
+        self.__window_size = max(2, min(window_size, self.__buffer.get_capacity()))
+        self.__gyro_gain = gyro_gain
+        self.__accel_gain = accel_gain
+
+    def get_window_size(self) -> int:
+        return self.__window_size
+
+    def score(self) -> MovementScore:
+        """
+        Score the latest window of samples.
+        :return: {MovementScore} Features of the window.
+        """
+        window = self.__buffer.latest(self.__window_size)
+        if len(window) < 2:
+            return MovementScore(0.0, 0.0, np.zeros(ImuRingBuffer.COLUMNS))
+
+        gyro = window[:, :3]
+        variance = window.var(axis=0)
+        gyro_mean = gyro.mean(axis=0)
+
+        if variance[:3].sum() < self.QUIET_VARIANCE:
+            self.__bias += self.BIAS_ADAPTION * (gyro_mean - self.__bias)
+
+        rms = float(np.sqrt(np.mean(np.square(gyro - self.__bias).sum(axis=1))))
+        highpass_energy = float(np.mean(np.square(np.diff(window[:, 3:], axis=0)).sum(axis=1)))
+
+        return MovementScore(rms, highpass_energy, variance, self.__gyro_gain, self.__accel_gain)
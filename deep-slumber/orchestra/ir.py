@@ -0,0 +1,152 @@
+"""
+IR module.
+
+Input stage for the infrared motion sensor. Edges are time stamped when the
+interrupt arrives and debounced in software: a level only counts once it has
+been stable for a while. Accepted pulses are merged into occupancy intervals,
+and only the start of an interval is passed on.
+
+At the default sensitivity of 1, every pulse that survives the debouncing is
+accepted, as the sensor's edges were before. Lower sensitivities reject pulses
+shorter than a minimum time, which the server has to ask for explicitly.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+import threading
+from typing import Callable, List, Tuple
+
+
+class IrInput:
+
+    # A low level must be stable for this time in seconds to be accepted.
+    DEBOUNCE_TIME = 0.05
+    # A high level must be stable for this time in seconds at sensitivity 0.
+    # Sensitivity 1 accepts any pulse that survives the debouncing.
+    MIN_PULSE_TIME = 0.5
+    DEFAULT_SENSITIVITY = 1.0
+    # Pulses less than this time in seconds apart belong to the same occupancy interval.
+    MERGE_GAP = 5.0
+    MAX_INTERVALS = 100
+
+    __clock = None
+    __on_occupancy: Callable[[float], None] = None
+    __lock: threading.Lock = None
+
+    __sensitivity = DEFAULT_SENSITIVITY
+    __raw_level = 0
+    __raw_edge_time = 0.0
+    __burst_start = 0.0
+    __level = 0
+    __last_edge_time: float = None
+    __settle_timer = None
+    __close_timer = None
+    __interval_start: float = None
+    __intervals: deque = None
+
+    # Counters
+    raw_edges = 0
+    accepted_edges = 0
+    occupancies = 0
+
+    def __init__(self, clock, on_occupancy: Callable[[float], None]):
+        """
+        :param clock: {Clock} Clock to time stamp edges with and to run the timers on.
+        :param on_occupancy: {Callable[[float], None]} Called with the start time when an occupancy interval starts.
+        """
+        self.__clock = clock
+        self.__on_occupancy = on_occupancy
+        self.__lock = threading.Lock()
+        self.__intervals = deque(maxlen=self.MAX_INTERVALS)
+        self.__sensitivity = self.DEFAULT_SENSITIVITY
+        self.raw_edges = self.accepted_edges = self.occupancies = 0
+
+    def set_sensitivity(self, sensitivity: float):
+        """
+        :param sensitivity: {float} Between 0 and 1. Higher values accept shorter pulses.
+        """
+        self.__sensitivity = min(max(sensitivity or 0.0, 0.0), 1.0)
+
+    def get_min_pulse_time(self) -> float:
+        return max(self.DEBOUNCE_TIME, self.MIN_PULSE_TIME * (1.0 - self.__sensitivity))
+
+    def on_edge(self, level: int, timestamp: float):
+        """
+        Raw edge as received by the interrupt handler. Never blocks.
+        :param level: {int} Level of the pin after the edge.
+        :param timestamp: {float} Monotonic time of the interrupt.
+        """
+        with self.__lock:
+            self.raw_edges += 1
+            if level == self.__raw_level:
+                return
+            self.__raw_level = level
+            self.__raw_edge_time = timestamp
+
+            # An accepted edge is dated back to the first edge of its burst.
+            if self.__settle_timer is None:
+                self.__burst_start = timestamp
+            else:
+                self.__settle_timer.cancel()
+            settle_time = self.get_min_pulse_time() if level else self.DEBOUNCE_TIME
+            self.__settle_timer = self.__clock.call_later(
+                max(0.0, timestamp + settle_time - self.__clock.monotonic()), self.__on_settled)
+
+    def __on_settled(self):
+        """
+        The raw level has been stable for its settle time.
+        """
+        occupancy_start = None
+        with self.__lock:
+            self.__settle_timer = None
+            if self.__raw_level == self.__level:
+                return
+            self.__level = self.__raw_level
+            self.__last_edge_time = self.__burst_start
+            self.accepted_edges += 1
+
+            if self.__level:
+                if self.__close_timer is not None:
+                    self.__close_timer.cancel()
+                    self.__close_timer = None
+                if self.__interval_start is None:
+                    self.__interval_start = occupancy_start = self.__burst_start
+                    self.occupancies += 1
+            else:
+                self.__close_timer = self.__clock.call_later(self.MERGE_GAP, self.__close_interval)
+
+        if occupancy_start is not None:
+            self.__on_occupancy(occupancy_start)
+
+    def __close_interval(self):
+        with self.__lock:
+            self.__close_timer = None
+            if self.__interval_start is not None and not self.__level:
+                self.__intervals.append((self.__interval_start, self.__last_edge_time))
+                self.__interval_start = None
+
+    def get_last_edge_time(self) -> float:
+        """
+        :return: {float} Monotonic time of the last accepted edge, None if there has been none.
+        """
+        return self.__last_edge_time
+
+    def is_occupied(self) -> bool:
+        return self.__interval_start is not None
+
+    def get_intervals(self) -> List[Tuple[float, float]]:
+        """
+        :return: {List[Tuple[float, float]]} Latest closed occupancy intervals as pairs of (start, end).
+        """
+        with self.__lock:
+            return list(self.__intervals)
+
+    def get_statistics(self) -> dict:
+        return {
+            'raw_edges': self.raw_edges,
+            'accepted_edges': self.accepted_edges,
+            'occupancies': self.occupancies,
+        }
@@ -0,0 +1,151 @@
+"""
+Lights module.
+
+Non-blocking front for a light bridge. Commands are handed to one worker
+thread, which sends them no faster than the bridge accepts. Pending commands
+for the same group collapse into one, so a slow bridge never builds up a
+backlog of outdated brightness steps.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import OrderedDict
+import threading
+import time
+
+from hardware.interfaces import LightBridgeBackend
+from orchestra.scheduler import JitterStatistics
+
+
+class LightActuator(LightBridgeBackend):
+
+    # The bridge handles about one group command per second.
+    MIN_INTERVAL = 1.0
+
+    __bridge: LightBridgeBackend = None
+    __min_interval = 0.0
+
+    # Pending command per group: state, transition time and time submitted
+    __pending: OrderedDict = None
+    __condition: threading.Condition = None
+    __sending = False
+    __closed = False
+    __last_sent: float = None
+    __thread: threading.Thread = None
+
+    __latency: JitterStatistics = None
+    __delay: JitterStatistics = None
+
+    # Counters
+    submitted = 0
+    sent = 0
+    coalesced = 0
+    failures = 0
+
+    def __init__(self, bridge: LightBridgeBackend, min_interval: float = MIN_INTERVAL):
+        """
+        :param bridge: {LightBridgeBackend} Bridge to send the commands to.
+        :param min_interval: {float} Minimum time in seconds between two commands.
+        """
+        self.__bridge = bridge
+        self.__min_interval = min_interval
+        self.__pending = OrderedDict()
+        self.__condition = threading.Condition()
+        self.__latency = JitterStatistics()
+        self.__delay = JitterStatistics()
+        self.submitted = self.sent = self.coalesced = self.failures = 0
+
+        self.__thread = threading.Thread(target=self.__run, name='LightActuator', daemon=True)
+        self.__thread.start()
+
+    def set_group(self, group_id, parameter, value=None, transitiontime=None):
+        """
+        Queue a group command and return immediately. A command still pending for the
+        same group is merged with this one, the newer values win.
+        See ``LightBridgeBackend.set_group()`` for the parameters.
+        """
+        state = dict(parameter) if isinstance(parameter, dict) else {parameter: value}
+        with self.__condition:
+            if self.__closed:
+                return
+            self.submitted += 1
+            pending = self.__pending.get(group_id)
+            if pending is not None:
+                pending[0].update(state)
+                pending[1] = transitiontime
+                self.coalesced += 1
+            else:
+                self.__pending[group_id] = [state, transitiontime, time.monotonic()]
+            self.__condition.notify_all()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                self.__sending = False
+                self.__condition.notify_all()
+                while not self.__pending and not self.__closed:
+                    self.__condition.wait()
+                if not self.__pending:
+                    return
+
+                # Rate limit. Commands arriving in the meantime are merged into the pending ones.
+                while self.__last_sent is not None and not self.__closed:
+                    remaining = self.__last_sent + self.__min_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+
+                group_id, (state, transitiontime, submitted_at) = self.__pending.popitem(last=False)
+                self.__sending = True
+
+            started = time.monotonic()
+            try:
+                self.__bridge.set_group(group_id, state, transitiontime=transitiontime)
+                self.sent += 1
+            except Exception:
+                self.failures += 1
+            finished = time.monotonic()
+            self.__last_sent = finished
+            self.__latency.add(finished - started)
+            self.__delay.add(finished - submitted_at)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until all pending commands have been sent.
+        :param timeout: {float} Maximum time to wait in seconds, None to wait indefinitely.
+        :return: {bool} True if no command is pending.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__condition:
+            while self.__pending or self.__sending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.__condition.wait(remaining)
+            return True
+
+    def close(self):
+        """
+        Send the pending commands without waiting for the rate limit and stop the worker.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def get_statistics(self) -> dict:
+        """
+        :return: {dict} Counters, the latency of the bridge and the delay from submitting to sending, in seconds.
+        """
+        with self.__condition:
+            return {
+                'submitted': self.submitted,
+                'sent': self.sent,
+                'coalesced': self.coalesced,
+                'failures': self.failures,
+                'pending': len(self.__pending),
+                'latency': self.__latency.as_dict(),
+                'delay': self.__delay.as_dict(),
+            }
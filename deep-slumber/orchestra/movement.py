@@ -0,0 +1,92 @@
+"""
+Movement module.
+
+Coalesces the movements detected during a recording into intervals. A
+movement less than the merge gap after the previous one extends the current
+interval, so a restless minute takes one event instead of one per poll.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import threading
+from typing import Callable
+
+
+class MovementCoalescer:
+
+    # Movements less than this time in seconds apart belong to the same interval.
+    MERGE_GAP = 5.0
+
+    __on_interval: Callable[[float, float, float], None] = None
+    __merge_gap = MERGE_GAP
+    __lock: threading.Lock = None
+
+    __start: float = None
+    __end: float = None
+    __intensity = 0.0
+
+    # Counters
+    movements = 0
+    intervals = 0
+
+    def __init__(self, on_interval: Callable[[float, float, float], None], merge_gap: float = MERGE_GAP):
+        """
+        :param on_interval: {Callable[[float, float, float], None]} Called with the start time, the end time and the
+        peak intensity of every completed interval.
+        :param merge_gap: {float} Movements less than this time in seconds apart are merged. 0 disables merging.
+        """
+        self.__on_interval = on_interval
+        self.__merge_gap = merge_gap
+        self.__lock = threading.Lock()
+        self.movements = self.intervals = 0
+
+    def add(self, t: float, intensity: float):
+        """
+        Add a movement. Completes the current interval first if the movement is too far from it.
+        :param t: {float} Monotonic time of the movement in seconds.
+        :param intensity: {float} Movement intensity.
+        """
+        with self.__lock:
+            self.movements += 1
+            completed = self.__complete_if(self.__start is not None and t - self.__end >= self.__merge_gap)
+            if self.__start is None:
+                self.__start = t
+                self.__intensity = 0.0
+            self.__end = t
+            self.__intensity = max(self.__intensity, intensity)
+        self.__emit(completed)
+
+    def poll(self, t: float):
+        """
+        Complete the current interval if no movement can extend it anymore.
+        :param t: {float} Current monotonic time in seconds.
+        """
+        with self.__lock:
+            completed = self.__complete_if(self.__start is not None and t - self.__end >= self.__merge_gap)
+        self.__emit(completed)
+
+    def flush(self):
+        """
+        Complete the current interval, e.g. at the end of a recording.
+        """
+        with self.__lock:
+            completed = self.__complete_if(self.__start is not None)
+        self.__emit(completed)
+
+    def is_open(self) -> bool:
+        return self.__start is not None
+
+    def __complete_if(self, condition: bool) -> tuple:
+        if not condition:
+            return None
+        completed = (self.__start, self.__end, self.__intensity)
+        self.__start = self.__end = None
+        self.intervals += 1
+        return completed
+
+    def __emit(self, completed: tuple):
+        # Called outside the lock, the callback may take its time.
+        if completed is not None and self.__on_interval is not None:
+            self.__on_interval(*completed)
@@ -10,19 +10,36 @@ __version__ = '1.0.0'
 
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import threading
-import time
-
-from phue import Bridge
-from RPi import GPIO
-from sense_hat import SenseHat
+import logging
+from typing import Callable, Dict, List
 
+from hardware.interfaces import DeviceBackend, SenseHatBackend
 from logger.logger import Logger
-from orchestra.enums import OrchestraState
-from outpost.enum import EventType
-from outpost.message import Event, Settings, AbstractMessage
+from orchestra.config import OrchestraConfig
+from orchestra.deadband import Deadband
+from orchestra.enums import OrchestraState, SleepStage, StateInput
+from orchestra.imu import ImuRingBuffer, MovementDetector
+from orchestra.ir import IrInput
+from orchestra.lights import LightActuator
+from orchestra.movement import MovementCoalescer
+from orchestra.sampler import SensorSampler
+from orchestra.sleep import SleepStageClassifier
+from orchestra.statemachine import InputRecord, StateMachine, Transition, TransitionRecord
+from outpost.enum import CommandType, EventType
+from outpost.message import Command, Event, MovementInterval, Settings, AbstractMessage
+from outpost.timing import EventClock
+
+
+log = logging.getLogger(__name__)
+
+def difference(vals: tuple):
+    """
+    :param vals: {tuple} Last and new value of a sensor.
+    :return: {float} Change of the value, 0 for the first value.
+    """
+    last_val, new_val = vals
+    return new_val - last_val if last_val is not None else 0
 
 
 class Orchestra(OutpostListener):
@@ -50,379 +67,599 @@ class Orchestra(OutpostListener):
     NUM_NORMALIZING_MOVEMENT_POLLS = 1
 
     MOVEMENT_POLL_INTERVAL = 1  # Every 5 seconds
+    IMU_SAMPLE_INTERVAL = 1 / 25  # 25 Hz
+    IMU_BUFFER_SIZE = 10 * 25  # 10 seconds of IMU samples
     TEMPERATURE_POLL_INTERVAL = 10  # Every 10 minutes
     PRESURE_POLL_INTERVAL = 10  # Every 10 minutes
     HUMIDITY_POLL_INTERVAL = 10  # Every 10 minutes
 
-    SENSEHAT_POLLING_STATE = {}
+    # Environmental readings are only logged if they have changed by more than
+    # their tolerance or if none has been logged for this time. Both are divided
+    # by the data density of the settings.
+    ENVIRONMENT_MAX_SILENCE = 15 * 60
+
+    # A new sleep stage is only logged once it has lasted this many epochs.
+    SLEEP_STAGE_MIN_EPOCHS = 2
+    # Movements less than this time in seconds apart are logged as one movement interval.
+    MOVEMENT_MERGE_GAP = MovementCoalescer.MERGE_GAP
+
     SENSEHAT_POLLING = (
         {
             'name': 'Temperature',
             'polling_fn_name': 'get_temperature',
             'handler_fn_name': 'on_temperature_signal',
-            'interval': TEMPERATURE_POLL_INTERVAL
+            'interval': TEMPERATURE_POLL_INTERVAL,
+            'diff_fn': difference,
+            'event_type': EventType.TEMPERATURE,
+            'tolerance': 0.2,  # °C
         }, {
             'name': 'Pressure',
             'polling_fn_name': 'get_pressure',
             'handler_fn_name': 'on_pressure_signal',
-            'interval': PRESURE_POLL_INTERVAL
+            'interval': PRESURE_POLL_INTERVAL,
+            'diff_fn': difference,
+            'event_type': EventType.PRESSURE,
+            'tolerance': 0.5,  # mbar
         }, {
             'name': 'Humidity',
             'polling_fn_name': 'get_humidity',
             'handler_fn_name': 'on_humidity_signal',
-            'interval': HUMIDITY_POLL_INTERVAL
-        }, {
-            'name': 'Movement',
-            'polling_fn_name': 'get_gyroscope_raw',
-            'handler_fn_name': 'on_movement_signal',
-            'interval': MOVEMENT_POLL_INTERVAL,
-            'diff_fn': lambda val: abs(val[1]['x'] - val[0]['x']) + abs(val[1]['y'] - val[0]['y']) + abs(val[1]['z'] - val[0]['z']) if val[
-                                                                                                                                           0] is not None else 0
+            'interval': HUMIDITY_POLL_INTERVAL,
+            'diff_fn': difference,
+            'event_type': EventType.HUMIDITY,
+            'tolerance': 1.0,  # %
         },
     )
 
+    TIMEOUTS = (
+        StateInput.READY_TO_IDLE_TIMEOUT,
+        StateInput.READY_TO_RECORDING_TIMEOUT,
+        StateInput.PAUSED_TO_IDLE_TIMEOUT,
+    )
+
+    # All state changes happen here. The actions are performed in order, after the
+    # state has changed. Inputs without entry are ignored in that state.
+    STATE_TABLE = {
+        # IR activity in IDLE state: Someone has entered the room. Start polling and
+        # go back to IDLE state if no further activity is registered.
+        (OrchestraState.IDLE, StateInput.IR_ACTIVITY): Transition(
+            OrchestraState.READY, ('log_state_change', 'start_sensors', 'arm_ready_to_idle')),
+
+        # IR activity while RECORDING: The user has left the bed. Pause the recording and
+        # end it if the user does not return.
+        (OrchestraState.RECORDING, StateInput.IR_ACTIVITY): Transition(
+            OrchestraState.PAUSED, ('flush_movement', 'log_state_change', 'log_pause', 'arm_paused_to_idle')),
+
+        # Movement after IR activity: The user has entered the bed. Start recording unless
+        # there is further IR activity.
+        (OrchestraState.READY, StateInput.MOVEMENT): Transition(
+            None, ('cancel_ready_to_idle', 'arm_ready_to_recording')),
+        (OrchestraState.RECORDING, StateInput.MOVEMENT): Transition(
+            None, ('cancel_ready_to_idle', 'log_movement')),
+
+        # Movement while PAUSED, not right after IR activity: The user is back in bed.
+        (OrchestraState.PAUSED, StateInput.MOVEMENT): Transition(
+            OrchestraState.RECORDING,
+            ('cancel_ready_to_idle', 'log_state_change', 'log_resume', 'cancel_paused_to_idle'),
+            guard=lambda movement: movement[2] > 2),
+
+        (OrchestraState.READY, StateInput.READY_TO_RECORDING_TIMEOUT): Transition(
+            OrchestraState.RECORDING, ('log_state_change', 'log_start', 'reset_deadbands', 'reset_sleep_stage', 'lights_off')),
+        (OrchestraState.PAUSED, StateInput.READY_TO_RECORDING_TIMEOUT): Transition(
+            OrchestraState.RECORDING, ('log_state_change', 'log_start', 'reset_deadbands', 'reset_sleep_stage', 'lights_off')),
+
+        (OrchestraState.READY, StateInput.READY_TO_IDLE_TIMEOUT): Transition(
+            OrchestraState.IDLE, ('cancel_all', 'log_state_change', 'stop_sensors')),
+
+        # The user has not returned, tell the server that the current recording should stop.
+        (OrchestraState.PAUSED, StateInput.PAUSED_TO_IDLE_TIMEOUT): Transition(
+            OrchestraState.IDLE, ('cancel_all', 'log_stop', 'log_state_change', 'stop_sensors')),
+
+        # The server starts the recording right away, or resumes a paused one.
+        (OrchestraState.IDLE, StateInput.START_COMMAND): Transition(
+            OrchestraState.RECORDING,
+            ('log_state_change', 'start_sensors', 'log_start', 'reset_deadbands', 'reset_sleep_stage', 'lights_off')),
+        (OrchestraState.READY, StateInput.START_COMMAND): Transition(
+            OrchestraState.RECORDING,
+            ('cancel_all', 'log_state_change', 'log_start', 'reset_deadbands', 'reset_sleep_stage', 'lights_off')),
+        (OrchestraState.PAUSED, StateInput.START_COMMAND): Transition(
+            OrchestraState.RECORDING, ('cancel_all', 'log_state_change', 'log_resume')),
+
+        # The server stops the recording.
+        (OrchestraState.READY, StateInput.STOP_COMMAND): Transition(
+            OrchestraState.IDLE, ('cancel_all', 'log_state_change', 'stop_sensors')),
+        (OrchestraState.RECORDING, StateInput.STOP_COMMAND): Transition(
+            OrchestraState.IDLE, ('cancel_all', 'flush_movement', 'log_stop', 'log_state_change', 'stop_sensors')),
+        (OrchestraState.PAUSED, StateInput.STOP_COMMAND): Transition(
+            OrchestraState.IDLE, ('cancel_all', 'log_stop', 'log_state_change', 'stop_sensors')),
+    }
+
     __logger: Logger = None
     __settings: Settings = None
 
-    __state: OrchestraState = OrchestraState.IDLE
+    __state_machine: StateMachine = None
+
+    __backend: DeviceBackend = None
+    __clock = None
+    # Stamps events on the backend's time
+    __event_clock: EventClock = None
+    __gpio = None
+    __sensehat: SenseHatBackend = None
+    __lights: LightActuator = None
 
-    __sensehat: SenseHat = None
-    __phue_bridge: Bridge = None
+    # Configuration in effect and the latest one requested, which may not be in effect yet
+    __config: OrchestraConfig = None
+    __requested_config: OrchestraConfig = None
 
     __lastMovementTime: datetime = None
-    __lastIRTime: datetime = None
+    __ir_input: IrInput = None
 
-    __ready_to_idle_state_timer = None
-    __ready_to_ready_to_recording_timer = None
-    __paused_to_idle_timer = None
+    # Pending timeouts: token and timer per timeout input
+    __timeouts: Dict[StateInput, tuple] = None
+    __timeout_token = 0
     __normalizing_polls = 0
     __thread_pool_executor = None
+    __sampler: SensorSampler = None
+    __imu_buffer: ImuRingBuffer = None
+    __movement_detector: MovementDetector = None
+    __deadbands: Dict[EventType, Deadband] = None
+    __movement_listeners: List[Callable[[float, float], None]] = None
+    __occupancy_listeners: List[Callable[[float], None]] = None
+    __sleep_stage_classifier: SleepStageClassifier = None
+    __logged_sleep_stage: SleepStage = None
+    __pending_sleep_stage: tuple = None
+    __movement_coalescer: MovementCoalescer = None
 
     __loop = None
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, backend: DeviceBackend = None, record_inputs: bool = False,
+                 config: OrchestraConfig = None):
+        """
+        :param logger: {Logger} Logger to log events with.
+        :param backend: {DeviceBackend} Devices to operate on. Defaults to the Raspberry Pi drivers.
+        :param record_inputs: {bool} Record the inputs and transitions of the state machine, e.g. to replay them.
+        :param config: {OrchestraConfig} Initial configuration. Defaults to the class constants.
+        """
+        if backend is None:
+            from hardware.raspberrypi import RaspberryPiBackend
+            backend = RaspberryPiBackend()
+
         self.__loop = asyncio.get_event_loop()
         self.__logger = logger
+        self.__backend = backend
+        self.__clock = backend.clock
+        self.__event_clock = EventClock(self.__clock.monotonic_ns, self.__clock.time_ns)
+        self.__gpio = backend.gpio
+        self.__thread_pool_executor = backend.create_executor()
+        self.__timeouts = {}
+        self.__timeout_token = 0
+        self.__movement_listeners = []
+        self.__occupancy_listeners = []
+        self.__config = self.__requested_config = config if config is not None else self.create_default_config()
+        self.__sleep_stage_classifier = SleepStageClassifier(self.__on_sleep_stage, threshold=self.MOVEMENT_THREASHOLD)
+        self.__movement_coalescer = MovementCoalescer(self.__on_movement_interval, merge_gap=self.MOVEMENT_MERGE_GAP)
+        self.__state_machine = StateMachine(
+            OrchestraState.IDLE, self.STATE_TABLE, actions=self.__create_actions(), accept=self.__accept_input,
+            clock=self.__clock, record=record_inputs
+        )
+        self.__deadbands = {
+            poll_info['event_type']: Deadband(poll_info['tolerance'], self.ENVIRONMENT_MAX_SILENCE)
+            for poll_info in self.SENSEHAT_POLLING
+        }
         self.__set_up_IR()
-        self.__thread_pool_executor = ThreadPoolExecutor()
 
         self.__set_up_sensehat()
-        # self.__phue_bridge = Bridge('192.168.1.129')
+        self.__apply_config(self.__config)
+        bridge = backend.create_bridge()
+        self.__lights = LightActuator(bridge) if bridge is not None else None
+
+    @classmethod
+    def create_default_config(cls) -> OrchestraConfig:
+        """
+        :return: {OrchestraConfig} Configuration made of the class constants.
+        """
+        intervals = {poll_info['name']: poll_info['interval'] for poll_info in cls.SENSEHAT_POLLING}
+        intervals[OrchestraConfig.IMU_JOB] = cls.IMU_SAMPLE_INTERVAL
+        intervals[OrchestraConfig.MOVEMENT_JOB] = cls.MOVEMENT_POLL_INTERVAL
+        return OrchestraConfig(
+            movement_threshold=cls.MOVEMENT_THREASHOLD,
+            intervals=intervals,
+            ready_to_idle_timeout=cls.READY_TO_IDLE_STATE_TIMEOUT,
+            ready_to_recording_timeout=cls.READY_TO_RECORDING_STATE_TIMEOUT,
+            paused_to_idle_timeout=cls.PAUSED_TO_IDLE_STATE_TIMEOUT
+        )
 
-    def __activate_ready_to_idle_timeout(self):
+    def configure(self, config: OrchestraConfig):
         """
-        Creates a timer that puts the system in IDLE state after it has been in READY state.
+        Reconfigure while running, without restarting the sampling thread. The new configuration takes effect
+        as a whole between two sampling jobs: sampling intervals, movement detection, environmental deadbands
+        and IR sensitivity at once. State timeouts already armed keep their deadline.
+        :param config: {OrchestraConfig} New configuration.
         """
-        if self.__ready_to_idle_state_timer is not None:
-            self.__cancel_ready_to_idle_timeout()
-        self.__ready_to_idle_state_timer = threading.Timer(self.READY_TO_IDLE_STATE_TIMEOUT, self.__go_to_idle_state)
-        self.__ready_to_idle_state_timer.start()
+        self.__requested_config = config
+        self.__sampler.reconfigure(config.intervals, lambda: self.__apply_config(config))
 
-    def __cancel_ready_to_idle_timeout(self):
+    def __apply_config(self, config: OrchestraConfig):
         """
-        Cancels the timer for IDLE state.
+        Called on the sampling thread, or before it has started.
         """
-        if self.__ready_to_idle_state_timer is not None:
-            self.__ready_to_idle_state_timer.cancel()
-            self.__ready_to_idle_state_timer = None
+        window = config.get_movement_window()
+        if window > self.IMU_BUFFER_SIZE:
+            log.warning('Movement window of %d IMU samples clamped to the buffer size of %d', window, self.IMU_BUFFER_SIZE)
+        self.__movement_detector.configure(window, config.get_gyro_gain(), config.get_accel_gain())
+        for poll_info in self.SENSEHAT_POLLING:
+            self.__deadbands[poll_info['event_type']].configure(
+                poll_info['tolerance'] / config.data_density, self.ENVIRONMENT_MAX_SILENCE / config.data_density)
+        self.__ir_input.set_sensitivity(config.ir_sensitivity)
+        self.__sleep_stage_classifier.set_threshold(config.movement_threshold)
+        self.__config = config
 
-    def __activate_paused_to_idle_timeout(self):
+    def get_config(self) -> OrchestraConfig:
         """
-        Creates a timer that puts the system in IDLE state after it has been in PAUSED state.
+        :return: {OrchestraConfig} Configuration in effect.
         """
-        if self.__paused_to_idle_timer is not None:
-            self.__cancel_paused_to_idle_timeout()
+        return self.__config
 
-        self.__paused_to_idle_timer = threading.Timer(self.PAUSED_TO_IDLE_STATE_TIMEOUT, self.__go_to_idle_state)
-        self.__paused_to_idle_timer.start()
+    def get_state(self) -> OrchestraState:
+        return self.__state_machine.get_state()
+
+    def set_data_density(self, data_density: float):
+        """
+        Scale how many environmental readings are logged. A data density of 2 halves
+        the tolerances and the maximum silence of all environmental sensors.
+        :param data_density: {float} Data density, 1 is the default. Values <= 0 are treated as 1.
+        """
+        self.configure(self.__requested_config.replace(data_density=data_density))
 
-    def __cancel_paused_to_idle_timeout(self):
+    def get_suppressed_readings(self) -> dict:
         """
-        Cancels the timer for IDLE state after PAUSED state.
+        :return: {dict} Number of environmental readings not logged, per event type name.
         """
-        if self.__paused_to_idle_timer is not None:
-            self.__paused_to_idle_timer.cancel()
-            self.__paused_to_idle_timer = None
+        return {event_type.name: deadband.suppressed for event_type, deadband in self.__deadbands.items()}
 
-    def __activate_ready_to_recording_timeout(self):
+    def __arm_timeout(self, timeout: StateInput, delay: float):
         """
-        Creates a timer that activates sleep cycle recording after the system has been in READY state.
+        Arms a timer posting the given timeout input to the state machine.
+        Re-arming replaces the pending timer of the same timeout.
+        :param timeout: {StateInput} Timeout input.
+        :param delay: {float} Delay in seconds.
         """
-        if self.__ready_to_ready_to_recording_timer is None:
-            self.__ready_to_ready_to_recording_timer = threading.Timer(self.READY_TO_RECORDING_STATE_TIMEOUT, self.__go_to_recording_state)
-            self.__ready_to_ready_to_recording_timer.start()
+        self.__cancel_timeout(timeout)
+        self.__timeout_token += 1
+        token = self.__timeout_token
+        self.__timeouts[timeout] = (token, self.__clock.call_later(delay, lambda: self.__state_machine.post(timeout, token)))
 
-    def __cancel_ready_to_recording_timeout(self):
+    def __cancel_timeout(self, timeout: StateInput):
         """
-        Cancels timer for sleep cycle recording.
+        Cancels the timer of the given timeout. If it has fired already, its input is discarded by ``__accept_input()``.
+        :param timeout: {StateInput} Timeout input.
         """
-        if self.__ready_to_ready_to_recording_timer is not None:
-            self.__ready_to_ready_to_recording_timer.cancel()
-            self.__ready_to_ready_to_recording_timer = None
+        token_and_timer = self.__timeouts.pop(timeout, None)
+        if token_and_timer is not None:
+            token_and_timer[1].cancel()
 
-    def __cancel_all_timeouts(self):
+    def __accept_input(self, state_input: StateInput, payload) -> bool:
         """
-        Cancels all timeouts.
+        Discards timeout inputs of timers that have been cancelled or re-armed after they fired.
         """
-        self.__cancel_ready_to_idle_timeout()
-        self.__cancel_ready_to_recording_timeout()
+        if state_input in self.TIMEOUTS:
+            token_and_timer = self.__timeouts.get(state_input)
+            if token_and_timer is None or token_and_timer[0] != payload:
+                return False
+            del self.__timeouts[state_input]
+        return True
 
     def __set_up_IR(self):
         """
         Set up Infrared Sensor. The sensor is set up in INTERRUPT mode.
         IR events are relatively sparse and are ideal to "wake up" the system from IDLE state.
         """
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.IR_SENSOR_PIN, GPIO.IN)
-        GPIO.add_event_detect(self.IR_SENSOR_PIN, GPIO.BOTH, self.on_IR_signal)
+        self.__gpio.setmode(self.__gpio.BCM)
+        self.__gpio.setup(self.IR_SENSOR_PIN, self.__gpio.IN)
+        # Debouncing is done in software by the IR input stage, which sees every edge.
+        self.__ir_input = IrInput(self.__clock, self.__on_occupancy)
+        self.__gpio.add_event_detect(self.IR_SENSOR_PIN, self.__gpio.BOTH, self.on_IR_signal)
 
     def __set_up_sensehat(self):
         """
         Set up Sense Hat. Since it's not possible to use interrupt mode, we resort to
         simple polling. The polling will, however, be done in a separate thread.
+        The Sense Hat is opened once and the polling thread runs for the lifetime
+        of the orchestra. It is paused while in IDLE state.
         """
-        self.__sensehat = SenseHat()
-        try:
-            asyncio.get_event_loop()
-        except RuntimeError:
-            asyncio.set_event_loop(asyncio.new_event_loop())
+        self.__sensehat = self.__backend.create_sensehat()
+        self.__imu_buffer = ImuRingBuffer(self.IMU_BUFFER_SIZE)
+        self.__movement_detector = MovementDetector(self.__imu_buffer, window_size=self.__config.get_movement_window())
+
+        intervals = self.__config.intervals
+        sampler = SensorSampler(self.__clock, self.__sensehat, self.__imu_buffer)
+        for poll_info in self.SENSEHAT_POLLING:
+            sampler.add_job(poll_info['name'], intervals[poll_info['name']], self.__create_polling_job(poll_info))
+        sampler.add_job(OrchestraConfig.IMU_JOB, intervals[OrchestraConfig.IMU_JOB], self.__create_imu_sampling_job())
+        sampler.add_job(OrchestraConfig.MOVEMENT_JOB, intervals[OrchestraConfig.MOVEMENT_JOB], self.__detect_movement)
 
-        asyncio.get_event_loop().run_in_executor(self.__thread_pool_executor, self.__run_sensehat_polling)
+        self.__sampler = sampler
+        self.__thread_pool_executor.submit(sampler.run)
 
-    def __go_to_idle_state(self):
+    def __start_sensors(self, payload=None):
         """
-        Handles the transition from any state to IDLE state.
+        Resume polling. Movements are only considered after some polls, see ``on_movement_signal()``.
         """
-        self.__cancel_all_timeouts()
+        self.__normalizing_polls = 0
+        self.__sampler.resume()
 
-        # If we're in PAUSED state, we need to tell the server
-        # that the current recording should stop.
-        if self.__state == OrchestraState.PAUSED:
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.STOP_REC
-                )
-            )
+    # ================================== State Machine Actions =====================================
+    def __create_actions(self) -> dict:
+        """
+        :return: {dict} Actions of the transition table by name.
+        """
+        return {
+            'log_state_change': lambda payload: self.__log_event(
+                EventType.STATE_CHANGE, self.__state_machine.get_state().value),
+            'log_start': lambda payload: self.__log_event(EventType.START_REC),
+            'log_stop': lambda payload: self.__log_event(EventType.STOP_REC),
+            'log_pause': lambda payload: self.__log_event(EventType.PAUSE_REC),
+            'log_resume': lambda payload: self.__log_event(EventType.RESUME_REC),
+            'log_movement': self.__log_movement,
+            'flush_movement': lambda payload: self.__movement_coalescer.flush(),
+            'start_sensors': self.__start_sensors,
+            'stop_sensors': lambda payload: self.__sampler.pause(),
+            'reset_deadbands': self.__reset_deadbands,
+            'reset_sleep_stage': self.__reset_sleep_stage,
+            'lights_off': self.__switch_lights_off,
+            'arm_ready_to_idle': lambda payload: self.__arm_timeout(
+                StateInput.READY_TO_IDLE_TIMEOUT, self.__config.ready_to_idle_timeout),
+            'cancel_ready_to_idle': lambda payload: self.__cancel_timeout(StateInput.READY_TO_IDLE_TIMEOUT),
+            'arm_ready_to_recording': self.__arm_ready_to_recording_timeout,
+            'arm_paused_to_idle': lambda payload: self.__arm_timeout(
+                StateInput.PAUSED_TO_IDLE_TIMEOUT, self.__config.paused_to_idle_timeout),
+            'cancel_paused_to_idle': lambda payload: self.__cancel_timeout(StateInput.PAUSED_TO_IDLE_TIMEOUT),
+            'cancel_all': self.__cancel_all_timeouts,
+        }
 
-        self.__logger.log_event(
-            Event(
-                event_type=EventType.STATE_CHANGE,
-                value=OrchestraState.IDLE.value
-            )
-        )
+    def __arm_ready_to_recording_timeout(self, payload=None):
+        """
+        Arms the timer that activates sleep cycle recording, unless it is pending already.
+        """
+        if StateInput.READY_TO_RECORDING_TIMEOUT not in self.__timeouts:
+            self.__arm_timeout(StateInput.READY_TO_RECORDING_TIMEOUT, self.__config.ready_to_recording_timeout)
 
-        self.__state = OrchestraState.IDLE
+    def __cancel_all_timeouts(self, payload=None):
+        for timeout in self.TIMEOUTS:
+            self.__cancel_timeout(timeout)
 
-    def __go_to_recording_state(self):
+    def __reset_deadbands(self, payload=None):
         """
-        Handles the transition from states READY or PAUSED to RECORDING state.
+        Makes sure the first environmental readings of a recording are logged in any case.
         """
-        if self.__state in (OrchestraState.READY, OrchestraState.PAUSED):
+        for deadband in self.__deadbands.values():
+            deadband.reset()
 
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.STATE_CHANGE,
-                    value=OrchestraState.RECORDING.value
-                )
-            )
+    def __reset_sleep_stage(self, payload=None):
+        """
+        Classifies the sleep stages of a new recording from scratch.
+        """
+        self.__sleep_stage_classifier.reset()
+        self.__logged_sleep_stage = None
+        self.__pending_sleep_stage = None
 
-            # Tell server to start a new sleep cycle recording
-            self.__logger.log_event(
-                Event(event_type=EventType.START_REC)
-            )
+    def __switch_lights_off(self, payload=None):
+        """
+        Dims lights to 'off' during 10 Seconds.
+        """
+        if self.__lights is not None:
+            self.__lights.set_group(self.GROUP, {'on': False}, transitiontime=100)
 
-            self.__state = OrchestraState.RECORDING
+    def __log_movement(self, payload: tuple):
+        """
+        Records a movement. Movements are merged into intervals, which are logged once complete.
+        :param payload: {tuple} Time, intensity and time since the last IR activity of the movement.
+        """
+        t, intensity, _ = payload
+        self.__movement_coalescer.add(t, intensity)
+        self.__normalizing_polls = 0
 
-            # Dim lights to 'off' during 10 Seconds.
-            try:
-                self.__phue_bridge.set_group(self.GROUP, {'on': False}, transitiontime=100)
-            except:
-                pass
+    def __log_event(self, event_type: EventType, value=0):
+        """
+        Logs an event stamped on the backend's time.
+        """
+        self.__logger.log_event(Event(event_type, value=value, clock=self.__event_clock))
 
-    def __go_to_paused_state(self):
+    def __on_movement_interval(self, start: float, end: float, intensity: float):
         """
-        Handles transition from RECORDING state to PAUSED state.
+        Logs a completed movement interval as one event.
         """
-        if self.__state == OrchestraState.RECORDING:
-            self.__state = OrchestraState.PAUSED
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.STATE_CHANGE,
-                    value=OrchestraState.PAUSED.value
-                )
-            )
+        interval = MovementInterval(intensity=intensity, clock=self.__event_clock)
+        interval.epoch_ms = self.__event_clock.to_epoch_ms(int(round(start * 1e9)))
+        interval.end_ms = self.__event_clock.to_epoch_ms(int(round(end * 1e9)))
+        self.__logger.log_event(interval)
 
-    def __run_sensehat_polling(self):
+    def get_transition_latency(self) -> dict:
         """
-        Main Sensor polling routine. Run only if system is not in IDLE state.
+        :return: {dict} Statistics in seconds of the time from posting an input to completing its transition, by input.
         """
+        return self.__state_machine.get_latency_statistics()
 
-        self.__normalizing_polls = 0
-        while self.__state != OrchestraState.IDLE:
+    def get_input_log(self) -> List[InputRecord]:
+        """
+        :return: {List[InputRecord]} Inputs processed by the state machine. Only recorded if enabled in the constructor.
+        """
+        return self.__state_machine.get_input_log()
 
-            for poll_info in self.SENSEHAT_POLLING:
+    def get_transitions(self) -> List[TransitionRecord]:
+        """
+        :return: {List[TransitionRecord]} Transitions taken by the state machine. Only recorded if enabled in the constructor.
+        """
+        return self.__state_machine.get_transitions()
 
-                poll_name = poll_info.get('name')
-                poll_fn = poll_info.get('polling_fn_name', None)
-                handler_fn = poll_info.get('handler_fn_name', lambda x: x)
-                diff_fn = poll_info.get('diff_fn', lambda x: 0)
-                poll_interval = poll_info.get('interval')
 
-                poll_state = self.SENSEHAT_POLLING_STATE.get(poll_name, {})
-                last_poll_time = poll_state.get('last_poll', None)
+    def __create_polling_job(self, poll_info: dict):
+        """
+        Create a scheduler job that polls one Sense Hat sensor and passes
+        the value and its difference to the last value to the sensor's handler.
+        :param poll_info: {dict} Entry of ``SENSEHAT_POLLING``.
+        :return: {Callable} Polling job.
+        """
+        poll_fn = getattr(self.__sensehat, poll_info['polling_fn_name'])
+        handler_fn = getattr(self, poll_info['handler_fn_name'])
+        diff_fn = poll_info.get('diff_fn')
+        last_val = None
 
-                if poll_fn is not None and (last_poll_time is None or (datetime.now() - last_poll_time).seconds >= poll_interval):
-                    old_val = poll_state.get('value', None)
-                    new_val = getattr(self.__sensehat, poll_fn)()
-                    poll_state['last_poll'] = datetime.now()
+        def poll():
+            nonlocal last_val
+            new_val = poll_fn()
+            diff = diff_fn((last_val, new_val)) if diff_fn else 0
+            last_val = new_val
+            handler_fn(new_val, diff)
 
-                    diff = 0
-                    if diff_fn:
-                        diff = diff_fn((old_val, new_val))
+        return poll
 
-                    poll_state['value'] = new_val
-                    if handler_fn:
-                        getattr(self, handler_fn)(poll_state.get('value'), diff)
+    def __create_imu_sampling_job(self):
+        """
+        Create a scheduler job that appends one gyroscope and accelerometer sample
+        to the IMU buffer. No further processing is done per sample.
+        :return: {Callable} Sampling job.
+        """
+        get_gyroscope_raw = self.__sensehat.get_gyroscope_raw
+        get_accelerometer_raw = self.__sensehat.get_accelerometer_raw
+        push = self.__imu_buffer.push
 
-                    self.SENSEHAT_POLLING_STATE[poll_name] = poll_state
+        def sample():
+            push(get_gyroscope_raw(), get_accelerometer_raw())
 
-            time.sleep(1)
+        return sample
 
-    def on_IR_signal(self, val):
+    def __detect_movement(self):
         """
-        Handler for infrared signals.
+        Score the latest window of IMU samples and pass the result to the movement handler.
         """
+        score = self.__movement_detector.score()
+        self.on_movement_signal(score, score.intensity)
 
-        self.__lastIRTime = datetime.now()
-
-        if GPIO.input(self.IR_SENSOR_PIN) == 1:
+    def get_sensor_jitter(self) -> dict:
+        """
+        :return: {dict} Timing jitter statistics in seconds per polled sensor.
+        """
+        return self.__sampler.get_jitter_statistics()
 
-            # If movement registered and system in IDLE state,
-            # activate READY state and start polling.
-            if self.__state == OrchestraState.IDLE:
+    def get_sensor_wake_latency(self) -> dict:
+        """
+        :return: {dict} Statistics in seconds of the time from leaving IDLE state to the first sensor poll.
+        """
+        return self.__sampler.get_wake_latency()
 
-                self.__logger.log_event(
-                    Event(
-                        event_type=EventType.STATE_CHANGE,
-                        value=OrchestraState.READY.value
-                    )
-                )
-                self.__state = OrchestraState.READY
-                self.__set_up_sensehat()
+    def __on_occupancy(self, start: float):
+        self.__state_machine.post(StateInput.IR_ACTIVITY, start)
+        for listener in self.__occupancy_listeners:
+            listener(start)
 
-                # If no further activity is registered,
-                # go back to idle state
-                self.__activate_ready_to_idle_timeout()
+    def add_occupancy_listener(self, listener: Callable[[float], None]):
+        """
+        Register a function to be called with the monotonic start time of every occupancy interval of the IR sensor,
+        i.e. whenever someone starts moving about the room. Listeners are called on the clock's timer thread.
+        :param listener: {Callable[[float], None]} Listener.
+        """
+        self.__occupancy_listeners.append(listener)
 
-            # If movement registered and system in RECORDING state
-            # this means that the user has left the bed and we need to pause
-            # the current recording.
-            elif self.__state == OrchestraState.RECORDING:
+    def on_IR_signal(self, val):
+        """
+        Handler for infrared signals. Only time stamps the edge and hands it to the IR input
+        stage, which posts IR activity once per occupancy interval.
+        """
+        timestamp = self.__clock.monotonic()
+        self.__ir_input.on_edge(self.__gpio.input(self.IR_SENSOR_PIN), timestamp)
 
-                self.__logger.log_event(
-                    Event(
-                        event_type=EventType.STATE_CHANGE,
-                        value=OrchestraState.PAUSED.value
-                    )
-                )
+    def get_ir_statistics(self) -> dict:
+        """
+        :return: {dict} Number of raw and accepted IR edges and of occupancy intervals.
+        """
+        return self.__ir_input.get_statistics()
 
-                self.__state = OrchestraState.PAUSED
-                self.__logger.log_event(
-                    Event(
-                        event_type=EventType.PAUSE_REC
-                    )
-                )
+    def get_movement_statistics(self) -> dict:
+        """
+        :return: {dict} Number of movements recorded and of movement intervals logged for them.
+        """
+        return {
+            'movements': self.__movement_coalescer.movements,
+            'intervals': self.__movement_coalescer.intervals,
+        }
 
-                # If no further activity is registered, this means
-                # that the user has gotten up and will not return.
-                # In this case, we need to end the recording and return
-                # to IDLE state.
-                self.__activate_paused_to_idle_timeout()
+    def add_movement_listener(self, listener: Callable[[float, float], None]):
+        """
+        Register a function to be called with the monotonic time and the intensity of every movement poll.
+        Listeners are called on the sampling thread and must not block.
+        :param listener: {Callable[[float, float], None]} Listener.
+        """
+        self.__movement_listeners.append(listener)
 
     def on_movement_signal(self, value, diff):
         """
         Handles Gyroscope movement events.
-        :param value:
-        :param diff:
-        :return:
-        """
-
-        if diff > self.MOVEMENT_THREASHOLD and self.__normalizing_polls > self.NUM_NORMALIZING_MOVEMENT_POLLS:
-
-            # If there's movement, prevent the system from going into
-            # idle mode.
-            self.__cancel_ready_to_idle_timeout()
-
-            # If the movement has been registered after IR activity
-            # this means that the user has entered the bed.
-            # If no other IR activity will be registered for a specific duration, we start recording
-            if self.__state == OrchestraState.READY:
-                self.__activate_ready_to_recording_timeout()
-
-            # If we're already in RECORDING state, we just record the movement as event
-            # and send it to the server.
-            elif self.__state == OrchestraState.RECORDING:
-                if diff > self.MOVEMENT_THREASHOLD:
-
-                    # TODO: This is a hack out of pure convenience. Movements are logged as binary state ('movement', 'no movement').
-                    # In order for a movement to be 'visible' we log to extra events around the actual event with value 0.
-                    # This should be moved to the server so that the hardware can simply log one event.
-                    self.__logger.log_event(
-                        Event(
-                            event_type=EventType.MOVEMENT,
-                            value=0
-                        )
-                    )
-                    self.__logger.log_event(
-                        Event(
-                            event_type=EventType.MOVEMENT,
-                            value=1
-                        )
-                    )
-                    self.__logger.log_event(
-                        Event(
-                            event_type=EventType.MOVEMENT,
-                            value=0
-                        )
-                    )
-                    self.__normalizing_polls = 0
-
-            # If we're in PAUSED state (i.e. user has gotten up temporarily), we should resume the recording
-            # as soon as further movement is registered.
-            elif self.__state == OrchestraState.PAUSED and (datetime.now() - self.__lastIRTime).seconds > 2:
-                self.__state = OrchestraState.RECORDING
-                self.__logger.log_event(
-                    Event(
-                        event_type=EventType.STATE_CHANGE,
-                        value=OrchestraState.RECORDING.value
-                    )
-                )
-                self.__logger.log_event(
-                    Event(
-                        event_type=EventType.RESUME_REC
-                    )
-                )
-                self.__cancel_paused_to_idle_timeout()
+        :param value: {MovementScore} Features of the latest window of IMU samples.
+        :param diff: {float} Movement intensity of the window.
+        """
+        now = self.__clock.monotonic()
+        if self.get_state() == OrchestraState.RECORDING:
+            self.__sleep_stage_classifier.add_sample(now, diff)
+            self.__movement_coalescer.poll(now)
+        # Listeners see the sleep stage including this poll.
+        for listener in self.__movement_listeners:
+            listener(now, diff)
+
+        if diff > self.__config.movement_threshold and self.__normalizing_polls > self.NUM_NORMALIZING_MOVEMENT_POLLS:
+            # The payload carries the time since the last IR activity for the guards of the transition table.
+            last_ir = self.__ir_input.get_last_edge_time()
+            since_ir = now - last_ir if last_ir is not None else float('inf')
+            self.__state_machine.post(StateInput.MOVEMENT, (now, diff, since_ir))
         else:
 
             # We allow some few cycles of movements to pass in order for the sensors
             # to settle and to avoid spikes that can occur during sensor initialization.
             self.__normalizing_polls += 1
 
+    def __on_sleep_stage(self, start: float, stage: SleepStage, index: float):
+        """
+        Logs a change of the sleep stage once the new stage has lasted ``SLEEP_STAGE_MIN_EPOCHS`` epochs.
+        A recording's sleep stages therefore take one event per change rather than one per epoch.
+        """
+        if stage == self.__logged_sleep_stage:
+            self.__pending_sleep_stage = None
+            return
+        epochs = self.__pending_sleep_stage[1] + 1 if self.__pending_sleep_stage and self.__pending_sleep_stage[0] == stage else 1
+        self.__pending_sleep_stage = (stage, epochs)
+        if epochs >= self.SLEEP_STAGE_MIN_EPOCHS or self.__logged_sleep_stage is None:
+            self.__logged_sleep_stage = stage
+            self.__pending_sleep_stage = None
+            self.__log_event(EventType.SLEEP_STAGE, stage.value)
+
+    def get_sleep_stage(self) -> SleepStage:
+        """
+        :return: {SleepStage} Sleep stage of the latest classified epoch of the recording, None if there is none.
+        """
+        return self.__sleep_stage_classifier.get_stage()
+
+    def get_sleep_stage_classifier(self) -> SleepStageClassifier:
+        """
+        :return: {SleepStageClassifier} Classifier of the recording's sleep stages, fed on the sampling thread.
+        """
+        return self.__sleep_stage_classifier
+
+    def __log_environment(self, event_type: EventType, value: float):
+        """
+        Log an environmental reading while recording, unless it is within the deadband of the last logged reading.
+        :param event_type: {EventType} Event type of the sensor.
+        :param value: {float} Reading.
+        """
+        if self.get_state() == OrchestraState.RECORDING and self.__deadbands[event_type].update(value, self.__clock.monotonic()):
+            self.__log_event(event_type, value)
+
     def on_temperature_signal(self, value, diff):
         """
         Handles temperature signals
         :param value: {float} Absolute Temperature in Celsius.
         :param diff: {float} Difference to last value
         """
-
-        if self.__state == OrchestraState.RECORDING:
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.TEMPERATURE,
-                    value=value
-                )
-            )
+        self.__log_environment(EventType.TEMPERATURE, value)
 
     def on_pressure_signal(self, value, diff):
         """
@@ -430,13 +667,7 @@ class Orchestra(OutpostListener):
         :param value: {float} Absolute pressure in mbar.
         :param diff: {float} Difference to last pressure value.
         """
-        if self.__state == OrchestraState.RECORDING:
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.PRESSURE,
-                    value=value
-                )
-            )
+        self.__log_environment(EventType.PRESSURE, value)
 
     def on_humidity_signal(self, value, diff):
         """
@@ -444,33 +675,62 @@ class Orchestra(OutpostListener):
         :param value: {float} Relative Humidity in percent.
         :param diff: {float} Difference to last humidity value.
         """
-        if self.__state == OrchestraState.RECORDING:
-            self.__logger.log_event(
-                Event(
-                    event_type=EventType.HUMIDITY,
-                    value=value
-                )
-            )
+        self.__log_environment(EventType.HUMIDITY, value)
 
     def set_wake_light_step(self, step: float):
-        try:
-            self.__logger.log_event(
-                Event(
-                    EventType.LIGHT_INTENSITY,
-                    value=min(int(255 * step), 255)
-                )
-            )
-            if self.__phue_bridge:
-                self.__phue_bridge.set_group(self.GROUP, {'on': True, 'bri': min(int(255 * step), 255)}, transitiontime=1)
-        except:
-            pass
+        """
+        Sets the brightness of the wake light. Never blocks, brightness steps the bridge
+        cannot keep up with are skipped.
+        :param step: {float} Brightness between 0 and 1.
+        """
+        self.__log_event(EventType.LIGHT_INTENSITY, min(int(255 * step), 255))
+        if self.__lights is not None:
+            self.__lights.set_group(self.GROUP, {'on': True, 'bri': min(int(255 * step), 255)}, transitiontime=1)
+
+    def set_light(self, state: dict):
+        """
+        Set the state of the light group, e.g. ``{'on': True, 'bri': 128}``. Never blocks.
+        :param state: {dict} Hue group state. An optional 'transitiontime' is given in tenths of a second.
+        """
+        if self.__lights is None:
+            raise RuntimeError('No light bridge')
+        state = dict(state)
+        transitiontime = state.pop('transitiontime', None)
+        if not state:
+            raise ValueError('Empty light state')
+        self.__lights.set_group(self.GROUP, state, transitiontime=transitiontime)
+
+    def get_light_statistics(self) -> dict:
+        """
+        :return: {dict} Statistics of the light actuator, None if there is no bridge.
+        """
+        return self.__lights.get_statistics() if self.__lights is not None else None
 
     def __del__(self):
         """
         Clean up GPIO upon instance destruction.
         """
-        GPIO.cleanup()
+        if self.__gpio is not None:
+            self.__gpio.cleanup()
 
     # ================================== OutpostListener Methods =====================================
     def on_message(self, msg: AbstractMessage):
-        pass
+        """
+        Applies settings and handles the recording and light commands.
+        :return: {bool} True if the message is a command that has been handled.
+        """
+        if isinstance(msg, Settings):
+            self.__settings = msg
+            self.configure(self.__requested_config.apply_settings(msg))
+        elif isinstance(msg, Command):
+            command_type = msg.get_command_type()
+            if command_type == CommandType.START_RECORDING:
+                self.__state_machine.post(StateInput.START_COMMAND)
+            elif command_type == CommandType.STOP_RECORDING:
+                self.__state_machine.post(StateInput.STOP_COMMAND)
+            elif command_type == CommandType.SET_LIGHT:
+                self.set_light(msg.args)
+            else:
+                return False
+            return True
+        return False
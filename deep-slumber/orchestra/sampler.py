@@ -0,0 +1,121 @@
+"""
+Sampler module.
+
+Persistent Sense Hat sampling service. The device is opened once and sampled
+from one long-running thread, which is paused rather than ended while the
+system is idle. Only that thread talks to the device: pausing and resuming
+are requests it applies before its next sample.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from typing import Callable, Dict
+
+from hardware.interfaces import SenseHatBackend
+from orchestra.imu import ImuRingBuffer
+from orchestra.scheduler import JitterStatistics, SensorScheduler
+
+
+class SensorSampler:
+
+    # IMU sensors enabled (compass, gyroscope, accelerometer). The compass is never used.
+    ACTIVE_IMU_CONFIG = (False, True, True)
+    # While paused, only the accelerometer is kept running in its low-power mode,
+    # so the IMU does not need to settle again after resuming.
+    PAUSED_IMU_CONFIG = (False, False, True)
+
+    __clock = None
+    __sensehat: SenseHatBackend = None
+    __scheduler: SensorScheduler = None
+    __imu_buffer: ImuRingBuffer = None
+
+    __resumed_at: float = None
+    __wake_latency: JitterStatistics = None
+
+    resumes = 0
+
+    def __init__(self, clock, sensehat: SenseHatBackend, imu_buffer: ImuRingBuffer):
+        """
+        :param clock: {Clock} Clock to schedule the sampling jobs on.
+        :param sensehat: {SenseHatBackend} Opened Sense Hat.
+        :param imu_buffer: {ImuRingBuffer} Buffer the IMU samples are pushed to. Cleared on resume.
+        """
+        self.__clock = clock
+        self.__sensehat = sensehat
+        self.__imu_buffer = imu_buffer
+        self.__scheduler = SensorScheduler(clock)
+        self.__wake_latency = JitterStatistics()
+        self.resumes = 0
+
+        # Sampling starts paused
+        self.__scheduler.pause()
+        self.__sensehat.set_imu_config(*self.PAUSED_IMU_CONFIG)
+
+    def add_job(self, name: str, interval: float, fn: Callable[[], None]):
+        """
+        Add a periodic sampling job, see ``SensorScheduler.add_job()``.
+        """
+        self.__scheduler.add_job(name, interval, self.__measure_wake_latency(fn))
+
+    def reconfigure(self, intervals: Dict[str, float], on_applied: Callable[[], None] = None):
+        """
+        Change the intervals of sampling jobs without restarting the sampling thread,
+        see ``SensorScheduler.reconfigure()``.
+        """
+        self.__scheduler.reconfigure(intervals, on_applied)
+
+    def __measure_wake_latency(self, fn: Callable[[], None]) -> Callable[[], None]:
+        def sample():
+            if self.__resumed_at is not None:
+                self.__wake_latency.add(self.__clock.monotonic() - self.__resumed_at)
+                self.__resumed_at = None
+            fn()
+        return sample
+
+    def run(self):
+        """
+        Run the sampling jobs on the calling thread until ``close()`` is called.
+        """
+        self.__scheduler.run()
+
+    def resume(self):
+        """
+        Request to enable the IMU and resume sampling with an empty IMU buffer.
+        """
+        if not self.__scheduler.is_paused():
+            return
+        self.__resumed_at = self.__clock.monotonic()
+        self.resumes += 1
+        self.__scheduler.resume(self.__on_resumed)
+
+    def __on_resumed(self):
+        self.__sensehat.set_imu_config(*self.ACTIVE_IMU_CONFIG)
+        self.__imu_buffer.clear()
+
+    def pause(self):
+        """
+        Request to pause sampling and put the IMU in low-power mode.
+        """
+        if self.__scheduler.is_paused():
+            return
+        self.__scheduler.pause(self.__on_paused)
+
+    def __on_paused(self):
+        self.__sensehat.set_imu_config(*self.PAUSED_IMU_CONFIG)
+
+    def is_paused(self) -> bool:
+        return self.__scheduler.is_paused()
+
+    def close(self):
+        self.__scheduler.stop()
+
+    def get_jitter_statistics(self) -> Dict[str, dict]:
+        return self.__scheduler.get_jitter_statistics()
+
+    def get_wake_latency(self) -> dict:
+        """
+        :return: {dict} Statistics in seconds of the time from resuming to the first sample.
+        """
+        return self.__wake_latency.as_dict()
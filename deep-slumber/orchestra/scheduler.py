@@ -0,0 +1,247 @@
+"""
+Scheduler module.
+
+Deadline-driven scheduling of periodic sensor jobs.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import heapq
+import math
+import threading
+from typing import Callable, Dict, List
+
+
+class JitterStatistics:
+    """
+    Running statistics of the lateness of a periodic job, i.e.
+    the delay between a job's deadline and its actual execution.
+    """
+
+    count = 0
+    mean = 0.0
+    maximum = 0.0
+    __m2 = 0.0
+
+    def add(self, lateness: float):
+        """
+        Add a new lateness sample (Welford's online algorithm).
+        :param lateness: {float} Lateness in seconds.
+        """
+        self.count += 1
+        delta = lateness - self.mean
+        self.mean += delta / self.count
+        self.__m2 += delta * (lateness - self.mean)
+        if lateness > self.maximum:
+            self.maximum = lateness
+
+    def get_stddev(self) -> float:
+        return math.sqrt(self.__m2 / self.count) if self.count > 1 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.maximum,
+            'stddev': self.get_stddev(),
+        }
+
+
+class ScheduledJob:
+    """
+    Periodic job of the scheduler.
+    """
+
+    __slots__ = ('name', 'interval', 'fn', 'due', 'jitter')
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.due = 0.0
+        self.jitter = JitterStatistics()
+
+
+class SensorScheduler:
+    """
+    Runs periodic jobs at their deadlines.
+    Keeps a heap of the next deadline per job and sleeps until the earliest
+    one on the monotonic clock, so no time is spent between deadlines.
+    Deadlines advance by the job's interval and thus do not drift.
+    """
+
+    __clock = None
+    __jobs: List[ScheduledJob] = None
+    __heap: list = None
+    __sequence = 0
+    __running = False
+    __wakeup: threading.Event = None
+    __paused = False
+    __resumed = False
+    # Function to call once the last pause or resume is in effect
+    __on_transition: Callable[[], None] = None
+    __transition_lock: threading.Lock = None
+    # New intervals by job name and the function to call once they are in effect
+    __reconfiguration: tuple = None
+    __reconfiguration_lock: threading.Lock = None
+
+    def __init__(self, clock):
+        """
+        :param clock: {Clock} Clock providing ``monotonic()`` and ``wait()``.
+        """
+        self.__clock = clock
+        self.__jobs = []
+        self.__heap = []
+        self.__wakeup = threading.Event()
+        self.__reconfiguration_lock = threading.Lock()
+        self.__transition_lock = threading.Lock()
+
+    def add_job(self, name: str, interval: float, fn: Callable[[], None]) -> ScheduledJob:
+        """
+        Add a periodic job. The job is first run as soon as the scheduler runs.
+        :param name: {str} Name of the job.
+        :param interval: {float} Interval in seconds, may be below one second.
+        :param fn: {Callable} Function to be called on each deadline.
+        :return: {ScheduledJob} The new job.
+        """
+        job = ScheduledJob(name, interval, fn)
+        job.due = self.__clock.monotonic()
+        self.__jobs.append(job)
+        self.__push(job)
+        self.__wakeup.set()
+        return job
+
+    def __push(self, job: ScheduledJob):
+        self.__sequence += 1
+        heapq.heappush(self.__heap, (job.due, self.__sequence, job))
+
+    def run(self, keep_running: Callable[[], bool] = lambda: True):
+        """
+        Run jobs on the calling thread until ``stop()`` is called
+        or ``keep_running`` returns False.
+        :param keep_running: {Callable} Checked after each job.
+        """
+        self.__running = True
+        clock = self.__clock
+        heap = self.__heap
+
+        while self.__running and keep_running():
+            if self.__reconfiguration is not None:
+                self.__reconfigure(clock.monotonic())
+            if self.__on_transition is not None:
+                self.__transition()
+
+            if self.__paused:
+                clock.wait(self.__wakeup)
+                self.__wakeup.clear()
+                continue
+
+            if self.__resumed:
+                # Restart all jobs right away instead of catching up on the deadlines missed while paused.
+                self.__resumed = False
+                now = clock.monotonic()
+                del heap[:]
+                for job in self.__jobs:
+                    job.due = now
+                    self.__push(job)
+
+            if not heap:
+                clock.wait(self.__wakeup)
+                self.__wakeup.clear()
+                continue
+
+            due, _, job = heap[0]
+            now = clock.monotonic()
+            if due > now:
+                if clock.wait(self.__wakeup, due - now):
+                    # Woken up early because jobs have been added or the scheduler has been stopped.
+                    self.__wakeup.clear()
+                    continue
+                now = clock.monotonic()
+
+            heapq.heappop(heap)
+            job.jitter.add(now - due)
+            job.fn()
+
+            # If we fell behind by more than one interval, skip the missed
+            # deadlines instead of running the job in a burst, keeping its phase.
+            job.due = due + job.interval
+            now = clock.monotonic()
+            if job.due <= now:
+                job.due += (math.floor((now - job.due) / job.interval) + 1) * job.interval
+            self.__push(job)
+
+    def reconfigure(self, intervals: Dict[str, float], on_applied: Callable[[], None] = None):
+        """
+        Change the intervals of jobs while running. The new intervals and ``on_applied`` take effect together
+        on the thread running the jobs, between two jobs, so jobs never see a partly applied configuration.
+        A reconfiguration not yet in effect is replaced.
+        :param intervals: {Dict[str, float]} New interval in seconds by job name. Jobs not listed keep their interval.
+        :param on_applied: {Callable[[], None]} Called on the thread running the jobs once the intervals are in effect,
+        e.g. to reconfigure what the jobs work on.
+        """
+        with self.__reconfiguration_lock:
+            self.__reconfiguration = (intervals, on_applied)
+        self.__wakeup.set()
+
+    def __reconfigure(self, now: float):
+        with self.__reconfiguration_lock:
+            intervals, on_applied = self.__reconfiguration
+            self.__reconfiguration = None
+
+        for job in self.__jobs:
+            interval = intervals.get(job.name)
+            if interval is not None and interval > 0 and interval != job.interval:
+                # A shorter interval takes effect right away, a longer one after the next run.
+                job.due = min(job.due, now + interval)
+                job.interval = interval
+        self.__heap[:] = [(job.due, sequence, job) for _, sequence, job in self.__heap]
+        heapq.heapify(self.__heap)
+
+        if on_applied is not None:
+            on_applied()
+
+    def __transition(self):
+        with self.__transition_lock:
+            on_applied = self.__on_transition
+            self.__on_transition = None
+        if on_applied is not None:
+            on_applied()
+
+    def pause(self, on_applied: Callable[[], None] = None):
+        """
+        Stop running jobs until ``resume()`` is called. ``run()`` keeps waiting meanwhile.
+        :param on_applied: {Callable[[], None]} Called on the thread running the jobs once paused. Replaces the one of
+        a pause or resume not yet in effect.
+        """
+        with self.__transition_lock:
+            self.__paused = True
+            self.__on_transition = on_applied
+        self.__wakeup.set()
+
+    def resume(self, on_applied: Callable[[], None] = None):
+        """
+        Resume running jobs. All jobs are due right away.
+        :param on_applied: {Callable[[], None]} Called on the thread running the jobs before they run again. Replaces
+        the one of a pause or resume not yet in effect.
+        """
+        with self.__transition_lock:
+            self.__paused = False
+            self.__resumed = True
+            self.__on_transition = on_applied
+        self.__wakeup.set()
+
+    def is_paused(self) -> bool:
+        return self.__paused
+
+    def stop(self):
+        self.__running = False
+        self.__wakeup.set()
+
+    def get_jitter_statistics(self) -> Dict[str, dict]:
+        """
+        :return: {Dict[str, dict]} Jitter statistics in seconds per job name.
+        """
+        return {job.name: job.jitter.as_dict() for job in self.__jobs}
@@ -0,0 +1,131 @@
+"""
+Sleep module.
+
+Streaming sleep/wake classification of the movement polls in 30 second
+epochs, after Cole et al. (1992). Each epoch's activity count is the peak
+movement intensity within the epoch. An epoch is classified once the two
+epochs following it are complete, so classifications lag by one minute.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+from typing import Callable
+
+from orchestra.enums import SleepStage
+
+
+class SleepStageClassifier:
+
+    EPOCH = 30.0
+
+    # Cole-Kripke weights of the activity counts of epochs -4 to +2 for 30 second
+    # epochs, and the scale of the sleep index. Epochs with an index of 1 or more are wake.
+    WEIGHTS = (50, 30, 14, 28, 121, 8, 50)
+    CURRENT = 4
+    SCALE = 0.0001
+    WAKE_INDEX = 1.0
+    # Sleep epochs with some movement around them count as light sleep. This split is not part
+    # of Cole-Kripke, which only tells sleep from wake.
+    LIGHT_INDEX = 0.1
+
+    # Movement intensities are scaled to the range of the actigraphy counts the weights are made for,
+    # the peak 10 second counts of each epoch. A minute of movement at 0.6 is wake.
+    COUNT_SCALE = 150.0
+
+    __on_stage: Callable[[float, SleepStage, float], None] = None
+    __epoch = EPOCH
+    __threshold = 0.0
+
+    __origin: float = None
+    __epoch_index = 0
+    __epoch_peak = 0.0
+    __counts: deque = None
+    __stage: SleepStage = None
+
+    # Number of epochs classified
+    epochs = 0
+
+    def __init__(self, on_stage: Callable[[float, SleepStage, float], None] = None, epoch: float = EPOCH,
+                 threshold: float = 0.04):
+        """
+        :param on_stage: {Callable[[float, SleepStage, float], None]} Called for every classified epoch with
+        its start time, its stage and its sleep index.
+        :param epoch: {float} Duration of an epoch in seconds.
+        :param threshold: {float} Intensities up to this are noise and count as no movement.
+        """
+        self.__on_stage = on_stage
+        self.__epoch = epoch
+        self.__threshold = threshold
+        self.reset()
+
+    def reset(self):
+        """
+        Start over, e.g. at the start of a recording. The epochs before are taken as without movement.
+        """
+        self.__origin = None
+        self.__epoch_index = 0
+        self.__epoch_peak = 0.0
+        self.__counts = deque((0.0,) * self.CURRENT, maxlen=len(self.WEIGHTS))
+        self.__stage = None
+        self.epochs = 0
+
+    def set_threshold(self, threshold: float):
+        """
+        :param threshold: {float} Intensities up to this are noise and count as no movement.
+        """
+        self.__threshold = threshold
+
+    def get_stage(self) -> SleepStage:
+        """
+        :return: {SleepStage} Stage of the latest classified epoch, None if there is none yet.
+        """
+        return self.__stage
+
+    def add_sample(self, t: float, intensity: float):
+        """
+        Add a movement poll. Costs O(1).
+        :param t: {float} Monotonic time of the poll in seconds.
+        :param intensity: {float} Movement intensity of the poll.
+        """
+        if self.__origin is None:
+            self.__origin = t
+        epoch_index = int((t - self.__origin) / self.__epoch)
+
+        if epoch_index > self.__epoch_index:
+            self.__close_epoch()
+            if epoch_index - self.__epoch_index > len(self.WEIGHTS):
+                # After a long gap without polls, e.g. a pause, start over from an empty history.
+                self.__counts = deque((0.0,) * self.CURRENT, maxlen=len(self.WEIGHTS))
+            else:
+                # Epochs without any poll have no movement.
+                for skipped in range(self.__epoch_index + 1, epoch_index):
+                    self.__epoch_index = skipped
+                    self.__close_epoch()
+            self.__epoch_index = epoch_index
+
+        if intensity > self.__threshold and intensity > self.__epoch_peak:
+            self.__epoch_peak = intensity
+
+    def __close_epoch(self):
+        self.__counts.append(self.__epoch_peak * self.COUNT_SCALE)
+        self.__epoch_peak = 0.0
+        if len(self.__counts) < len(self.WEIGHTS):
+            return
+
+        index = self.SCALE * sum(weight * count for weight, count in zip(self.WEIGHTS, self.__counts))
+        if index >= self.WAKE_INDEX:
+            stage = SleepStage.WAKE
+        elif index >= self.LIGHT_INDEX:
+            stage = SleepStage.LIGHT
+        else:
+            stage = SleepStage.DEEP
+        self.__stage = stage
+        self.epochs += 1
+
+        if self.__on_stage is not None:
+            # The classified epoch lies two epochs before the one just closed.
+            classified = self.__epoch_index - (len(self.WEIGHTS) - 1 - self.CURRENT)
+            self.__on_stage(self.__origin + classified * self.__epoch, stage, index)
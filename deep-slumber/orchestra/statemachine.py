@@ -0,0 +1,195 @@
+"""
+State machine module.
+
+Table-driven state machine. All inputs are posted to one queue and processed
+one after the other, so every transition including its actions is atomic with
+respect to all other inputs, whichever thread they come from.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+from enum import Enum
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from orchestra.scheduler import JitterStatistics
+
+
+class Transition:
+    """
+    Entry of a transition table.
+    """
+
+    __slots__ = ('target', 'actions', 'guard')
+
+    def __init__(self, target: Enum = None, actions: Tuple[str, ...] = (), guard: Callable[[object], bool] = None):
+        """
+        :param target: {Enum} State after the transition. None to stay in the current state.
+        :param actions: {Tuple[str, ...]} Names of the actions to perform, in order.
+        :param guard: {Callable[[object], bool]} Only take the transition if this returns True for the input's payload.
+        """
+        self.target = target
+        self.actions = actions
+        self.guard = guard
+
+
+class InputRecord:
+    """
+    Input as processed by the state machine.
+    """
+
+    __slots__ = ('time', 'input', 'payload')
+
+    def __init__(self, time: float, input: Enum, payload=None):
+        self.time = time
+        self.input = input
+        self.payload = payload
+
+
+class TransitionRecord:
+    """
+    Transition taken by the state machine.
+    """
+
+    __slots__ = ('time', 'input', 'source', 'target', 'actions')
+
+    def __init__(self, time: float, input: Enum, source: Enum, target: Enum, actions: Tuple[str, ...]):
+        self.time = time
+        self.input = input
+        self.source = source
+        self.target = target
+        self.actions = actions
+
+    def __eq__(self, other):
+        return isinstance(other, TransitionRecord) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'Transition {}@{}: {} -> {} {}'.format(self.input, self.time, self.source, self.target, self.actions)
+
+
+class StateMachine:
+
+    __state: Enum = None
+    __table: Dict[Tuple[Enum, Enum], Transition] = None
+    __actions: Dict[str, Callable[[object], None]] = None
+    __accept: Callable[[Enum, object], bool] = None
+    __clock = None
+
+    # Inputs are appended by any thread. Whichever thread gets hold of the
+    # drain lock processes the queue, the others return immediately.
+    __queue: deque = None
+    __drain_lock: threading.Lock = None
+
+    __input_log: List[InputRecord] = None
+    __transitions: List[TransitionRecord] = None
+    __latency: Dict[Enum, JitterStatistics] = None
+
+    ignored = 0
+
+    def __init__(self, initial: Enum, table: Dict[Tuple[Enum, Enum], Transition],
+                 actions: Dict[str, Callable[[object], None]] = None, accept: Callable[[Enum, object], bool] = None,
+                 clock=None, record: bool = False):
+        """
+        :param initial: {Enum} Initial state.
+        :param table: {Dict[Tuple[Enum, Enum], Transition]} Transitions by state and input. Inputs without entry are ignored.
+        :param actions: {Dict[str, Callable[[object], None]]} Actions by name, called with the input's payload. Missing actions are skipped.
+        :param accept: {Callable[[Enum, object], bool]} Filter for inputs, e.g. to discard stale timeouts. Discarded inputs are not recorded.
+        :param clock: {Clock} Clock to time stamp inputs with.
+        :param record: {bool} Record inputs and transitions.
+        """
+        self.__state = initial
+        self.__table = table
+        self.__actions = actions or {}
+        self.__accept = accept
+        self.__clock = clock
+        self.__queue = deque()
+        self.__drain_lock = threading.Lock()
+        self.__input_log = [] if record else None
+        self.__transitions = [] if record else None
+        self.__latency = {}
+        self.ignored = 0
+
+    def get_state(self) -> Enum:
+        return self.__state
+
+    def post(self, input: Enum, payload=None):
+        """
+        Post an input. It is processed right away unless another thread is processing
+        inputs, in which case that thread processes it after the current ones.
+        :param input: {Enum} Input.
+        :param payload: {object} Data of the input, passed to guards and actions.
+        """
+        self.__queue.append((time.perf_counter(), input, payload))
+        self.__drain()
+
+    def __drain(self):
+        # Re-check after releasing the lock, an input may have been posted in between.
+        while self.__queue:
+            if not self.__drain_lock.acquire(blocking=False):
+                return
+            try:
+                while True:
+                    try:
+                        posted, input, payload = self.__queue.popleft()
+                    except IndexError:
+                        break
+                    if self.__accept is not None and not self.__accept(input, payload):
+                        continue
+                    now = self.__clock.monotonic() if self.__clock is not None else 0.0
+                    self.__process(now, input, payload)
+                    self.__latency.setdefault(input, JitterStatistics()).add(time.perf_counter() - posted)
+            finally:
+                self.__drain_lock.release()
+
+    def __process(self, now: float, input: Enum, payload):
+        if self.__input_log is not None:
+            self.__input_log.append(InputRecord(now, input, payload))
+
+        transition = self.__table.get((self.__state, input))
+        if transition is None or (transition.guard is not None and not transition.guard(payload)):
+            self.ignored += 1
+            return
+
+        source = self.__state
+        if transition.target is not None:
+            self.__state = transition.target
+
+        if self.__transitions is not None:
+            self.__transitions.append(TransitionRecord(now, input, source, self.__state, transition.actions))
+
+        for name in transition.actions:
+            action = self.__actions.get(name)
+            if action is not None:
+                action(payload)
+
+    def get_input_log(self) -> List[InputRecord]:
+        return list(self.__input_log or ())
+
+    def get_transitions(self) -> List[TransitionRecord]:
+        return list(self.__transitions or ())
+
+    def get_latency_statistics(self) -> dict:
+        """
+        :return: {dict} Statistics in seconds of the time from posting to completing an input, by input name.
+        """
+        return {input.name: statistics.as_dict() for input, statistics in self.__latency.items()}
+
+    @classmethod
+    def replay(cls, initial: Enum, table: Dict[Tuple[Enum, Enum], Transition],
+               log: Iterable[InputRecord]) -> List[TransitionRecord]:
+        """
+        Feed a recorded input log through a transition table without performing any action.
+        :param initial: {Enum} Initial state.
+        :param table: {Dict[Tuple[Enum, Enum], Transition]} Transition table.
+        :param log: {Iterable[InputRecord]} Recorded inputs.
+        :return: {List[TransitionRecord]} Transitions taken.
+        """
+        machine = cls(initial, table, record=True)
+        for record in log:
+            machine.__process(record.time, record.input, record.payload)
+        return machine.get_transitions()
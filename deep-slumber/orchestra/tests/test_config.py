@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.enum import BackpressurePolicy
+from logger.logger import Logger
+from orchestra.config import OrchestraConfig
+from orchestra.enums import OrchestraState
+from orchestra.orchestra import Orchestra
+from orchestra.tests.test_deadband import RecordingConsumer
+from outpost.message import Settings
+
+
+class TestOrchestraConfig(TestCase):
+
+    def test_apply_settings(self):
+        """
+        ATC-2102: Test that settings change only the values they contain and that invalid values are ignored.
+        """
+        default = Orchestra.create_default_config()
+        settings = Settings()
+        settings.dataDensity = None
+        settings.accSensitivity = 2
+        settings.imuSampleRate = 10
+        settings.environmentPollInterval = 300
+        settings.pausedToIdleTimeout = -1
+
+        config = default.apply_settings(settings)
+        self.assertEqual(0.1, config.intervals[OrchestraConfig.IMU_JOB])
+        self.assertEqual(default.intervals[OrchestraConfig.MOVEMENT_JOB], config.intervals[OrchestraConfig.MOVEMENT_JOB])
+        self.assertEqual({300}, {config.intervals[name] for name in ('Temperature', 'Pressure', 'Humidity')})
+        self.assertEqual(default.paused_to_idle_timeout, config.paused_to_idle_timeout)
+        self.assertEqual((1.0, OrchestraConfig.MAX_SENSITIVITY_GAIN), (config.data_density, config.get_accel_gain()))
+        self.assertEqual(10, config.get_movement_window())
+        self.assertEqual(default, default.apply_settings(Settings.deserialize('{}')))
+        self.assertEqual(default, default.apply_settings(Settings.deserialize(
+            '{"movementThreshold": "0.5", "imuSampleRate": [25], "dataDensity": "high", "irSensitivity": true}')))
+
+    def test_live_reconfiguration(self):
+        """
+        ATC-2103: Test that settings pushed while sampling retune the sampling intervals and timeouts in place.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=2))
+        consumer = RecordingConsumer()
+        logger = Logger(consumers=[consumer], policies={consumer: BackpressurePolicy.BLOCK})
+        orchestra = Orchestra(logger=logger, backend=backend)
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0)))
+        polls = []
+
+        def push_settings():
+            polls.append(orchestra.get_sensor_jitter()[OrchestraConfig.MOVEMENT_JOB]['count'])
+            orchestra.on_message(Settings.deserialize(
+                '{"movementPollInterval": 5, "imuSampleRate": 10, "pausedToIdleTimeout": 60}'))
+
+        backend.clock.call_later(SimulatedBackend.TRACE_START + 600, push_settings)
+        backend.run(SimulatedBackend.TRACE_START + 1200)
+        logger.close()
+
+        config = orchestra.get_config()
+        self.assertEqual((5, 0.1, 60), (config.intervals[OrchestraConfig.MOVEMENT_JOB],
+                                        config.intervals[OrchestraConfig.IMU_JOB], config.paused_to_idle_timeout))
+        self.assertAlmostEqual(120, orchestra.get_sensor_jitter()[OrchestraConfig.MOVEMENT_JOB]['count'] - polls[0], delta=1)
+
+    def test_window_clamped(self):
+        """
+        ATC-2104: Test that a movement window beyond the IMU buffer is clamped to the buffer and logged.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=2))
+        logger = Logger(consumers=[])
+        orchestra = Orchestra(logger=logger, backend=backend)
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0)))
+        backend.clock.call_later(SimulatedBackend.TRACE_START + 60, lambda: orchestra.on_message(
+            Settings.deserialize('{"movementPollInterval": 60}')))
+
+        with self.assertLogs('orchestra.orchestra', level='WARNING') as logs:
+            backend.run(SimulatedBackend.TRACE_START + 120)
+        logger.close()
+
+        self.assertEqual(1, len(logs.output))
+        self.assertIn(str(Orchestra.IMU_BUFFER_SIZE), logs.output[0])
+
+        self.assertEqual(OrchestraState.RECORDING, orchestra.get_state())
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.enum import BackpressurePolicy
+from logger.interfaces import LogConsumer
+from logger.logger import Logger
+from orchestra.deadband import Deadband
+from orchestra.orchestra import Orchestra
+from outpost.enum import EventType
+
+
+class RecordingConsumer(LogConsumer):
+
+    def __init__(self):
+        self.events = []
+
+    def consume_log_message(self, msg):
+        self.events.append(msg)
+
+
+class TestDeadband(TestCase):
+
+    def test_tolerance_and_max_silence(self):
+        """
+        ATC-1001: Test that readings are reported on change beyond the tolerance, on drift and after the max silence.
+        """
+        deadband = Deadband(tolerance=0.5, max_silence=100)
+        reported = [t for t, value in ((0, 20.0), (10, 20.1), (20, 20.4), (30, 20.6), (40, 20.2), (150, 20.2))
+                    if deadband.update(value, t)]
+        self.assertEqual([0, 30, 150], reported)
+        self.assertEqual(3, deadband.suppressed)
+
+        deadband.reset()
+        self.assertTrue(deadband.update(20.2, 151))
+
+    def count_environment_events(self, data_density: float) -> int:
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=2, seed=3))
+        consumer = RecordingConsumer()
+        logger = Logger(consumers=[consumer], policies={consumer: BackpressurePolicy.BLOCK})
+        orchestra = Orchestra(logger=logger, backend=backend)
+        orchestra.set_data_density(data_density)
+
+        night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0), (night_end, 1), (night_end + 2.0, 0)))
+        backend.run(night_end + 2 * Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT)
+        logger.close()
+
+        return sum(1 for event in consumer.events
+                   if event.event_type in (EventType.TEMPERATURE, EventType.PRESSURE, EventType.HUMIDITY))
+
+    def test_night_volume(self):
+        """
+        ATC-1002: Test that the deadband reduces environmental events of a night by an order of magnitude
+        and that a higher data density logs more events.
+        """
+        polls = 3 * (2 * 3600) // Orchestra.TEMPERATURE_POLL_INTERVAL
+        default = self.count_environment_events(1)
+        dense = self.count_environment_events(4)
+
+        self.assertLess(default, polls / 10)
+        self.assertGreater(dense, default)
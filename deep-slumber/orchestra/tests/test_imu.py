@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import numpy as np
+
+from orchestra.imu import ImuRingBuffer, MovementDetector
+
+
+REST = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+GRAVITY = {'x': 0.0, 'y': 0.0, 'z': 1.0}
+
+
+class TestImu(TestCase):
+
+    def test_ring_buffer_wraps_in_order(self):
+        """
+        ATC-0301: Test that the ring buffer returns the latest samples in chronological order.
+        """
+        buffer = ImuRingBuffer(4)
+        for i in range(6):
+            buffer.push({'x': i, 'y': 0, 'z': 0}, GRAVITY)
+
+        self.assertEqual(4, len(buffer))
+        self.assertEqual([2, 3, 4, 5], buffer.latest(10)[:, 0].tolist())
+        self.assertEqual([4, 5], buffer.latest(2)[:, 0].tolist())
+        self.assertEqual((3, ImuRingBuffer.COLUMNS), buffer.latest(3).shape)
+
+    def test_movement_detection(self):
+        """
+        ATC-0302: Test that resting windows score zero and that movements in any single sample are detected.
+        """
+        buffer = ImuRingBuffer(100)
+        detector = MovementDetector(buffer, window_size=25)
+
+        for _ in range(25):
+            buffer.push(REST, GRAVITY)
+        self.assertAlmostEqual(0.0, detector.score().intensity)
+
+        # A short twitch within an otherwise quiet window
+        for i in range(25):
+            buffer.push({'x': 0.3, 'y': -0.2, 'z': 0.1} if i == 12 else REST, GRAVITY)
+        score = detector.score()
+        self.assertGreater(score.intensity, 0.04)
+        self.assertGreater(score.variance[0], 0.0)
+        self.assertEqual(0.0, score.highpass_energy)
+
+    def test_gyro_bias_is_ignored(self):
+        """
+        ATC-0303: Test that a constant gyroscope offset is not detected as movement.
+        """
+        buffer = ImuRingBuffer(25)
+        detector = MovementDetector(buffer, window_size=25)
+        rng = np.random.RandomState(0)
+
+        for _ in range(200):
+            for _ in range(25):
+                noise = rng.normal(0, 0.001, 3)
+                buffer.push({'x': 0.05 + noise[0], 'y': -0.02 + noise[1], 'z': noise[2]}, GRAVITY)
+            score = detector.score()
+
+        self.assertLess(score.intensity, 0.01)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from hardware.clock import VirtualClock
+from orchestra.ir import IrInput
+
+
+class TestIrInput(TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.occupancies = []
+        self.ir_input = IrInput(self.clock, self.occupancies.append)
+
+    def edges(self, edges):
+        for t, level in edges:
+            self.clock.advance_to(t)
+            self.ir_input.on_edge(level, t)
+
+    def test_noisy_burst_is_one_occupancy(self):
+        """
+        ATC-1401: Test that a bouncing burst of pulses is merged into one occupancy interval starting at the first edge.
+        """
+        self.edges([(10.0, 1), (10.01, 0), (10.02, 1), (12.0, 0), (12.01, 1), (12.02, 0), (14.0, 1), (16.0, 0)])
+        self.clock.advance(10)
+
+        self.assertEqual([10.0], self.occupancies)
+        self.assertEqual([(10.0, 16.0)], self.ir_input.get_intervals())
+        self.assertEqual(16.0, self.ir_input.get_last_edge_time())
+        self.assertEqual({'raw_edges': 8, 'accepted_edges': 4, 'occupancies': 1}, self.ir_input.get_statistics())
+
+        # After the merge gap, the next pulse starts a new interval
+        self.edges([(30.0, 1), (31.0, 0)])
+        self.clock.advance(10)
+        self.assertEqual([10.0, 30.0], self.occupancies)
+
+    def test_sensitivity(self):
+        """
+        ATC-1402: Test that short spikes are rejected at sensitivity 0 and accepted at sensitivity 1, the default.
+        """
+        self.assertEqual(IrInput.DEBOUNCE_TIME, self.ir_input.get_min_pulse_time())
+        self.ir_input.set_sensitivity(0)
+        self.edges([(1.0, 1), (1.1, 0)])
+        self.clock.advance(10)
+        self.assertEqual([], self.occupancies)
+        self.assertEqual(0, self.ir_input.accepted_edges)
+
+        self.ir_input.set_sensitivity(1)
+        self.edges([(20.0, 1), (20.1, 0)])
+        self.clock.advance(10)
+        self.assertEqual([20.0], self.occupancies)
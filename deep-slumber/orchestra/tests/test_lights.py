@@ -0,0 +1,58 @@
+import time
+from unittest import TestCase
+
+from hardware.hue import HueBridge, StandInBridge
+from orchestra.lights import LightActuator
+
+
+class TestLightActuator(TestCase):
+
+    def setUp(self):
+        self.stand_in = StandInBridge(delay=0.1)
+        self.bridge = HueBridge('127.0.0.1', 'user', port=self.stand_in.get_port())
+
+    def tearDown(self):
+        self.bridge.close_connection()
+        self.stand_in.close()
+
+    def test_coalescing_and_rate_limit(self):
+        """
+        ATC-1503: Test that commands never block the caller, that pending commands collapse and that the rate limit holds.
+        """
+        actuator = LightActuator(self.bridge, min_interval=0.2)
+        started = time.monotonic()
+        for bri in range(1, 51):
+            actuator.set_group(1, {'on': True, 'bri': bri}, transitiontime=1)
+            time.sleep(0.01)
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertTrue(actuator.flush(timeout=5))
+
+        commands = self.stand_in.commands
+        self.assertEqual({'on': True, 'bri': 50, 'transitiontime': 1}, commands[-1][2])
+        self.assertLess(len(commands), 10)
+        for (previous, _, _), (current, _, _) in zip(commands, commands[1:]):
+            self.assertGreaterEqual(current - previous, 0.2)
+
+        statistics = actuator.get_statistics()
+        self.assertEqual(50, statistics['submitted'])
+        self.assertEqual(len(commands), statistics['sent'])
+        self.assertEqual(50 - len(commands), statistics['coalesced'])
+        self.assertEqual(0, statistics['failures'])
+        self.assertGreaterEqual(statistics['latency']['mean'], 0.1)
+        actuator.close()
+
+    def test_failures_are_counted(self):
+        """
+        ATC-1504: Test that commands rejected by the bridge are counted as failures and do not stop the actuator.
+        """
+        actuator = LightActuator(self.bridge, min_interval=0)
+        self.stand_in.fail = True
+        actuator.set_group(1, 'on', True)
+        self.assertTrue(actuator.flush(timeout=5))
+        self.stand_in.fail = False
+        actuator.set_group(1, 'on', False)
+        actuator.close()
+
+        self.assertEqual(1, actuator.failures)
+        self.assertEqual(1, actuator.sent)
+        self.assertEqual([{'on': False}], [command for _, _, command in self.stand_in.commands])
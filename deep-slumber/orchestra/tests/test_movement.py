@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from datetime import timedelta
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.enum import BackpressurePolicy
+from logger.logger import Logger
+from orchestra.movement import MovementCoalescer
+from orchestra.orchestra import Orchestra
+from orchestra.tests.test_deadband import RecordingConsumer
+from outpost.enum import EventType
+
+
+class TestMovementCoalescer(TestCase):
+
+    def test_merge_gap(self):
+        """
+        ATC-2001: Test that movements within the merge gap form one interval with their peak intensity.
+        """
+        intervals = []
+        coalescer = MovementCoalescer(lambda start, end, intensity: intervals.append((start, end, intensity)))
+
+        for t, intensity in ((10, 0.1), (12, 0.5), (16, 0.2), (30, 0.3)):
+            coalescer.poll(t)
+            coalescer.add(t, intensity)
+        self.assertEqual([(10, 16, 0.5)], intervals)
+
+        # Completed once no further movement can extend it
+        coalescer.poll(34)
+        self.assertTrue(coalescer.is_open())
+        coalescer.poll(35)
+        self.assertEqual((30, 30, 0.3), intervals[-1])
+        self.assertFalse(coalescer.is_open())
+
+        coalescer.add(40, 0.1)
+        coalescer.flush()
+        coalescer.flush()
+        self.assertEqual((40, 40, 0.1), intervals[-1])
+        self.assertEqual((5, 3), (coalescer.movements, coalescer.intervals))
+
+    def test_night(self):
+        """
+        ATC-2002: Test that a recorded night logs one event per movement interval, at least 3x less than before.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=5))
+        consumer = RecordingConsumer()
+        logger = Logger(consumers=[consumer], policies={consumer: BackpressurePolicy.BLOCK})
+        orchestra = Orchestra(logger=logger, backend=backend)
+
+        night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0), (night_end, 1), (night_end + 2.0, 0)))
+        backend.run(night_end + Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT / 2)
+        logger.close()
+
+        intervals = [event for event in consumer.events if event.event_type == EventType.MOVEMENT_INTERVAL]
+        statistics = orchestra.get_movement_statistics()
+        self.assertFalse(any(event.event_type == EventType.MOVEMENT for event in consumer.events))
+        self.assertEqual(statistics['intervals'], len(intervals))
+        # Each movement used to be logged as three events
+        self.assertGreater(statistics['movements'], len(intervals))
+        self.assertTrue(all(interval.end >= interval.timestamp for interval in intervals))
+        # Stamped on the simulated time, in order
+        self.assertTrue(all(previous.end_ms <= current.epoch_ms and previous.seq < current.seq
+                            for previous, current in zip(intervals, intervals[1:])))
+        start = backend.clock.now() - timedelta(seconds=backend.clock.monotonic())
+        self.assertTrue(start <= intervals[0].timestamp and intervals[-1].end <= backend.clock.now())
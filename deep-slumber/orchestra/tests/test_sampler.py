@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import threading
+import time
+
+from hardware.clock import SimulationEnd, SystemClock, VirtualClock
+from hardware.interfaces import SenseHatBackend
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.logger import Logger
+from orchestra.enums import OrchestraState
+from orchestra.imu import ImuRingBuffer
+from orchestra.orchestra import Orchestra
+from orchestra.sampler import SensorSampler
+from orchestra.scheduler import SensorScheduler
+
+
+class ThreadRecordingSenseHat(SenseHatBackend):
+    """
+    Records the thread every IMU configuration is applied on.
+    """
+
+    def __init__(self):
+        self.configs = []
+
+    def set_imu_config(self, compass_enabled, gyro_enabled, accel_enabled):
+        self.configs.append((threading.current_thread(), (compass_enabled, gyro_enabled, accel_enabled)))
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestSensorSampler(TestCase):
+
+    def test_pause_and_resume(self):
+        """
+        ATC-1301: Test that a paused scheduler runs no jobs and restarts its jobs right away when resumed.
+        """
+        clock = VirtualClock(limit=10.0)
+        scheduler = SensorScheduler(clock)
+        runs = []
+        scheduler.add_job('job', 1.0, lambda: runs.append(clock.monotonic()))
+        scheduler.pause()
+        clock.call_later(3.5, scheduler.resume)
+        clock.call_later(6.2, scheduler.pause)
+        clock.call_later(8.0, scheduler.resume)
+
+        with self.assertRaises(SimulationEnd):
+            scheduler.run()
+        self.assertEqual([3.5, 4.5, 5.5, 8.0, 9.0, 10.0], runs)
+        self.assertEqual(0.0, scheduler.get_jitter_statistics()['job']['max'])
+
+    def test_persistent_sampler(self):
+        """
+        ATC-1302: Test that the Sense Hat is opened once for several nights and its IMU is in low-power mode while IDLE.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=4))
+        logger = Logger(consumers=[])
+        orchestra = Orchestra(logger=logger, backend=backend)
+
+        # Two short nights, each followed by IDLE state
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, (
+            (0.0, 1), (2.0, 0), (600.0, 1), (602.0, 0), (900.0, 1), (902.0, 0), (1100.0, 1), (1102.0, 0)
+        ))
+        backend.run(1200.0)
+        logger.close()
+
+        self.assertEqual(OrchestraState.IDLE, orchestra.get_state())
+        self.assertEqual(1, len(backend.sensehats))
+        self.assertEqual(SensorSampler.PAUSED_IMU_CONFIG, backend.sensehats[0].imu_config)
+
+        latency = orchestra.get_sensor_wake_latency()
+        self.assertEqual(2, latency['count'])
+        self.assertEqual(0.0, latency['max'])
+
+    def test_transitions_on_sampling_thread(self):
+        """
+        ATC-1303: Test that pausing and resuming are applied by the sampling thread, not the thread requesting them.
+        """
+        sensehat = ThreadRecordingSenseHat()
+        imu_buffer = ImuRingBuffer(8)
+        sampler = SensorSampler(SystemClock(), sensehat, imu_buffer)
+        samples = []
+        sampler.add_job('job', 0.01, lambda: samples.append(threading.current_thread()))
+        thread = threading.Thread(target=sampler.run, name='Sampler')
+        thread.start()
+
+        sampler.resume()
+        wait_for(lambda: len(samples) >= 2)
+        sampler.pause()
+        wait_for(lambda: len(sensehat.configs) == 3)
+        sampler.close()
+        thread.join(5)
+
+        self.assertEqual([SensorSampler.PAUSED_IMU_CONFIG, SensorSampler.ACTIVE_IMU_CONFIG,
+                          SensorSampler.PAUSED_IMU_CONFIG], [config for _, config in sensehat.configs])
+        # The first configuration is applied before the sampling thread starts.
+        self.assertEqual([thread, thread], [applied_on for applied_on, _ in sensehat.configs[1:]])
+        self.assertEqual({thread}, set(samples))
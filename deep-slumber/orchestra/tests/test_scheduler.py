@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from hardware.clock import SimulationEnd, VirtualClock
+from orchestra.scheduler import SensorScheduler
+
+
+class TestSensorScheduler(TestCase):
+
+    def test_sub_second_intervals(self):
+        """
+        ATC-0201: Test that jobs run at their own, possibly sub-second, intervals.
+        """
+        clock = VirtualClock(limit=10)
+        scheduler = SensorScheduler(clock)
+        runs = {'gyro': [], 'temperature': []}
+        scheduler.add_job('gyro', 0.02, lambda: runs['gyro'].append(clock.monotonic()))
+        scheduler.add_job('temperature', 5, lambda: runs['temperature'].append(clock.monotonic()))
+
+        with self.assertRaises(SimulationEnd):
+            scheduler.run()
+
+        self.assertEqual([0.0, 5.0, 10.0], runs['temperature'])
+        self.assertEqual(501, len(runs['gyro']))
+        self.assertAlmostEqual(9.98, runs['gyro'][-2])
+
+    def test_missed_deadlines(self):
+        """
+        ATC-0202: Test that missed deadlines are skipped without losing the job's phase.
+        """
+        clock = VirtualClock(limit=10)
+        scheduler = SensorScheduler(clock)
+        runs = []
+
+        def slow_job():
+            runs.append(clock.monotonic())
+            if len(runs) == 2:
+                clock.advance(2.5)
+
+        scheduler.add_job('slow', 1, slow_job)
+        with self.assertRaises(SimulationEnd):
+            scheduler.run()
+
+        self.assertEqual([0.0, 1.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0], runs)
+        jitter = scheduler.get_jitter_statistics()
+        self.assertEqual(len(runs), jitter['slow']['count'])
+        self.assertEqual(0.0, jitter['slow']['max'])
+
+    def test_jitter(self):
+        """
+        ATC-0203: Test that a job delayed by another job reports its lateness.
+        """
+        clock = VirtualClock(limit=5)
+        scheduler = SensorScheduler(clock)
+        scheduler.add_job('busy', 1, lambda: clock.advance(0.25))
+        scheduler.add_job('delayed', 1, lambda: None)
+        with self.assertRaises(SimulationEnd):
+            scheduler.run()
+
+        jitter = scheduler.get_jitter_statistics()
+        self.assertEqual(0.0, jitter['busy']['max'])
+        self.assertEqual(5, jitter['delayed']['count'])
+        self.assertAlmostEqual(0.25, jitter['delayed']['mean'])
+        self.assertAlmostEqual(0.25, jitter['delayed']['max'])
+
+    def test_stop(self):
+        """
+        ATC-0204: Test that the scheduler stops as soon as the run condition fails.
+        """
+        clock = VirtualClock(limit=100)
+        scheduler = SensorScheduler(clock)
+        runs = []
+        scheduler.add_job('job', 0.5, lambda: runs.append(clock.monotonic()))
+        scheduler.run(keep_running=lambda: len(runs) < 4)
+
+        self.assertEqual([0.0, 0.5, 1.0, 1.5], runs)
+
+    def test_reconfigure(self):
+        """
+        ATC-2101: Test that intervals change while running, together with the reconfiguration on the running thread.
+        """
+        clock = VirtualClock(limit=10)
+        scheduler = SensorScheduler(clock)
+        runs = {'fast': [], 'slow': []}
+        applied = []
+
+        def fast():
+            runs['fast'].append(clock.monotonic())
+            if clock.monotonic() == 2:
+                scheduler.reconfigure({'fast': 0.5, 'slow': 4, 'unknown': 1}, lambda: applied.append(clock.monotonic()))
+
+        scheduler.add_job('fast', 1, fast)
+        scheduler.add_job('slow', 3, lambda: runs['slow'].append(clock.monotonic()))
+        with self.assertRaises(SimulationEnd):
+            scheduler.run()
+
+        self.assertEqual([2.0], applied)
+        self.assertEqual([0.0, 1.0, 2.0, 2.5, 3.0, 3.5], runs['fast'][:6])
+        self.assertEqual([0.0, 3.0, 7.0], runs['slow'])
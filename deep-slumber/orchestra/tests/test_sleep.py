@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.enum import BackpressurePolicy
+from logger.logger import Logger
+from orchestra.enums import SleepStage
+from orchestra.orchestra import Orchestra
+from orchestra.sleep import SleepStageClassifier
+from orchestra.tests.test_deadband import RecordingConsumer
+from outpost.enum import EventType
+
+
+class TestSleepStageClassifier(TestCase):
+
+    def test_epochs(self):
+        """
+        ATC-1901: Test that every epoch is classified once, two epochs late, and that movement makes sleep lighter.
+        """
+        stages = []
+        classifier = SleepStageClassifier(lambda start, stage, index: stages.append((start, stage)))
+
+        # 10 quiet minutes, one minute of restlessness, then quiet again
+        for t in range(0, 30 * 60):
+            classifier.add_sample(t, 0.6 if 600 <= t < 660 else 0.0)
+
+        self.assertEqual(list(range(0, 30 * 60 - 4 * 30 + 1, 30)), [start for start, _ in stages])
+        by_start = dict(stages)
+        self.assertEqual(SleepStage.DEEP, by_start[0])
+        self.assertEqual(SleepStage.WAKE, by_start[600])
+        self.assertEqual(SleepStage.LIGHT, by_start[540])
+        self.assertEqual(SleepStage.DEEP, by_start[1200])
+
+        # Polls missing for a few epochs count as no movement
+        classifier.add_sample(30 * 60 + 100, 0.0)
+        self.assertEqual(30 * 60, stages[-1][0])
+
+    def test_night(self):
+        """
+        ATC-1902: Test that a recorded night logs sleep stages only when they change.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=5))
+        consumer = RecordingConsumer()
+        logger = Logger(consumers=[consumer], policies={consumer: BackpressurePolicy.BLOCK})
+        orchestra = Orchestra(logger=logger, backend=backend)
+
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((0.0, 1), (2.0, 0)))
+        backend.run(SimulatedBackend.TRACE_START + backend.trace.get_duration())
+        logger.close()
+
+        stages = [event.value for event in consumer.events if event.event_type == EventType.SLEEP_STAGE]
+        self.assertGreater(len(stages), 0)
+        self.assertLess(len(stages), 3600 / SleepStageClassifier.EPOCH / 2)
+        self.assertTrue(all(previous != current for previous, current in zip(stages, stages[1:])))
+        self.assertIsNotNone(orchestra.get_sleep_stage())
@@ -0,0 +1,136 @@
+from unittest import TestCase
+
+from enum import Enum
+import threading
+import time
+
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.logger import Logger
+from orchestra.enums import OrchestraState
+from orchestra.orchestra import Orchestra
+from orchestra.statemachine import StateMachine, Transition
+from outpost.enum import CommandType
+from outpost.message import Command
+
+
+class Light(Enum):
+    OFF = 0
+    ON = 1
+
+
+class Switch(Enum):
+    PRESS = 0
+    FORCE_OFF = 1
+
+
+TABLE = {
+    (Light.OFF, Switch.PRESS): Transition(Light.ON, ('count', 'echo'), guard=lambda payload: payload != 'blocked'),
+    (Light.ON, Switch.PRESS): Transition(Light.OFF, ('count',)),
+    (Light.ON, Switch.FORCE_OFF): Transition(Light.OFF),
+}
+
+
+class TestStateMachine(TestCase):
+
+    def test_transitions(self):
+        """
+        ATC-1201: Test that the table is applied with guards and that inputs posted by actions are processed afterwards.
+        """
+        calls = []
+        machine = StateMachine(Light.OFF, TABLE, record=True, actions={
+            'count': lambda payload: calls.append(('count', machine.get_state())),
+            # Posted while the current transition is not finished yet
+            'echo': lambda payload: (machine.post(Switch.FORCE_OFF), calls.append(('echo', machine.get_state()))),
+        })
+
+        machine.post(Switch.PRESS, 'blocked')
+        self.assertEqual(Light.OFF, machine.get_state())
+        machine.post(Switch.FORCE_OFF)
+        self.assertEqual(2, machine.ignored)
+
+        machine.post(Switch.PRESS)
+        self.assertEqual([('count', Light.ON), ('echo', Light.ON)], calls)
+        self.assertEqual(Light.OFF, machine.get_state())
+        self.assertEqual(
+            [(Light.OFF, Light.ON), (Light.ON, Light.OFF)],
+            [(t.source, t.target) for t in machine.get_transitions()])
+        self.assertEqual(2, machine.get_latency_statistics()['PRESS']['count'])
+
+    def test_concurrent_inputs(self):
+        """
+        ATC-1202: Test that inputs posted from many threads are processed one at a time.
+        """
+        counter = {'value': 0, 'inside': 0, 'overlaps': 0}
+
+        def count(payload):
+            counter['inside'] += 1
+            if counter['inside'] > 1:
+                counter['overlaps'] += 1
+            counter['value'] += 1
+            counter['inside'] -= 1
+
+        machine = StateMachine(Light.OFF, TABLE, actions={'count': count})
+        threads = [threading.Thread(target=lambda: [machine.post(Switch.PRESS) for _ in range(1000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(8000, counter['value'])
+        self.assertEqual(0, counter['overlaps'])
+        self.assertEqual(Light.OFF, machine.get_state())
+
+    def test_replay_simulated_night(self):
+        """
+        ATC-1203: Test that replaying the recorded inputs of a simulated night reproduces all its transitions.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=2))
+        logger = Logger(consumers=[])
+        orchestra = Orchestra(logger=logger, backend=backend, record_inputs=True)
+
+        night_end = SimulatedBackend.TRACE_START + backend.trace.get_duration()
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, (
+            (0.0, 1), (2.0, 0), (1200.0, 1), (1202.0, 0), (night_end, 1), (night_end + 2.0, 0)
+        ))
+        backend.run(night_end + 2 * Orchestra.PAUSED_TO_IDLE_STATE_TIMEOUT)
+        logger.close()
+
+        transitions = orchestra.get_transitions()
+        states = [t.target for t in transitions if t.source != t.target]
+        self.assertEqual([OrchestraState.READY, OrchestraState.RECORDING, OrchestraState.PAUSED], states[:3])
+        self.assertEqual(OrchestraState.IDLE, states[-1])
+
+        replayed = StateMachine.replay(OrchestraState.IDLE, Orchestra.STATE_TABLE, orchestra.get_input_log())
+        self.assertEqual(transitions, replayed)
+        self.assertIn('MOVEMENT', orchestra.get_transition_latency())
+
+    def test_commands(self):
+        """
+        ATC-2202: Test that server commands start and stop a recording and set the lights.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=2))
+        logger = Logger(consumers=[])
+        orchestra = Orchestra(logger=logger, backend=backend)
+        handled = []
+        states = []
+
+        def command(command_type, args=None):
+            handled.append(orchestra.on_message(Command(command_type, args)))
+            states.append(orchestra.get_state())
+
+        backend.clock.call_later(10, lambda: command(CommandType.START_RECORDING))
+        backend.clock.call_later(20, lambda: command(CommandType.SET_LIGHT, {'bri': 10, 'transitiontime': 5}))
+        backend.clock.call_later(30, lambda: command(CommandType.TRIGGER_WAKE))
+        backend.clock.call_later(40, lambda: command(CommandType.STOP_RECORDING))
+        backend.run(50)
+        logger.close()
+
+        self.assertEqual([True, True, False, True], handled)
+        self.assertEqual([OrchestraState.RECORDING] * 3 + [OrchestraState.IDLE], states)
+
+        # The light actuator sends on its own thread, merged with the pending 'lights off' of the recording start.
+        deadline = time.monotonic() + 5
+        while not any(state.get('bri') == 10 for _, state, _, _ in backend.bridge.commands):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
@@ -0,0 +1,92 @@
+"""
+Outpost buffer module.
+
+In-memory send buffer for events. Shares its interface with the on-disk
+``EventSpool``: events are appended by any thread, read by the sender and
+removed only once they have been acknowledged as sent.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+import threading
+from typing import List, Tuple
+
+from outpost.message import Event
+
+
+class EventBuffer:
+    """
+    Bounded in-memory send buffer. When full, the oldest events are dropped.
+    """
+
+    __events: deque = None
+    __lock: threading.Lock = None
+    __next_sequence = 0
+    __read_sequence = 0
+
+    dropped = 0
+
+    def __init__(self, max_events: int = 2**18):
+        """
+        :param max_events: {int} Maximum number of events held.
+        """
+        self.__events = deque(maxlen=max_events)
+        self.__lock = threading.Lock()
+        self.__next_sequence = 0
+        self.__read_sequence = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.__events)
+
+    def __first_sequence(self) -> int:
+        return self.__next_sequence - len(self.__events)
+
+    def append(self, event: Event):
+        with self.__lock:
+            if len(self.__events) == self.__events.maxlen:
+                self.dropped += 1
+            self.__events.append(event)
+            self.__next_sequence += 1
+
+    def read(self, max_events: int) -> Tuple[List[Event], int]:
+        """
+        Read unsent events, starting after the last read.
+        :param max_events: {int} Maximum number of events to read.
+        :return: {Tuple[List[Event], int]} Events and the sequence number to acknowledge once they are sent.
+        """
+        with self.__lock:
+            first = self.__first_sequence()
+            start = max(self.__read_sequence, first) - first
+            count = min(max_events, len(self.__events) - start)
+            events = [self.__events[start + i] for i in range(count)]
+            self.__read_sequence = first + start + count
+            return events, self.__read_sequence
+
+    def rewind(self):
+        """
+        Restart reading at the oldest unacknowledged event.
+        """
+        with self.__lock:
+            self.__read_sequence = self.__first_sequence()
+
+    def ack(self, sequence: int):
+        """
+        Remove all events up to ``sequence`` as sent.
+        :param sequence: {int} Sequence number as returned by ``read()``.
+        """
+        with self.__lock:
+            for _ in range(min(sequence - self.__first_sequence(), len(self.__events))):
+                self.__events.popleft()
+
+    def sync(self):
+        pass
+
+    def get_backlog(self) -> int:
+        """
+        :return: {int} Number of events not yet acknowledged.
+        """
+        return len(self.__events)
@@ -0,0 +1,269 @@
+"""
+Outpost codec module.
+
+Wire formats for messages. JSON is the default and is understood by every
+server. The binary codec packs events into fixed-size records and is used
+once the server has selected it in reply to the Hello message.
+
+Binary frame layout (little endian)::
+
+    u8  magic (0xD5)
+    u8  version
+    u8  message type (EVENT or BATCH)
+    u8  length of the hardware ID
+    ..  hardware ID (UTF-8)
+    u32 number of records
+    ..  records: u16 event type, i64 timestamp (epoch ms), f32 value
+
+Version 2 frames follow every MOVEMENT_INTERVAL record with a u32 duration
+in ms. Frames without movement intervals are written as version 1, so
+servers only knowing version 1 keep working as long as the Outpost expands
+movement intervals into legacy events.
+
+Version 3 frames carry the sequence number of every event as u64 right after
+its value, before the duration of a movement interval. They are written by
+the 'binary/3' codec whenever all events of a frame have a sequence number.
+Servers only offering 'binary' get frames of version 1, or 2 with movement
+intervals, without sequence numbers.
+
+zlib-compressed frames start with 0x78 and are decompressed before decoding.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import json
+from json import JSONDecodeError
+import math
+import struct
+from typing import Dict, Union
+import zlib
+
+from outpost.enum import EventType, MessageType
+from outpost.message import AbstractMessage, Command, CommandAck, Event, EventBatch, Heartbeat, HelloMessage, \
+    MovementInterval, Settings
+
+
+class CodecError(Exception):
+    pass
+
+
+class JsonCodec:
+    """
+    Text codec, see ``serialize()`` of the message classes.
+    """
+
+    name = 'json'
+
+    MESSAGE_CLASSES = {
+        MessageType.HELLO: HelloMessage,
+        MessageType.SETTINGS: Settings,
+        MessageType.EVENT: Event,
+        MessageType.BATCH: EventBatch,
+        MessageType.COMMAND: Command,
+        MessageType.ACK: CommandAck,
+        MessageType.HEARTBEAT: Heartbeat,
+    }
+
+    def encode(self, msg: AbstractMessage) -> str:
+        return msg.serialize()
+
+    def decode(self, raw: str) -> AbstractMessage:
+        """
+        Decode a JSON message of any known message type.
+        :param raw: {str} JSON encoded message.
+        :return: {AbstractMessage} Decoded message.
+        """
+        try:
+            msg_type = MessageType(json.loads(raw).get('msgType', 0))
+        except (JSONDecodeError, ValueError):
+            raise CodecError('Invalid JSON message')
+
+        msg_class = self.MESSAGE_CLASSES.get(msg_type)
+        if msg_class is None:
+            raise CodecError('Unsupported message type: {}'.format(msg_type))
+        return msg_class.deserialize(raw)
+
+
+class BinaryCodec:
+    """
+    Struct-packed codec for events and event batches.
+    Other messages are encoded as JSON.
+    """
+
+    name = 'binary/3'
+
+    MAGIC = 0xD5
+    VERSION = 1
+    INTERVAL_VERSION = 2
+    SEQUENCE_VERSION = 3
+
+    HEADER = struct.Struct('<BBBB')
+    COUNT = struct.Struct('<I')
+    RECORD = struct.Struct('<Hqf')
+    SEQUENCED_RECORD = struct.Struct('<HqfQ')
+    DURATION = struct.Struct('<I')
+
+    __json = JsonCodec()
+    # Highest version of the frames written
+    __version = SEQUENCE_VERSION
+
+    def __init__(self, version: int = SEQUENCE_VERSION):
+        """
+        :param version: {int} Highest version of the frames written. Frames of any version are read.
+        """
+        self.__version = version
+        self.name = 'binary/{}'.format(version) if version >= self.SEQUENCE_VERSION else 'binary'
+
+    def encode(self, msg: AbstractMessage) -> Union[bytes, str]:
+        """
+        Encode an event or event batch into a binary frame.
+        :param msg: {AbstractMessage} Message to be encoded.
+        :return: {bytes} Binary frame, or a JSON string for other message types.
+        """
+        if isinstance(msg, Event):
+            events = (msg,)
+        elif isinstance(msg, EventBatch):
+            events = msg.events
+        else:
+            return self.__json.encode(msg)
+
+        hwid = msg.hwid.encode('utf-8') if msg.hwid else b''
+        if self.__version >= self.SEQUENCE_VERSION and all(event.seq is not None for event in events):
+            version = self.SEQUENCE_VERSION
+            pack = self.SEQUENCED_RECORD.pack
+            records = [
+                pack(
+                    event.event_type.value,
+                    event.epoch_ms,
+                    float('nan') if event.value is None else event.value,
+                    event.seq
+                ) for event in events
+            ]
+        else:
+            version = self.VERSION
+            pack = self.RECORD.pack
+            records = [
+                pack(
+                    event.event_type.value,
+                    event.epoch_ms,
+                    float('nan') if event.value is None else event.value
+                ) for event in events
+            ]
+
+        for i, event in enumerate(events):
+            if event.event_type == EventType.MOVEMENT_INTERVAL:
+                version = max(version, self.INTERVAL_VERSION)
+                records[i] += self.DURATION.pack(max(0, event.end_ms - event.epoch_ms))
+
+        return b''.join((
+            self.HEADER.pack(self.MAGIC, version, msg.get_message_type().value, len(hwid)),
+            hwid,
+            self.COUNT.pack(len(events)),
+            b''.join(records)
+        ))
+
+    def decode(self, raw: Union[bytes, str]) -> AbstractMessage:
+        """
+        Decode a binary frame into an event or event batch.
+        :param raw: {bytes} Binary frame, possibly zlib-compressed. JSON strings are decoded as JSON.
+        :return: {AbstractMessage} Decoded message.
+        """
+        if isinstance(raw, str):
+            return self.__json.decode(raw)
+        if raw[:1] == b'\x78':
+            raw = zlib.decompress(raw)
+            if raw[:1] != bytes((self.MAGIC,)):
+                return self.__json.decode(raw.decode('utf-8'))
+
+        try:
+            magic, version, msg_type, hwid_length = self.HEADER.unpack_from(raw, 0)
+        except struct.error:
+            raise CodecError('Truncated header')
+        if magic != self.MAGIC or version not in (self.VERSION, self.INTERVAL_VERSION, self.SEQUENCE_VERSION):
+            raise CodecError('Unknown binary format {:#x} version {}'.format(magic, version))
+
+        offset = self.HEADER.size
+        hwid = raw[offset:offset + hwid_length].decode('utf-8') or None
+        offset += hwid_length
+        count, = self.COUNT.unpack_from(raw, offset)
+        offset += self.COUNT.size
+
+        if version == self.VERSION:
+            if len(raw) != offset + count * self.RECORD.size:
+                raise CodecError('Frame length does not match record count')
+            records = [record + (None, None) for record in self.RECORD.iter_unpack(raw[offset:])]
+        else:
+            records = self.__unpack_variable_records(raw, offset, count, version == self.SEQUENCE_VERSION)
+
+        events = []
+        for event_type, epoch_ms, value, seq, duration in records:
+            if duration is not None:
+                event = MovementInterval(intensity=self.__restore_value(value), stamped=False)
+                event.end_ms = epoch_ms + duration
+            else:
+                try:
+                    event_type = EventType(event_type)
+                except ValueError:
+                    raise CodecError('Unknown event type {}'.format(event_type))
+                event = Event(event_type, value=self.__restore_value(value), stamped=False)
+            event.epoch_ms = epoch_ms
+            event.seq = seq
+            event.hwid = hwid
+            events.append(event)
+
+        if msg_type == MessageType.EVENT.value:
+            if count != 1:
+                raise CodecError('Event frame with {} records'.format(count))
+            return events[0]
+        return EventBatch(hwid=hwid, events=events)
+
+    def __unpack_variable_records(self, raw: bytes, offset: int, count: int, sequenced: bool) -> list:
+        """
+        :return: {list} Records of a version 2 or 3 frame as event type, timestamp, value, sequence number and
+        duration in ms, None where missing.
+        """
+        record_struct = self.SEQUENCED_RECORD if sequenced else self.RECORD
+        records = []
+        try:
+            for _ in range(count):
+                record = record_struct.unpack_from(raw, offset)
+                offset += record_struct.size
+                if not sequenced:
+                    record += (None,)
+                if record[0] == EventType.MOVEMENT_INTERVAL.value:
+                    record += self.DURATION.unpack_from(raw, offset)
+                    offset += self.DURATION.size
+                else:
+                    record += (None,)
+                records.append(record)
+        except struct.error:
+            raise CodecError('Frame length does not match record count')
+        if offset != len(raw):
+            raise CodecError('Frame length does not match record count')
+        return records
+
+    @staticmethod
+    def __restore_value(value: float):
+        """
+        Undo the single precision artefacts of a value, e.g. 21.299999237060547 -> 21.3.
+        Integral values are returned as int.
+        """
+        if math.isnan(value):
+            return None
+        value = float('{:.7g}'.format(value))
+        return int(value) if value.is_integer() else value
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+# For servers knowing the binary format from before sequence numbers
+LEGACY_BINARY_CODEC = BinaryCodec(BinaryCodec.INTERVAL_VERSION)
+
+# Supported codecs by name, in order of preference.
+CODECS: Dict[str, object] = {
+    BINARY_CODEC.name: BINARY_CODEC,
+    LEGACY_BINARY_CODEC.name: LEGACY_BINARY_CODEC,
+    JSON_CODEC.name: JSON_CODEC,
+}
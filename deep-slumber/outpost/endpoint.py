@@ -0,0 +1,243 @@
+"""
+Endpoint module.
+
+Servers the Outpost can connect to. Endpoints are tried in priority order;
+every attempt and every lost connection updates the health score of its
+endpoint. After a failover the fastest healthy endpoint is preferred until it
+fails, so that reconnects do not keep knocking at a server that is down.
+Secure endpoints share a TLS context that resumes the previous session of a
+host instead of paying for a full handshake on every reconnect.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import ssl
+import threading
+import time
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+
+class SessionReusingContext(ssl.SSLContext):
+    """
+    Client TLS context resuming the last session remembered for a host.
+    """
+
+    __sessions: Dict[str, ssl.SSLSession] = None
+    __lock: threading.Lock = None
+
+    # Counters
+    handshakes = 0
+    resumed = 0
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        # Used by asyncio for every TLS connection.
+        if session is None and not server_side:
+            session = self.__get_sessions().get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side=server_side, server_hostname=server_hostname,
+                                session=session)
+
+    def remember(self, ssl_object: ssl.SSLObject):
+        """
+        Remember the session of a connection, to be resumed by the next one to the same host.
+        :param ssl_object: {ssl.SSLObject} TLS state of an established connection.
+        """
+        session = ssl_object.session
+        if session is None or ssl_object.server_side:
+            return
+        sessions = self.__get_sessions()
+        with self.__lock:
+            sessions[ssl_object.server_hostname] = session
+
+    def count(self, ssl_object: ssl.SSLObject):
+        """
+        Count a completed handshake.
+        :param ssl_object: {ssl.SSLObject} TLS state of an established connection.
+        """
+        self.__get_sessions()
+        with self.__lock:
+            self.handshakes += 1
+            if ssl_object.session_reused:
+                self.resumed += 1
+
+    def forget(self):
+        sessions = self.__get_sessions()
+        with self.__lock:
+            sessions.clear()
+
+    def __get_sessions(self) -> Dict[str, ssl.SSLSession]:
+        # SSLContext is created in __new__, the attributes are set up on first use.
+        if self.__sessions is None:
+            self.__sessions = {}
+            self.__lock = threading.Lock()
+        return self.__sessions
+
+    @classmethod
+    def create(cls, cafile: str = None):
+        """
+        :param cafile: {str} Certificates to verify servers with. Defaults to the system's certificates.
+        :return: {SessionReusingContext} Context verifying certificates and host names.
+        """
+        context = cls(ssl.PROTOCOL_TLS_CLIENT)
+        if cafile is not None:
+            context.load_verify_locations(cafile)
+        else:
+            context.load_default_certs()
+        return context
+
+
+class Endpoint:
+
+    # Health scores are a moving average of the outcome of connections, 1 for success, 0 for failure.
+    HEALTH_GAIN = 0.5
+    HEALTHY = 0.5
+    CONNECT_TIME_GAIN = 0.25
+
+    address: str = None
+    priority = 0
+    health = 1.0
+    # Smoothed time in seconds to establish a connection, None until connected once
+    connect_time: float = None
+
+    # Counters
+    connections = 0
+    failures = 0
+
+    def __init__(self, address: str, priority: int):
+        """
+        :param address: {str} Websocket URL of the server.
+        :param priority: {int} Endpoints with a lower priority are tried first.
+        """
+        self.address = address
+        self.priority = priority
+        self.health = 1.0
+        self.connect_time = None
+        self.connections = self.failures = 0
+
+    def is_secure(self) -> bool:
+        return urlparse(self.address).scheme == 'wss'
+
+    def is_healthy(self) -> bool:
+        return self.health >= self.HEALTHY
+
+    def on_success(self, connect_time: float):
+        self.connections += 1
+        self.health += self.HEALTH_GAIN * (1.0 - self.health)
+        if self.connect_time is None:
+            self.connect_time = connect_time
+        else:
+            self.connect_time += self.CONNECT_TIME_GAIN * (connect_time - self.connect_time)
+
+    def on_failure(self):
+        self.failures += 1
+        self.health -= self.HEALTH_GAIN * self.health
+
+    def as_dict(self) -> dict:
+        return {
+            'address': self.address,
+            'health': self.health,
+            'connect_time': self.connect_time,
+            'connections': self.connections,
+            'failures': self.failures,
+        }
+
+
+class EndpointPool:
+
+    __endpoints: List[Endpoint] = None
+    __preferred: Endpoint = None
+    __connected: Endpoint = None
+    __ssl_context: SessionReusingContext = None
+
+    # Whether an endpoint has failed since the last connection
+    __failed = False
+    # Monotonic time the last connection has been lost at, None while connected
+    __lost_at: float = None
+
+    # Counters
+    failovers = 0
+    # Time in seconds from the loss of the last connection to the next one
+    recovery_time: float = None
+
+    def __init__(self, addresses: Iterable[str], ssl_context: SessionReusingContext = None):
+        """
+        :param addresses: {Iterable[str]} Websocket URLs of the servers, in order of priority.
+        :param ssl_context: {SessionReusingContext} TLS context for wss endpoints. Defaults to one verifying
+        servers with the system's certificates.
+        """
+        self.__endpoints = [Endpoint(address, priority) for priority, address in enumerate(addresses)]
+        if not self.__endpoints:
+            raise ValueError('No endpoints')
+        self.__ssl_context = ssl_context
+        if ssl_context is None and any(endpoint.is_secure() for endpoint in self.__endpoints):
+            self.__ssl_context = SessionReusingContext.create()
+        self.__preferred = None
+        self.__connected = None
+        self.__failed = False
+        self.__lost_at = None
+        self.failovers = 0
+        self.recovery_time = None
+
+    def get_endpoints(self) -> List[Endpoint]:
+        return list(self.__endpoints)
+
+    def get_preferred(self) -> Endpoint:
+        return self.__preferred
+
+    def get_ssl_context(self, endpoint: Endpoint) -> SessionReusingContext:
+        """
+        :return: {SessionReusingContext} TLS context to connect to the endpoint with, None for ws endpoints.
+        """
+        return self.__ssl_context if endpoint.is_secure() else None
+
+    def get_order(self) -> List[Endpoint]:
+        """
+        :return: {List[Endpoint]} Endpoints in the order to try them in: the preferred one, the healthy ones and
+        finally the unhealthy ones, each by priority. Unhealthy endpoints are never skipped.
+        """
+        ordered = sorted(self.__endpoints, key=lambda endpoint: (not endpoint.is_healthy(), endpoint.priority))
+        if self.__preferred is not None:
+            ordered.remove(self.__preferred)
+            ordered.insert(0, self.__preferred)
+        return ordered
+
+    def report_success(self, endpoint: Endpoint, connect_time: float):
+        """
+        :param endpoint: {Endpoint} Endpoint a connection has been established to.
+        :param connect_time: {float} Time in seconds it took to connect.
+        """
+        endpoint.on_success(connect_time)
+        if self.__lost_at is not None:
+            self.recovery_time = time.monotonic() - self.__lost_at
+            self.__lost_at = None
+
+        if self.__failed and endpoint is not self.__connected:
+            self.failovers += 1
+            healthy = [e for e in self.__endpoints if e.is_healthy() and e.connect_time is not None]
+            self.__preferred = min(healthy, key=lambda e: e.connect_time) if healthy else endpoint
+        self.__failed = False
+        self.__connected = endpoint
+
+    def report_failure(self, endpoint: Endpoint):
+        """
+        :param endpoint: {Endpoint} Endpoint a connection attempt has failed to or the connection to has been lost.
+        """
+        endpoint.on_failure()
+        self.__failed = True
+        if endpoint is self.__preferred:
+            self.__preferred = None
+        if self.__lost_at is None:
+            self.__lost_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        context = self.__ssl_context
+        return {
+            'endpoints': [endpoint.as_dict() for endpoint in self.__endpoints],
+            'preferred': self.__preferred.address if self.__preferred is not None else None,
+            'failovers': self.failovers,
+            'recovery_time': self.recovery_time,
+            'handshakes': context.handshakes if context is not None else 0,
+            'resumed': context.resumed if context is not None else 0,
+        }
@@ -15,6 +15,8 @@ class MessageType(Enum):
     SETTINGS = 2
     COMMAND = 3
     EVENT = 4
+    BATCH = 5
+    ACK = 6
     HEARTBEAT = 100
 
 
@@ -32,4 +34,29 @@ class EventType(Enum):
     TEMPERATURE = 1001
     PRESSURE = 1002
     HUMIDITY = 1003
+    SLEEP_STAGE = 1004
+    MOVEMENT_INTERVAL = 1005
     STATE_CHANGE = 2000
+
+
+class CommandType(Enum):
+    START_RECORDING = 'start'
+    STOP_RECORDING = 'stop'
+    TRIGGER_WAKE = 'wake'
+    SET_LIGHT = 'light'
+    ABORT_WAKE = 'abort'
+    # Resend the events of a period, args 'since' and optionally 'until' in ms since the epoch
+    RESYNC = 'resync'
+
+
+class AckStatus(Enum):
+    OK = 'ok'
+    FAILED = 'failed'
+    # No listener handles the command
+    UNSUPPORTED = 'unsupported'
+
+
+class ConnectionState(Enum):
+    DISCONNECTED = 0
+    CONNECTING = 1
+    CONNECTED = 2
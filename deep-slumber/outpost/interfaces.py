@@ -8,4 +8,8 @@ class OutpostListener:
     __metaclass__ = ABCMeta
 
     def on_message(self, msg: AbstractMessage):
+        """
+        :param msg: {AbstractMessage} Message from the server, a dict for types without message class.
+        :return: {bool} For commands: True if the command has been handled. Raise if it has failed.
+        """
         raise NotImplementedError()
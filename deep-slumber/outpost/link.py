@@ -0,0 +1,86 @@
+"""
+Link module.
+
+Rolling statistics of the quality of the connection to the server, measured
+with heartbeats: round-trip time, its jitter and the depth of the send queue.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from collections import deque
+
+
+class LinkStatistics:
+
+    WINDOW = 32
+    # Gain of the jitter estimate, as in RFC 3550.
+    JITTER_GAIN = 1 / 16
+
+    __rtts: deque = None
+    __queue_depths: deque = None
+    __last_rtt: float = None
+    __jitter = 0.0
+
+    # Counters
+    heartbeats_sent = 0
+    heartbeats_answered = 0
+    heartbeats_lost = 0
+    stale_connections = 0
+
+    def __init__(self, window: int = WINDOW):
+        """
+        :param window: {int} Number of recent samples the statistics are computed over.
+        """
+        self.__rtts = deque(maxlen=window)
+        self.__queue_depths = deque(maxlen=window)
+        self.heartbeats_sent = self.heartbeats_answered = self.heartbeats_lost = self.stale_connections = 0
+
+    def add_rtt(self, rtt: float):
+        """
+        :param rtt: {float} Round-trip time of an answered heartbeat in seconds.
+        """
+        self.heartbeats_answered += 1
+        self.__rtts.append(rtt)
+        if self.__last_rtt is not None:
+            self.__jitter += self.JITTER_GAIN * (abs(rtt - self.__last_rtt) - self.__jitter)
+        self.__last_rtt = rtt
+
+    def add_queue_depth(self, depth: int):
+        """
+        :param depth: {int} Events not yet sent, in bytes if they are spooled on disk.
+        """
+        self.__queue_depths.append(depth)
+
+    def get_rtt(self) -> float:
+        """
+        :return: {float} Mean round-trip time in seconds over the window, None without answered heartbeat.
+        """
+        return sum(self.__rtts) / len(self.__rtts) if self.__rtts else None
+
+    def get_jitter(self) -> float:
+        """
+        :return: {float} Smoothed variation in seconds between consecutive round-trip times.
+        """
+        return self.__jitter
+
+    def get_queue_depth(self) -> int:
+        """
+        :return: {int} Latest queue depth, 0 if none has been measured.
+        """
+        return self.__queue_depths[-1] if self.__queue_depths else 0
+
+    def as_dict(self) -> dict:
+        return {
+            'rtt': self.get_rtt(),
+            'rtt_min': min(self.__rtts) if self.__rtts else None,
+            'rtt_max': max(self.__rtts) if self.__rtts else None,
+            'jitter': self.__jitter,
+            'queue': self.get_queue_depth(),
+            'queue_max': max(self.__queue_depths) if self.__queue_depths else 0,
+            'sent': self.heartbeats_sent,
+            'answered': self.heartbeats_answered,
+            'lost': self.heartbeats_lost,
+            'stale': self.stale_connections,
+        }
@@ -12,9 +12,11 @@ from abc import ABCMeta
 import json
 from json import JSONDecodeError
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+import zlib
 
-from outpost.enum import EventType, MessageType
+from outpost.enum import AckStatus, CommandType, EventType, MessageType
+from outpost.timing import EVENT_CLOCK, EventClock, to_datetime, to_epoch_ms
 
 
 class AbstractMessage:
@@ -28,28 +30,45 @@ class AbstractMessage:
     _msgType: MessageType
 
     @classmethod
-    def deserialize(cls, raw: str) -> Optional:
+    def deserialize(cls, raw: str, codec=None) -> Optional:
         """
         Deserialize a given raw string into a message object.
         :param raw: {str} Serialized representation of the message
+        :param codec: {Codec} Codec to decode ``raw`` with. Defaults to JSON.
         :return: {AbstractMessage} Deserialized message object
         """
+        if codec is not None:
+            return codec.decode(raw)
+
         try:
             data = json.loads(raw)
         except JSONDecodeError:
             return None
 
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional:
+        """
+        Create a message from its parsed JSON representation.
+        :param data: {dict} Parsed message.
+        :return: {AbstractMessage} Message object
+        """
         instance = cls()
         for field_name in cls._fields:
             if hasattr(instance, field_name):
                 setattr(instance, field_name, data.get(field_name))
         return instance
 
-    def serialize(self) -> str:
+    def serialize(self, codec=None) -> str:
         """
         Serialize this message object and return it as string.
+        :param codec: {Codec} Codec to encode this message with. Defaults to JSON.
         :return: {str} Serialized message object
         """
+        if codec is not None:
+            return codec.encode(self)
+
         out = {}
         for field in self._fields:
             if hasattr(self, field):
@@ -75,8 +94,17 @@ class Settings(AbstractMessage):
     wakeOffsetEstimator = None
     accSensitivity = 0
     gyrSensitivity = 0
-    irSensitivity = 0
+    # Unchanged where missing, like the device tuning below
+    irSensitivity = None
     dataDensity = 1
+    # Device tuning, unchanged where missing
+    movementThreshold = None
+    movementPollInterval = None
+    imuSampleRate = None
+    environmentPollInterval = None
+    readyToIdleTimeout = None
+    readyToRecordingTimeout = None
+    pausedToIdleTimeout = None
 
     _fields = (
         'earliestWakeTime',
@@ -87,11 +115,18 @@ class Settings(AbstractMessage):
         'gyrSensitivity',
         'irSensitivity',
         'dataDensity',
+        'movementThreshold',
+        'movementPollInterval',
+        'imuSampleRate',
+        'environmentPollInterval',
+        'readyToIdleTimeout',
+        'readyToRecordingTimeout',
+        'pausedToIdleTimeout',
     )
 
     @classmethod
-    def deserialize(cls, raw: str):
-        settings = super(Settings, cls).deserialize(raw)
+    def from_dict(cls, data: dict):
+        settings = super(Settings, cls).from_dict(data)
         if settings.earliestWakeTime is not None:
             settings.earliestWakeTime = datetime.strptime(settings.earliestWakeTime.get('date'), '%Y-%m-%d %H:%M:%S.%f')
         if settings.latestWakeTime is not None:
@@ -100,6 +135,114 @@ class Settings(AbstractMessage):
         return settings
 
 
+class Command(AbstractMessage):
+    """
+    Command sent by the server. Commands with an ID are acknowledged with that ID.
+    """
+    _msgType = MessageType.COMMAND
+
+    id = None
+    command: str = None
+    args: dict = None
+
+    _fields = (
+        'id',
+        'command',
+        'args',
+    )
+
+    def __init__(self, command: CommandType = None, args: dict = None, id=None):
+        """
+        :param command: {CommandType} Command.
+        :param args: {dict} Arguments of the command.
+        :param id: {str} Correlation ID, echoed by the acknowledgement.
+        """
+        self.command = command.value if command is not None else None
+        self.args = args
+        self.id = id
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        command = super(Command, cls).from_dict(data)
+        command.args = command.args if isinstance(command.args, dict) else {}
+        return command
+
+    def get_command_type(self) -> Optional[CommandType]:
+        """
+        :return: {CommandType} Type of the command, None if unknown.
+        """
+        try:
+            return CommandType(self.command)
+        except ValueError:
+            return None
+
+
+class CommandAck(AbstractMessage):
+    """
+    Acknowledgement of a command, sent once the command has been handled.
+    """
+    _msgType = MessageType.ACK
+
+    id = None
+    status: str = None
+    error: str = None
+    # Time in ms the device took to handle the command, so the server can tell it apart from the network.
+    duration = 0
+
+    _fields = (
+        'id',
+        'status',
+        'error',
+        'duration',
+    )
+
+    def __init__(self, id=None, status: AckStatus = AckStatus.OK, error: str = None, duration: float = 0):
+        """
+        :param id: {str} Correlation ID of the command.
+        :param status: {AckStatus} Outcome of the command.
+        :param error: {str} Reason of a failure.
+        :param duration: {float} Time in ms taken to handle the command.
+        """
+        self.id = id
+        self.status = status.value if status is not None else None
+        self.error = error
+        self.duration = duration
+
+    def get_status(self) -> AckStatus:
+        return AckStatus(self.status)
+
+
+class Heartbeat(AbstractMessage):
+    """
+    Heartbeat sent periodically by the hardware, carrying its link statistics.
+    The server answers with a heartbeat of the same sequence number.
+    """
+    _msgType = MessageType.HEARTBEAT
+
+    hwid = None
+    seq = 0
+    # Mean round-trip time and its jitter in ms, None until measured
+    rtt = None
+    jitter = None
+    # Events not yet sent, in bytes if they are spooled on disk
+    queue = 0
+
+    _fields = (
+        'hwid',
+        'seq',
+        'rtt',
+        'jitter',
+        'queue',
+    )
+
+    def __init__(self, hwid=None, seq: int = 0, rtt: float = None, jitter: float = None, queue: int = 0):
+        self.hwid = hwid
+        self.seq = seq
+        self.rtt = rtt
+        self.jitter = jitter
+        self.queue = queue
+
+
 class Event(AbstractMessage):
     """
     Events sent by hardware.
@@ -108,44 +251,251 @@ class Event(AbstractMessage):
 
     hwid: str
     event_type: EventType
-    timestamp: datetime
     value = 0
+    # Wall-clock time in ms since the epoch, see ``EventClock``
+    epoch_ms = 0
+    # Monotonic time in ns, None for events not stamped on this device
+    monotonic_ns: int = None
+    # Sequence number, unique per device. None for events of older devices.
+    seq: int = None
 
     _fields = (
         'hwid',
         'event_type',
         'timestamp',
+        'seq',
         'value'
     )
 
-    def __init__(self, event_type: EventType.IGNORE, value=0):
-        self.timestamp = datetime.now()
+    # Timestamps of older devices
+    TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, event_type: EventType = EventType.IGNORE, value=0, clock: EventClock = None,
+                 stamped: bool = True):
+        """
+        :param event_type: {EventType} Event type.
+        :param value: Value of the event.
+        :param clock: {EventClock} Clock to stamp the event with. Defaults to the system's.
+        :param stamped: {bool} False for events rebuilt from a frame or a record, which are left without stamps
+        until they are restored and so do not use up a sequence number.
+        """
+        if stamped:
+            self.monotonic_ns, self.epoch_ms, self.seq = (clock if clock is not None else EVENT_CLOCK).stamp()
+        else:
+            self.monotonic_ns, self.epoch_ms, self.seq = None, 0, None
         self.event_type = event_type
         self.value = value
         self.hwid = None
 
+    @property
+    def timestamp(self) -> datetime:
+        """
+        :return: {datetime} Local time of the event.
+        """
+        return to_datetime(self.epoch_ms)
+
+    @timestamp.setter
+    def timestamp(self, timestamp: datetime):
+        self.epoch_ms = to_epoch_ms(timestamp)
+
+    @classmethod
+    def parse_timestamp(cls, timestamp) -> int:
+        """
+        :param timestamp: {int} Time in ms since the epoch, or a string in ``TIMESTAMP_FORMAT`` from older devices.
+        :return: {int} Time in ms since the epoch.
+        """
+        if isinstance(timestamp, str):
+            return to_epoch_ms(datetime.strptime(timestamp, cls.TIMESTAMP_FORMAT))
+        return int(timestamp)
+
     def __str__(self):
         return 'Event {}@{}: {}'.format(self.event_type, self.timestamp, self.value)
 
-    def serialize(self):
-        j = json.dumps({
-            'hwid': self.hwid,
-            'msgType': self._msgType.value,
+    @classmethod
+    def deserialize(cls, raw: str, codec=None):
+        if codec is not None:
+            return codec.decode(raw)
+
+        try:
+            data = json.loads(raw)
+        except JSONDecodeError:
+            return None
+
+        return cls.from_payload(data, hwid=data.get('hwid'))
+
+    @classmethod
+    def from_payload(cls, payload: dict, hwid=None):
+        """
+        Create an event from its JSON payload.
+        :param payload: {dict} Event data as created by ``get_payload()``.
+        :param hwid: {str} Hardware ID of the event.
+        :return: {Event} Event
+        """
+        event_type = EventType(payload.get('event_type', 0))
+        if event_type == EventType.MOVEMENT_INTERVAL and cls is Event:
+            return MovementInterval.from_payload(payload, hwid=hwid)
+
+        event = cls(event_type, value=payload.get('value', 0), stamped=False)
+        event.epoch_ms = cls.parse_timestamp(payload.get('timestamp'))
+        event.seq = payload.get('seq')
+        event.hwid = hwid
+        return event
+
+    def get_payload(self) -> dict:
+        """
+        :return: {dict} Event data without hardware ID and message type.
+        """
+        return {
             'event_type': self.event_type.value,
-            'timestamp': self.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'timestamp': self.epoch_ms,
+            'seq': self.seq,
             'value': self.value
+        }
+
+    def serialize(self, codec=None):
+        if codec is not None:
+            return codec.encode(self)
+
+        data = self.get_payload()
+        data['hwid'] = self.hwid
+        data['msgType'] = self._msgType.value
+        return json.dumps(data)
+
+
+class MovementInterval(Event):
+    """
+    Movement lasting from ``timestamp`` to ``end``, with its peak intensity as value.
+    Replaces the three MOVEMENT events (0, 1, 0) formerly logged per movement.
+    """
+
+    # Wall-clock time of the end in ms since the epoch
+    end_ms = 0
+
+    def __init__(self, start: datetime = None, end: datetime = None, intensity: float = 0.0, clock: EventClock = None,
+                 stamped: bool = True):
+        """
+        :param start: {datetime} Start of the movement. Defaults to now.
+        :param end: {datetime} End of the movement. Defaults to the start.
+        :param intensity: {float} Peak intensity of the movement.
+        :param clock: {EventClock} Clock to stamp the event with. Defaults to the system's.
+        :param stamped: {bool} False for rebuilt events, see ``Event``.
+        """
+        super(MovementInterval, self).__init__(EventType.MOVEMENT_INTERVAL, value=intensity, clock=clock,
+                                               stamped=stamped)
+        if start is not None:
+            self.timestamp = start
+        self.end_ms = to_epoch_ms(end) if end is not None else self.epoch_ms
+
+    @property
+    def end(self) -> datetime:
+        return to_datetime(self.end_ms)
+
+    @end.setter
+    def end(self, end: datetime):
+        self.end_ms = to_epoch_ms(end)
+
+    def __str__(self):
+        return 'Movement {} - {}: {}'.format(self.timestamp, self.end, self.value)
+
+    def get_duration(self) -> float:
+        """
+        :return: {float} Duration of the movement in seconds.
+        """
+        return (self.end_ms - self.epoch_ms) / 1000
+
+    @classmethod
+    def from_payload(cls, payload: dict, hwid=None):
+        event = cls(intensity=payload.get('value', 0), stamped=False)
+        event.epoch_ms = cls.parse_timestamp(payload.get('timestamp'))
+        event.end_ms = event.epoch_ms + payload.get('duration', 0)
+        event.seq = payload.get('seq')
+        event.hwid = hwid
+        return event
+
+    def get_payload(self) -> dict:
+        payload = super(MovementInterval, self).get_payload()
+        payload['duration'] = self.end_ms - self.epoch_ms
+        return payload
+
+    def expand(self) -> List[Event]:
+        """
+        Compatibility shim for servers that do not know movement intervals.
+        :return: {List[Event]} The legacy MOVEMENT events 0 and 1 at the start and 0 at the end, without sequence
+        numbers, which servers not knowing movement intervals do not know either.
+        """
+        events = [Event(EventType.MOVEMENT, value=value, stamped=False) for value in (0, 1, 0)]
+        for event, epoch_ms in zip(events, (self.epoch_ms, self.epoch_ms, self.end_ms)):
+            event.epoch_ms = epoch_ms
+            event.hwid = self.hwid
+        return events
+
+
+class EventBatch(AbstractMessage):
+    """
+    Many events packed into a single message.
+    The hardware ID is sent once for the whole batch.
+    """
+    _msgType = MessageType.BATCH
+
+    hwid = None
+    events: List[Event] = None
+
+    def __init__(self, hwid=None, events: List[Event] = None):
+        self.hwid = hwid
+        self.events = events if events is not None else []
+
+    def __len__(self):
+        return len(self.events)
+
+    @classmethod
+    def deserialize(cls, raw: str, codec=None):
+        if codec is not None:
+            return codec.decode(raw)
+
+        try:
+            data = json.loads(raw)
+        except JSONDecodeError:
+            return None
+
+        hwid = data.get('hwid')
+        return cls(hwid=hwid, events=[Event.from_payload(payload, hwid=hwid) for payload in data.get('events', ())])
+
+    def serialize(self, codec=None) -> str:
+        if codec is not None:
+            return codec.encode(self)
+
+        return json.dumps({
+            'hwid': self.hwid,
+            'msgType': self._msgType.value,
+            'events': [event.get_payload() for event in self.events]
         })
-        return j
+
+    def compress(self, level: int = 6, codec=None) -> bytes:
+        """
+        Serialize and zlib-compress this batch. Compressed batches are
+        sent as binary frames, any other message as text frame.
+        :param level: {int} zlib compression level.
+        :param codec: {Codec} Codec to serialize the batch with. Defaults to JSON.
+        :return: {bytes} Compressed batch.
+        """
+        data = self.serialize(codec)
+        return zlib.compress(data.encode('utf-8') if isinstance(data, str) else data, level)
 
 
 class HelloMessage(AbstractMessage):
     """
     Initial message sent to server upon successful connection.
     """
-    _fields = ('hwid',)
+    _fields = ('hwid', 'codecs')
 
     _msgType = MessageType.HELLO
     hwid = -1
+    codecs = None
 
-    def __init__(self, hwid):
+    def __init__(self, hwid=-1, codecs: List[str] = None):
+        """
+        :param hwid: {str} Unique hardware ID.
+        :param codecs: {List[str]} Names of the codecs supported for events, in order of preference.
+        """
         self.hwid = hwid
+        self.codecs = codecs
@@ -12,70 +12,248 @@ __version__ = '1.0.0'
 import asyncio
 import json
 from json import JSONDecodeError
+import random
 import time
-from typing import List, Dict
+from typing import Callable, Iterable, List, Dict, Optional
 import websockets
 from websockets import ConnectionClosed
 
 from logger.interfaces import LogConsumer
-from outpost.enum import MessageType
-from outpost.message import HelloMessage, Settings, AbstractMessage
+from outpost.buffer import EventBuffer
+from outpost.codec import CODECS, JSON_CODEC
+from outpost.endpoint import Endpoint, EndpointPool
+from outpost.enum import AckStatus, ConnectionState, MessageType
+from outpost.link import LinkStatistics
+from outpost.message import AbstractMessage, Command, CommandAck, Event, EventBatch, Heartbeat, HelloMessage, \
+    MovementInterval, Settings
 from outpost.interfaces import OutpostListener
+from outpost.spool import EventSpool
 
 
 class Outpost(LogConsumer):
 
+    # Classes inbound messages are created from by type. Other messages are passed on as dict.
+    INBOUND_MESSAGES = {
+        MessageType.SETTINGS: Settings,
+        MessageType.COMMAND: Command,
+    }
+
     # Statics
-    __CONNECTION_FAIL_HOLDOFF_TIME = 10
+    __CODEC_NEGOTIATION_TIMEOUT = 1.0
+    __READ_SIZE = 256
 
-    __SERVER_ADDRESS = 'ws://192.168.1.2:8777'
-    # __SERVER_ADDRESS = 'wss://deep-slumber.samuelblattner.ch:8777'
+    # In order of priority
+    __SERVER_ADDRESSES = ('wss://deep-slumber.samuelblattner.ch:8777', 'ws://192.168.1.2:8777')
 
     __HWID = '7c222fb2927d828af22f592134e89324'
 
+    # Batching
+    __batch_size = 1
+    __batch_latency = 0.0
+    __compression: str = None
+
+    # Expand movement intervals into the legacy MOVEMENT events for servers not knowing them.
+    __legacy_movements = False
+
+    # Wire format for events, selected by the server in reply to the Hello message.
+    __codec = JSON_CODEC
+    __codec_negotiated: asyncio.Event = None
+
+    # Events not yet sent. Either the durable spool or an in-memory buffer,
+    # both keep filling up while the connection is down.
+    __buffer = None
+    __buffer_ready: asyncio.Event = None
+    __buffer_signalled = False
+
+    # Reconnecting
+    __backoff_base = 1.0
+    __backoff_cap = 60.0
+    __connect_timeout = 10.0
+    __attempt = 0
+    __state = ConnectionState.DISCONNECTED
+    __connection_listeners: List[Callable[[ConnectionState], None]] = None
+
+    # Heartbeats. A connection is stale once the server, having answered a heartbeat
+    # before, has not sent anything for the heartbeat timeout.
+    __heartbeat_interval = 15.0
+    __heartbeat_timeout = 45.0
+    __heartbeat_seq = 0
+    __pending_heartbeats: Dict[int, float] = None
+    __heartbeat_answered = False
+    __last_received = 0.0
+    __stale = False
+    __link: LinkStatistics = None
+
     # Resources
+    __endpoints: EndpointPool = None
+    __endpoint: Endpoint = None
+    __stopped = False
+    __stop_requested: asyncio.Event = None
     __socket = None
-    __message_queue: asyncio.Queue
     __main_loop = None
 
     # Messaging
     __listeners: Dict[OutpostListener, List[MessageType]]
+    # Listeners by message type, in order of registration
+    __dispatch: Dict[MessageType, List[OutpostListener]] = None
+
+    # Commands handled, by acknowledgement status, and the total time taken to handle them
+    __commands: Dict[AckStatus, int] = None
+    __command_time = 0.0
+
+    def __init__(self, server_address: str = None, batch_size: int = 1, batch_latency: float = 0.0, compression: str = None,
+                 spool: EventSpool = None, backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 connect_timeout: float = 10.0, legacy_movements: bool = False, heartbeat_interval: float = 15.0,
+                 heartbeat_timeout: float = 45.0, endpoints: EndpointPool = None):
+        """
+        :param server_address: {str} Websocket URL of the server. Defaults to the Deep-Slumber servers.
+        :param batch_size: {int} Maximum number of events packed into one frame. 1 disables batching.
+        :param batch_latency: {float} Maximum time in seconds to wait for a batch to fill up.
+        :param compression: {str} 'zlib' to send batches as compressed binary frames, None to send them uncompressed.
+        :param spool: {EventSpool} Durable spool holding events until they are sent. Events are buffered in memory if omitted.
+        :param backoff_base: {float} Upper bound in seconds of the delay before the first reconnect attempt.
+        :param backoff_cap: {float} Maximum delay in seconds between two connection attempts.
+        :param connect_timeout: {float} Time in seconds after which a connection attempt is given up.
+        :param legacy_movements: {bool} Send every movement interval as three MOVEMENT events, for older servers.
+        :param heartbeat_interval: {float} Time in seconds between two heartbeats. None or 0 disables heartbeats.
+        :param heartbeat_timeout: {float} Time in seconds without any message from the server after which the
+        connection is considered dead and re-established right away. Only applies to servers answering heartbeats.
+        :param endpoints: {EndpointPool} Servers to fail over between, instead of the server address.
+        """
+        if compression not in (None, 'zlib'):
+            raise ValueError('Unsupported compression: {}'.format(compression))
 
-    def __init__(self):
+        if endpoints is None:
+            endpoints = EndpointPool([server_address] if server_address is not None else self.__SERVER_ADDRESSES)
+        self.__endpoints = endpoints
+        self.__endpoint = None
+        self.__batch_size = max(1, batch_size)
+        self.__batch_latency = batch_latency
+        self.__compression = compression
+        self.__legacy_movements = legacy_movements
+        self.__buffer = spool if spool is not None else EventBuffer()
+        self.__buffer_ready = asyncio.Event()
+        self.__buffer_signalled = False
+        self.__backoff_base = backoff_base
+        self.__backoff_cap = backoff_cap
+        self.__connect_timeout = connect_timeout
+        self.__attempt = 0
+        self.__state = ConnectionState.DISCONNECTED
+        self.__connection_listeners = []
+        self.__heartbeat_interval = heartbeat_interval
+        self.__heartbeat_timeout = heartbeat_timeout
+        self.__heartbeat_seq = 0
+        self.__pending_heartbeats = {}
+        self.__link = LinkStatistics()
+        self.__stopped = False
+        self.__stop_requested = asyncio.Event()
         self.__socket = None
-        self.__message_queue = asyncio.Queue(maxsize=2**18)
         self.__main_loop = asyncio.get_event_loop()
         self.__listeners = {}
+        self.__dispatch = {}
+        self.__commands = {status: 0 for status in AckStatus}
+        self.__command_time = 0.0
 
-    async def __establish_socket(self):
+    # ================================ Connection ======================================
+    def __set_state(self, state: ConnectionState):
+        if state == self.__state:
+            return
+        self.__state = state
+        for listener in self.__connection_listeners:
+            listener(state)
+
+    def __get_backoff_delay(self) -> float:
+        """
+        Full jitter exponential backoff: a random delay between zero and an upper bound
+        doubling with every failed attempt, so that many devices do not reconnect in lockstep.
+        :return: {float} Delay in seconds before the next connection attempt.
+        """
+        return random.uniform(0, min(self.__backoff_cap, self.__backoff_base * 2 ** self.__attempt))
+
+    async def __establish_socket(self) -> bool:
         """
-        Attempts to establish a (secure) Websocket-Connection to the server.
-        If the connection fails, this co-routine returns and will re-try after 10 seconds (see connect() method).
-        If the connection is successful, a Hello-Message will be sent to the server,
-        containing the hardware's unique ID.
+        Attempts to establish a (secure) Websocket-Connection to one of the servers, in the order of the endpoint pool.
+        :return: {bool} True if the connection has been established.
         """
+        self.__set_state(ConnectionState.CONNECTING)
+        connected = False
+        for endpoint in self.__endpoints.get_order():
+            if self.__stopped:
+                break
+            connected = await self.__connect(endpoint)
+            if connected:
+                break
+        if not connected:
+            self.__set_state(ConnectionState.DISCONNECTED)
+            return False
+
+        # Every connection starts with JSON until the server has selected a codec.
+        self.__codec = JSON_CODEC
+        self.__codec_negotiated = asyncio.Event()
+        self.__pending_heartbeats.clear()
+        self.__heartbeat_answered = False
+        self.__stale = False
+        self.__attempt = 0
+        self.__set_state(ConnectionState.CONNECTED)
+        return True
+
+    async def __connect(self, endpoint: Endpoint) -> bool:
+        """
+        :param endpoint: {Endpoint} Endpoint to connect to.
+        :return: {bool} True if the connection has been established.
+        """
+        ssl_context = self.__endpoints.get_ssl_context(endpoint)
+        started = time.monotonic()
         try:
-            self.__socket = await websockets.connect(self.__SERVER_ADDRESS)
-        except ConnectionRefusedError:
+            self.__socket = await asyncio.wait_for(
+                websockets.connect(endpoint.address, ssl=ssl_context), self.__connect_timeout)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
             self.__socket = None
-            return
+            self.__endpoints.report_failure(endpoint)
+            return False
+
+        self.__endpoint = endpoint
+        self.__endpoints.report_success(endpoint, time.monotonic() - started)
+        if ssl_context is not None:
+            ssl_context.count(self.__socket.transport.get_extra_info('ssl_object'))
+        return True
+
+    def __remember_tls_session(self):
+        # TLS 1.3 session tickets only arrive after the handshake, so the session is taken when the connection ends.
+        ssl_context = self.__endpoints.get_ssl_context(self.__endpoint)
+        ssl_object = self.__socket.transport.get_extra_info('ssl_object')
+        if ssl_context is not None and ssl_object is not None:
+            ssl_context.remember(ssl_object)
 
-    async def __start_message_queues(self):
+    async def __run_session(self):
         """
-        Creates the send/receive async co-routines.
-        Awaits both co-routines and blocks any other execution until
-        any of the co-routine has completed. This should only be the case
-        if the connection to the server is lost.
+        Runs the send/receive co-routines until either of them returns,
+        which is only the case if the connection to the server is lost.
         """
-        consumer = asyncio.ensure_future(self.__listen_for_messages())
-        producer = asyncio.ensure_future(self.__send_messages())
-        await asyncio.wait([consumer, producer])
+        tasks = [asyncio.ensure_future(self.__listen_for_messages()), asyncio.ensure_future(self.__send_messages())]
+        if self.__heartbeat_interval:
+            tasks.append(asyncio.ensure_future(self.__send_heartbeats()))
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.__remember_tls_session()
+            if not self.__stopped:
+                self.__endpoints.report_failure(self.__endpoint)
+            if self.__stale:
+                # A closing handshake would only time out on a dead link.
+                self.__socket.transport.abort()
+            else:
+                await self.__socket.close()
+            self.__socket = None
+            self.__set_state(ConnectionState.DISCONNECTED)
 
     async def __listen_for_messages(self):
         """
         Awaits the Websocket for new messages from the server.
-        If the connection fails for any reason, this co-routine posts a CONNECTION_FAILED
-        signal in the queue, returns and the program will attempt to reconnect.
+        Returns if the connection fails for any reason.
         If a new message is received, it will be processed in the
         ``onMessage``-handler.
         """
@@ -83,71 +261,252 @@ class Outpost(LogConsumer):
             try:
                 raw_msg = await self.__socket.recv()
             except ConnectionClosed:
-                self.__main_loop.call_soon_threadsafe(self.__message_queue.put_nowait, 'CONNECTION_FAILED')
                 return
-            self.__on_message(raw_msg)
+            ack = self.__on_message(raw_msg)
+            if ack is not None:
+                try:
+                    await self.__socket.send(ack.serialize())
+                except ConnectionClosed:
+                    return
 
     async def __send_messages(self):
         """
-        Awaits the message queue for new messages.
-        If a new message has been posted to the queue, it will attempt
-        to send it to the server as a serialized object.
-        If the receiving co-routine has posted a CONNECTION_FAILED signal,
-        the co-routine will return and allow the program to re-establish the connection
-        before any further message processing is resumed.
+        Streams events from the buffer, starting with the backlog that has not been
+        acknowledged before the last connection loss. Sent events are acknowledged,
+        so they are removed from the buffer.
+        Returns if the connection fails.
         """
+        try:
+            await self.__socket.send(HelloMessage(hwid=self.__HWID, codecs=list(CODECS)).serialize())
 
-        await self.__socket.send(HelloMessage(hwid=self.__HWID).serialize())
-
-        while True:
-            msg: AbstractMessage = await self.__message_queue.get()
-            if msg == 'CONNECTION_FAILED':
-                return
+            # Give the server the chance to select a codec before any event is sent.
+            # Servers not supporting codec negotiation do not reply and get JSON.
             try:
-                await self.__socket.send(msg.serialize())
-            except ConnectionClosed:
-                return
-            self.__message_queue.task_done()
+                await asyncio.wait_for(self.__codec_negotiated.wait(), self.__CODEC_NEGOTIATION_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+
+            self.__buffer.rewind()
+            read_size = max(self.__batch_size, self.__READ_SIZE)
+
+            while True:
+                self.__buffer_ready.clear()
+                events, offset = self.__buffer.read(read_size)
+
+                if not events:
+                    self.__buffer.sync()
+                    await self.__buffer_ready.wait()
+                    continue
 
-    def __on_message(self, raw: str):
+                # Give a batch the chance to fill up, unless there is a backlog.
+                if len(events) < self.__batch_size and self.__batch_latency > 0:
+                    await asyncio.sleep(self.__batch_latency)
+                    more, offset = self.__buffer.read(self.__batch_size - len(events))
+                    events.extend(more)
+
+                if self.__batch_size > 1:
+                    for start in range(0, len(events), self.__batch_size):
+                        batch = EventBatch(hwid=self.__HWID, events=events[start:start + self.__batch_size])
+                        if self.__compression == 'zlib':
+                            await self.__socket.send(batch.compress(codec=self.__codec))
+                        else:
+                            await self.__socket.send(batch.serialize(self.__codec))
+                else:
+                    for event in events:
+                        event.hwid = self.__HWID
+                        await self.__socket.send(event.serialize(self.__codec))
+
+                self.__buffer.ack(offset)
+        except ConnectionClosed:
+            return
+
+    async def __send_heartbeats(self):
+        """
+        Sends a heartbeat right away and then periodically, carrying the link statistics.
+        Returns if the connection has gone stale or fails.
         """
-        Handler for new messages received from the server.
-        It will attempt to decode the received string as JSON-object.
+        loop = asyncio.get_running_loop()
+        self.__last_received = loop.time()
+        next_heartbeat = loop.time()
+        try:
+            while True:
+                now = loop.time()
+                if self.__heartbeat_answered and now - self.__last_received >= self.__heartbeat_timeout:
+                    self.__stale = True
+                    self.__link.stale_connections += 1
+                    return
 
-        :param raw: {str} Raw message received from the server.
+                if now >= next_heartbeat:
+                    await self.__send_heartbeat(now)
+                    next_heartbeat = now + self.__heartbeat_interval
+
+                wake_up = next_heartbeat
+                if self.__heartbeat_answered:
+                    wake_up = min(wake_up, self.__last_received + self.__heartbeat_timeout)
+                await asyncio.sleep(max(0.0, wake_up - loop.time()))
+        except ConnectionClosed:
+            return
+
+    async def __send_heartbeat(self, now: float):
+        # Heartbeats unanswered within the timeout are lost.
+        for seq, sent in list(self.__pending_heartbeats.items()):
+            if now - sent >= self.__heartbeat_timeout:
+                del self.__pending_heartbeats[seq]
+                self.__link.heartbeats_lost += 1
+
+        self.__link.add_queue_depth(self.__get_queue_depth())
+        self.__heartbeat_seq += 1
+        self.__pending_heartbeats[self.__heartbeat_seq] = now
+        self.__link.heartbeats_sent += 1
+
+        rtt, jitter = self.__link.get_rtt(), self.__link.get_jitter()
+        await self.__socket.send(Heartbeat(
+            hwid=self.__HWID,
+            seq=self.__heartbeat_seq,
+            rtt=round(rtt * 1000, 3) if rtt is not None else None,
+            jitter=round(jitter * 1000, 3) if rtt is not None else None,
+            queue=self.__link.get_queue_depth()
+        ).serialize())
+
+    def __on_heartbeat(self, data: dict):
+        sent = self.__pending_heartbeats.pop(data.get('seq'), None)
+        if sent is not None:
+            self.__heartbeat_answered = True
+            self.__link.add_rtt(asyncio.get_running_loop().time() - sent)
+
+    def __get_queue_depth(self) -> int:
+        """
+        :return: {int} Events not yet sent, in bytes if they are spooled on disk.
+        """
+        if isinstance(self.__buffer, EventSpool):
+            return self.__buffer.get_backlog_bytes()
+        return self.__buffer.get_backlog()
+
+    async def __hold_off(self):
         """
+        Waits for the backoff delay before the next connection attempt.
+        Returns early if the Outpost is stopped.
+        """
+        delay = self.__get_backoff_delay()
+        self.__attempt += 1
+        try:
+            await asyncio.wait_for(self.__stop_requested.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def __on_buffer_appended(self):
+        self.__buffer_signalled = False
+        self.__buffer_ready.set()
 
-        msg_obj = None
+    def __append(self, msg: AbstractMessage):
+        if self.__legacy_movements and isinstance(msg, MovementInterval):
+            for event in msg.expand():
+                self.__buffer.append(event)
+        else:
+            self.__buffer.append(msg)
 
+    def __on_message(self, raw: str) -> Optional[CommandAck]:
+        """
+        Handler for new messages received from the server. The message is parsed once
+        and passed on to the listeners registered for its type.
+
+        :param raw: {str} Raw message received from the server.
+        :return: {CommandAck} Acknowledgement to be sent for a command with ID.
+        """
+        self.__last_received = asyncio.get_running_loop().time()
         try:
-            msg = json.loads(raw)
-        except JSONDecodeError:
-            return
+            data = json.loads(raw)
+            msg_type = MessageType(data.get('msgType', 0))
+        except (JSONDecodeError, ValueError, AttributeError):
+            return None
+
+        if msg_type == MessageType.HEARTBEAT:
+            self.__on_heartbeat(data)
+            return None
 
-        msg_type = MessageType(msg.get('msgType', 0))
+        if msg_type == MessageType.HELLO:
+            self.__codec = CODECS.get(data.get('codec'), JSON_CODEC)
+            self.__codec_negotiated.set()
 
-        if msg_type == MessageType.SETTINGS:
-            msg_obj = Settings.deserialize(raw)
+        msg_class = self.INBOUND_MESSAGES.get(msg_type)
+        msg = msg_class.from_dict(data) if msg_class is not None else data
+        listeners = self.__dispatch.get(msg_type, ())
 
-        for listener, types in self.__listeners.items():
-            if types is None or types and MessageType(msg.get('msgType', 0)) in types:
-                listener.on_message(msg_obj if msg_obj is not None else msg)
+        if msg_type == MessageType.COMMAND:
+            return self.__execute(msg, listeners)
+        for listener in listeners:
+            listener.on_message(msg)
+        return None
+
+    def __execute(self, command: Command, listeners: List[OutpostListener]) -> Optional[CommandAck]:
+        """
+        Pass a command to the listeners. A listener handling the command returns True, a failing one raises.
+        :return: {CommandAck} Acknowledgement, if the command has an ID.
+        """
+        started = time.perf_counter()
+        status, error = AckStatus.UNSUPPORTED, None
+        for listener in listeners:
+            try:
+                if listener.on_message(command):
+                    status = AckStatus.OK
+            except Exception as e:
+                status, error = AckStatus.FAILED, str(e) or type(e).__name__
+                break
+        duration = time.perf_counter() - started
+
+        self.__commands[status] += 1
+        self.__command_time += duration
+        if command.id is None:
+            return None
+        return CommandAck(command.id, status, error, duration=round(duration * 1000, 3))
+
+    async def run(self):
+        """
+        Connection task. Keeps the connection to the server up until ``stop()`` is called,
+        reconnecting with jittered exponential backoff after every failed attempt or connection loss.
+        """
+        self.__main_loop = asyncio.get_running_loop()
+        while not self.__stopped:
+            if await self.__establish_socket():
+                await self.__run_session()
+
+            if not self.__stopped:
+                self.__buffer.sync()
+                # A stale connection is re-established right away, the server has been reachable until recently.
+                if not self.__stale:
+                    await self.__hold_off()
+
+        self.__buffer.sync()
 
     def connect(self):
         """
         Attempts to establish a connection to the server and run the message loop.
         Note: This method is blocking and should be invoked AFTER all other setup.
-        If a connection cannot be established, this method will keep trying until successful,
-        allowing 10 Seconds of hold-off time between attempts.
+        Runs the connection task in the event loop until ``stop()`` is called.
         """
-        while True:
-            asyncio.get_event_loop().run_until_complete(self.__establish_socket())
-            if self.__socket:
-                asyncio.get_event_loop().run_until_complete(self.__start_message_queues())
+        self.__main_loop.run_until_complete(self.run())
+
+    def stop(self):
+        """
+        Stop the connection task. Closes the current connection. Can be called from any thread.
+        """
+        self.__stopped = True
+        self.__main_loop.call_soon_threadsafe(self.__on_stop)
 
-            # If any of the send/receive co-routines above aborts, this here point is reached
-            # and we wait 10 seconds until we re-attempt to connect to the server.
-            time.sleep(Outpost.__CONNECTION_FAIL_HOLDOFF_TIME)
+    def __on_stop(self):
+        self.__stop_requested.set()
+        if self.__socket is not None:
+            asyncio.ensure_future(self.__socket.close())
+
+    def get_connection_state(self) -> ConnectionState:
+        return self.__state
+
+    def add_connection_listener(self, listener: Callable[[ConnectionState], None]):
+        """
+        Registers a callback invoked with the new state whenever the connection state changes.
+        :param listener: {Callable[[ConnectionState], None]} Callback to be added.
+        """
+        self.__connection_listeners.append(listener)
 
     def register_listener(self, listener: OutpostListener, message_types: List[MessageType] = None):
         """
@@ -158,13 +517,54 @@ class Outpost(LogConsumer):
         """
         if listener not in self.__listeners:
             self.__listeners.setdefault(listener, message_types)
+            self.__dispatch = {
+                msg_type: [listener for listener, types in self.__listeners.items() if types is None or msg_type in types]
+                for msg_type in MessageType
+            }
+
+    def get_link_statistics(self) -> dict:
+        """
+        :return: {dict} Round-trip time and jitter in seconds, queue depth and heartbeat counters, see ``LinkStatistics``.
+        """
+        return self.__link.as_dict()
+
+    def get_endpoint_statistics(self) -> dict:
+        """
+        :return: {dict} Health of the endpoints, failovers, recovery time and TLS session resumptions,
+        see ``EndpointPool``.
+        """
+        return self.__endpoints.as_dict()
+
+    def get_command_statistics(self) -> dict:
+        """
+        :return: {dict} Number of commands by acknowledgement status and the mean time in seconds to handle one.
+        """
+        statistics = {status.value: count for status, count in self.__commands.items()}
+        total = sum(self.__commands.values())
+        statistics['mean_duration'] = self.__command_time / total if total else 0.0
+        return statistics
+
+    def resync(self, chunks: Iterable[List[Event]]):
+        """
+        Queue events that have already been sent to be sent again, e.g. replayed
+        from the local ``EventStore`` after the server has lost data.
+        :param chunks: {Iterable[List[Event]]} Events in chronological order, in chunks.
+        """
+        for events in chunks:
+            for event in events:
+                self.__append(event)
+        self.__main_loop.call_soon_threadsafe(self.__on_buffer_appended)
 
     # ============================ LogConsumer Methods =================================
     def consume_log_message(self, msg: AbstractMessage):
         """
         Called when new messages arrive via Websocket.
+        Events are buffered, whether connected or not, and the sender is signalled once.
+        The hardware ID is added when the event is sent.
         :param msg:
         :return:
         """
-        msg.hwid = self.__HWID
-        self.__main_loop.call_soon_threadsafe(self.__message_queue.put_nowait, msg)
+        self.__append(msg)
+        if not self.__buffer_signalled:
+            self.__buffer_signalled = True
+            self.__main_loop.call_soon_threadsafe(self.__on_buffer_appended)
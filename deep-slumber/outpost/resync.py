@@ -0,0 +1,48 @@
+"""
+Resync module.
+
+Answers the server's resync commands by resending the events of the requested
+period from a local history, e.g. ``EventStore.replay()``, through the Outpost.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from datetime import datetime
+from typing import Callable, Iterable, List
+
+from outpost.enum import CommandType
+from outpost.interfaces import OutpostListener
+from outpost.message import AbstractMessage, Command, Event
+from outpost.timing import to_datetime
+
+
+class ResyncListener(OutpostListener):
+
+    __outpost = None
+    __replay: Callable[[datetime, datetime], Iterable[List[Event]]] = None
+
+    # Number of resyncs answered
+    resyncs = 0
+
+    def __init__(self, outpost, replay: Callable[[datetime, datetime], Iterable[List[Event]]]):
+        """
+        :param outpost: {Outpost} Outpost to resend the events through.
+        :param replay: {Callable[[datetime, datetime], Iterable[List[Event]]]} Events of a period from ``since``
+        to ``until``, None for now, in chunks.
+        """
+        self.__outpost = outpost
+        self.__replay = replay
+        self.resyncs = 0
+
+    def on_message(self, msg: AbstractMessage):
+        if not isinstance(msg, Command) or msg.get_command_type() != CommandType.RESYNC:
+            return False
+        since, until = msg.args.get('since'), msg.args.get('until')
+        if not isinstance(since, int) or until is not None and not isinstance(until, int):
+            raise ValueError('Resync needs since and optionally until in ms since the epoch')
+
+        self.__outpost.resync(self.__replay(to_datetime(since), to_datetime(until) if until is not None else None))
+        self.resyncs += 1
+        return True
@@ -0,0 +1,294 @@
+"""
+Outpost spool module.
+
+Durable on-disk queue for events that have not yet been sent to the server.
+Events are appended to segment files and stay there until the sender has
+acknowledged them, so neither a connection loss nor a reboot loses events.
+
+Segment files are named after the global byte offset of their first record.
+Each record is framed as ``u32 length, u32 crc32, payload`` so that a record
+torn by a power cut is detected and cut off when the spool is reopened.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+import os
+import struct
+import threading
+import time
+from typing import List, Tuple
+import zlib
+
+from outpost.codec import BINARY_CODEC
+from outpost.message import Event
+
+
+class EventSpool:
+
+    SEGMENT_SUFFIX = '.seg'
+    ACK_FILE = 'ack'
+
+    RECORD_HEADER = struct.Struct('<II')
+    ACK = struct.Struct('<Q')
+
+    __directory: str = None
+    __segment_size = 0
+    __max_bytes = 0
+    __sync_interval = 0.0
+    __codec = None
+
+    __lock: threading.Lock = None
+    __segments: List[int] = None
+    __writer = None
+    __write_offset = 0
+    __last_sync = 0.0
+    __dirty = False
+    # Syncs appended events that no later append has synced, None while everything is synced
+    __sync_timer: threading.Timer = None
+
+    __reader = None
+    __reader_segment: int = None
+    __read_offset = 0
+    __ack_offset = 0
+
+    dropped_bytes = 0
+
+    def __init__(self, directory: str, segment_size: int = 2**20, max_bytes: int = 64 * 2**20,
+                 sync_interval: float = 1.0, codec=BINARY_CODEC):
+        """
+        :param directory: {str} Directory holding the segment files. Created if missing.
+        :param segment_size: {int} Size in bytes after which a new segment is started.
+        :param max_bytes: {int} Maximum size of the spool. The oldest segments are dropped beyond this size.
+        :param sync_interval: {float} Maximum time in seconds between two fsyncs, i.e. the data a power cut may lose.
+        :param codec: {Codec} Codec to encode events with.
+        """
+        self.__directory = directory
+        self.__segment_size = segment_size
+        self.__max_bytes = max_bytes
+        self.__sync_interval = sync_interval
+        self.__codec = codec
+        self.__lock = threading.Lock()
+        self.dropped_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.__recover()
+
+    # ================================ Recovery =======================================
+    def __segment_path(self, start: int) -> str:
+        return os.path.join(self.__directory, '{:020d}{}'.format(start, self.SEGMENT_SUFFIX))
+
+    def __recover(self):
+        """
+        Restore segments and offsets from disk. A torn record at the end
+        of the last segment is truncated.
+        """
+        self.__segments = sorted(
+            int(name[:-len(self.SEGMENT_SUFFIX)])
+            for name in os.listdir(self.__directory) if name.endswith(self.SEGMENT_SUFFIX)
+        )
+        if not self.__segments:
+            self.__segments = [self.__read_ack()]
+
+        last = self.__segments[-1]
+        path = self.__segment_path(last)
+        valid_length = self.__scan(path)
+        with open(path, 'ab') as f:
+            f.truncate(valid_length)
+
+        self.__write_offset = last + valid_length
+        self.__writer = open(path, 'ab')
+        self.__ack_offset = min(max(self.__read_ack(), self.__segments[0]), self.__write_offset)
+        self.__read_offset = self.__ack_offset
+
+    def __scan(self, path: str) -> int:
+        """
+        :return: {int} Length of the valid records at the start of the given segment.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        position = 0
+        while position + self.RECORD_HEADER.size <= len(data):
+            length, crc = self.RECORD_HEADER.unpack_from(data, position)
+            payload = data[position + self.RECORD_HEADER.size:position + self.RECORD_HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            position += self.RECORD_HEADER.size + length
+        return position
+
+    def __read_ack(self) -> int:
+        try:
+            with open(os.path.join(self.__directory, self.ACK_FILE), 'rb') as f:
+                return self.ACK.unpack(f.read(self.ACK.size))[0]
+        except (OSError, struct.error):
+            return 0
+
+    # ================================ Writing ========================================
+    def append(self, event: Event):
+        """
+        Append an event. The record is handed to the OS immediately and
+        synced to disk at least every ``sync_interval`` seconds.
+        :param event: {Event} Event to be spooled.
+        """
+        payload = self.__codec.encode(event)
+        record = self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self.__lock:
+            self.__writer.write(record)
+            self.__writer.flush()
+            self.__write_offset += len(record)
+            self.__dirty = True
+
+            now = time.monotonic()
+            if now - self.__last_sync >= self.__sync_interval:
+                os.fsync(self.__writer.fileno())
+                self.__last_sync = now
+                self.__dirty = False
+            elif self.__sync_timer is None:
+                # Without further appends, e.g. during an outage, the record is synced once the interval has passed.
+                self.__sync_timer = threading.Timer(self.__last_sync + self.__sync_interval - now, self.__on_sync_timer)
+                self.__sync_timer.daemon = True
+                self.__sync_timer.start()
+
+            if self.__write_offset - self.__segments[-1] >= self.__segment_size:
+                self.__rotate()
+
+    def __rotate(self):
+        """
+        Start a new segment and drop the oldest segments if the spool is too large.
+        Must be called with the lock held.
+        """
+        os.fsync(self.__writer.fileno())
+        self.__writer.close()
+        self.__segments.append(self.__write_offset)
+        self.__writer = open(self.__segment_path(self.__write_offset), 'ab')
+        self.__dirty = False
+
+        while len(self.__segments) > 1 and self.__write_offset - self.__segments[1] >= self.__max_bytes:
+            dropped = self.__segments.pop(0)
+            self.dropped_bytes += max(0, self.__segments[0] - max(self.__ack_offset, dropped))
+            self.__ack_offset = max(self.__ack_offset, self.__segments[0])
+            self.__read_offset = max(self.__read_offset, self.__ack_offset)
+            os.remove(self.__segment_path(dropped))
+
+    def __on_sync_timer(self):
+        with self.__lock:
+            self.__sync_timer = None
+            if self.__dirty and not self.__writer.closed:
+                self.__sync()
+
+    def __sync(self):
+        """
+        Must be called with the lock held.
+        """
+        os.fsync(self.__writer.fileno())
+        self.__last_sync = time.monotonic()
+        self.__dirty = False
+
+    def sync(self):
+        """
+        Force all appended events to disk.
+        """
+        with self.__lock:
+            if self.__dirty:
+                self.__sync()
+
+    # ================================ Reading ========================================
+    def read(self, max_events: int) -> Tuple[List[Event], int]:
+        """
+        Read unsent events, starting after the last read.
+        :param max_events: {int} Maximum number of events to read.
+        :return: {Tuple[List[Event], int]} Events and the offset to acknowledge once they are sent.
+        """
+        with self.__lock:
+            end = self.__write_offset
+            segments = list(self.__segments)
+            offset = max(self.__read_offset, self.__ack_offset)
+
+        events = []
+        while len(events) < max_events and offset < end:
+            segment = [start for start in segments if start <= offset][-1]
+            segment_end = next((start for start in segments if start > segment), end)
+            if offset >= segment_end:
+                offset = segment_end
+                continue
+
+            if self.__reader_segment != segment and not self.__open_reader(segment):
+                # Removed since the segments have been listed, by an ack or because the spool grew too large.
+                offset = segment_end
+                continue
+
+            self.__reader.seek(offset - segment)
+            while len(events) < max_events and offset < segment_end:
+                length, crc = self.RECORD_HEADER.unpack(self.__reader.read(self.RECORD_HEADER.size))
+                events.append(self.__codec.decode(self.__reader.read(length)))
+                offset += self.RECORD_HEADER.size + length
+
+        with self.__lock:
+            self.__read_offset = max(offset, self.__ack_offset)
+        return events, offset
+
+    def __open_reader(self, segment: int) -> bool:
+        """
+        Open a segment for reading. Once open, it can be read even after its file has been removed.
+        :return: {bool} False if the segment has been removed, i.e. its events are consumed.
+        """
+        with self.__lock:
+            if segment not in self.__segments:
+                return False
+            if self.__reader is not None:
+                self.__reader.close()
+            self.__reader = open(self.__segment_path(segment), 'rb')
+            self.__reader_segment = segment
+        return True
+
+    def rewind(self):
+        """
+        Restart reading at the last acknowledged offset, e.g. after a connection loss.
+        """
+        self.__read_offset = self.__ack_offset
+
+    def ack(self, offset: int):
+        """
+        Acknowledge all events up to ``offset`` as sent and
+        remove segments that have been sent completely.
+        :param offset: {int} Offset as returned by ``read()``.
+        """
+        with self.__lock:
+            if offset <= self.__ack_offset:
+                return
+            self.__ack_offset = offset
+
+            path = os.path.join(self.__directory, self.ACK_FILE)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(self.ACK.pack(offset))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+
+            # A reader on a removed segment is left open, it may be in use. The next read replaces it.
+            while len(self.__segments) > 1 and self.__segments[1] <= offset:
+                os.remove(self.__segment_path(self.__segments.pop(0)))
+
+    def get_backlog_bytes(self) -> int:
+        """
+        :return: {int} Size in bytes of the events not yet acknowledged.
+        """
+        return self.__write_offset - self.__ack_offset
+
+    def close(self):
+        with self.__lock:
+            if self.__sync_timer is not None:
+                self.__sync_timer.cancel()
+                self.__sync_timer = None
+            os.fsync(self.__writer.fileno())
+            self.__writer.close()
+            if self.__reader is not None:
+                self.__reader.close()
+                self.__reader = None
+                self.__reader_segment = None
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+import json
+import zlib
+
+from outpost.enum import EventType, MessageType
+from outpost.message import Event, EventBatch
+
+
+class TestEventBatch(TestCase):
+
+    def test_batch_frame(self):
+        """
+        ATC-0401: Test that a batch frame carries all events and is distinguishable from a single event frame.
+        """
+        events = [Event(EventType.MOVEMENT, value=i % 2) for i in range(10)]
+        batch = EventBatch(hwid='abc', events=events)
+
+        data = json.loads(batch.serialize())
+        self.assertEqual(MessageType.BATCH.value, data['msgType'])
+        self.assertEqual('abc', data['hwid'])
+        self.assertEqual([i % 2 for i in range(10)], [e['value'] for e in data['events']])
+        self.assertEqual({EventType.MOVEMENT.value}, {e['event_type'] for e in data['events']})
+
+        events[0].hwid = 'abc'
+        self.assertEqual(MessageType.EVENT.value, json.loads(events[0].serialize())['msgType'])
+
+    def test_compressed_batch(self):
+        """
+        ATC-0402: Test that compressed batches decompress to the uncompressed batch and are smaller.
+        """
+        batch = EventBatch(hwid='abc', events=[Event(EventType.TEMPERATURE, value=21.5) for _ in range(100)])
+        compressed = batch.compress()
+
+        self.assertIsInstance(compressed, bytes)
+        self.assertEqual(batch.serialize(), zlib.decompress(compressed).decode('utf-8'))
+        self.assertLess(len(compressed), len(batch.serialize()) / 10)
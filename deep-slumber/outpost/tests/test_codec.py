@@ -0,0 +1,140 @@
+from unittest import TestCase
+
+from datetime import datetime, timedelta
+import zlib
+
+from outpost.codec import BINARY_CODEC, CODECS, JSON_CODEC, LEGACY_BINARY_CODEC, CodecError
+from outpost.enum import EventType, MessageType
+from outpost.message import Event, EventBatch, HelloMessage, MovementInterval
+
+
+def create_event(event_type, value, hwid='7c222fb2927d828af22f592134e89324'):
+    event = Event(event_type, value=value)
+    event.timestamp = datetime(2019, 1, 2, 3, 4, 5, 678000)
+    event.hwid = hwid
+    return event
+
+
+class TestCodec(TestCase):
+
+    EVENTS = (
+        (EventType.MOVEMENT, 1),
+        (EventType.TEMPERATURE, 21.5),
+        (EventType.PRESSURE, 1013.25),
+        (EventType.STATE_CHANGE, 3),
+        (EventType.START_REC, 0),
+    )
+
+    def test_binary_event_round_trip(self):
+        """
+        ATC-0501: Test that single events survive a round trip through the binary codec.
+        """
+        for event_type, value in self.EVENTS:
+            event = create_event(event_type, value)
+            raw = event.serialize(BINARY_CODEC)
+            self.assertIsInstance(raw, bytes)
+            self.assertEqual(4 + len(event.hwid) + 4 + BINARY_CODEC.SEQUENCED_RECORD.size, len(raw))
+
+            decoded = Event.deserialize(raw, BINARY_CODEC)
+            self.assertIsInstance(decoded, Event)
+            self.assertEqual(event_type, decoded.event_type)
+            self.assertAlmostEqual(value, decoded.value, places=4)
+            self.assertEqual(event.timestamp, decoded.timestamp)
+            self.assertEqual(event.seq, decoded.seq)
+            self.assertEqual(event.hwid, decoded.hwid)
+
+    def test_binary_batch_round_trip(self):
+        """
+        ATC-0502: Test that batches survive a round trip through the binary codec, also compressed.
+        """
+        batch = EventBatch(hwid='abc', events=[create_event(t, v, hwid='abc') for t, v in self.EVENTS * 20])
+
+        for raw in (batch.serialize(BINARY_CODEC), batch.compress(codec=BINARY_CODEC)):
+            decoded = EventBatch.deserialize(raw, BINARY_CODEC)
+            self.assertIsInstance(decoded, EventBatch)
+            self.assertEqual('abc', decoded.hwid)
+            self.assertEqual([e.event_type for e in batch.events], [e.event_type for e in decoded.events])
+            for original, copy in zip(batch.events, decoded.events):
+                self.assertAlmostEqual(original.value, copy.value, places=4)
+
+    def test_json_round_trip(self):
+        """
+        ATC-0503: Test that the JSON codec decodes what the messages serialize.
+        """
+        event = create_event(EventType.HUMIDITY, 45.5)
+        decoded = JSON_CODEC.decode(event.serialize())
+        self.assertEqual((EventType.HUMIDITY, 45.5, event.hwid), (decoded.event_type, decoded.value, decoded.hwid))
+        self.assertEqual((event.timestamp, event.seq), (decoded.timestamp, decoded.seq))
+
+        batch = EventBatch(hwid='abc', events=[event, event])
+        self.assertEqual(2, len(JSON_CODEC.decode(batch.serialize())))
+
+        # The binary codec falls back to JSON for other messages and text frames.
+        hello = HelloMessage(hwid='abc', codecs=list(CODECS))
+        self.assertIsInstance(hello.serialize(BINARY_CODEC), str)
+        self.assertEqual(['binary/3', 'binary', 'json'], BINARY_CODEC.decode(hello.serialize()).codecs)
+        self.assertEqual(45.5, BINARY_CODEC.decode(zlib.compress(event.serialize().encode())).value)
+
+    def test_invalid_frames(self):
+        """
+        ATC-0504: Test that malformed binary frames are rejected.
+        """
+        raw = create_event(EventType.MOVEMENT, 1).serialize(BINARY_CODEC)
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(raw[:-1])
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(b'\x00' + raw[1:])
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(raw[:2])
+        record = len(raw) - BINARY_CODEC.SEQUENCED_RECORD.size
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(raw[:record] + b'\xff\xff' + raw[record + 2:])
+        with self.assertRaises(CodecError):
+            JSON_CODEC.decode('{"msgType": %d}' % MessageType.NO_TYPE.value)
+
+    def test_movement_interval(self):
+        """
+        ATC-2003: Test that movement intervals survive all codecs and expand into the legacy events.
+        """
+        start = datetime(2019, 1, 2, 3, 4, 5)
+        interval = MovementInterval(start, start + timedelta(seconds=7.5), 0.25)
+        interval.hwid = 'abc'
+        batch = EventBatch(hwid='abc', events=[create_event(EventType.TEMPERATURE, 21.5, hwid='abc'), interval])
+
+        for decoded in (
+                JSON_CODEC.decode(interval.serialize()),
+                BINARY_CODEC.decode(interval.serialize(BINARY_CODEC)),
+                BINARY_CODEC.decode(batch.serialize(BINARY_CODEC)).events[1],
+                JSON_CODEC.decode(batch.serialize()).events[1]):
+            self.assertIsInstance(decoded, MovementInterval)
+            self.assertEqual((start, 7.5, 0.25), (decoded.timestamp, decoded.get_duration(), decoded.value))
+
+        # Frames of events without sequence number keep the version 1 layout, or version 2 with intervals
+        self.assertEqual(BINARY_CODEC.SEQUENCE_VERSION, batch.serialize(BINARY_CODEC)[1])
+        for event in batch.events:
+            event.seq = None
+        self.assertEqual(BINARY_CODEC.VERSION, batch.events[0].serialize(BINARY_CODEC)[1])
+        self.assertEqual(BINARY_CODEC.INTERVAL_VERSION, batch.serialize(BINARY_CODEC)[1])
+        self.assertIsInstance(BINARY_CODEC.decode(batch.serialize(BINARY_CODEC)).events[1], MovementInterval)
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(batch.serialize(BINARY_CODEC)[:-2])
+
+        legacy = interval.expand()
+        self.assertEqual([(EventType.MOVEMENT, 0, start), (EventType.MOVEMENT, 1, start),
+                          (EventType.MOVEMENT, 0, interval.end)],
+                         [(event.event_type, event.value, event.timestamp) for event in legacy])
+
+    def test_legacy_binary(self):
+        """
+        ATC-2504: Test that servers only offering 'binary' get frames without sequence numbers.
+        """
+        interval = MovementInterval(datetime(2019, 1, 2, 3, 4, 5), datetime(2019, 1, 2, 3, 4, 7), 0.25)
+        event = create_event(EventType.TEMPERATURE, 21.5)
+        self.assertIs(LEGACY_BINARY_CODEC, CODECS['binary'])
+
+        raw = event.serialize(LEGACY_BINARY_CODEC)
+        self.assertEqual(LEGACY_BINARY_CODEC.VERSION, raw[1])
+        self.assertEqual(4 + len(event.hwid) + 4 + LEGACY_BINARY_CODEC.RECORD.size, len(raw))
+        self.assertIsNone(BINARY_CODEC.decode(raw).seq)
+        self.assertEqual(LEGACY_BINARY_CODEC.INTERVAL_VERSION, interval.serialize(LEGACY_BINARY_CODEC)[1])
+        self.assertEqual(event.seq, LEGACY_BINARY_CODEC.decode(event.serialize(BINARY_CODEC)).seq)
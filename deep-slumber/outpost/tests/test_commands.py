@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import asyncio
+import json
+
+import websockets
+
+from outpost.codec import JSON_CODEC
+from outpost.enum import AckStatus, CommandType, ConnectionState, MessageType
+from outpost.interfaces import OutpostListener
+from outpost.message import Command, CommandAck, Settings
+from outpost.outpost import Outpost
+
+
+class RecordingListener(OutpostListener):
+
+    def __init__(self):
+        self.messages = []
+
+    def on_message(self, msg):
+        self.messages.append(msg)
+        if isinstance(msg, Command):
+            if msg.get_command_type() == CommandType.SET_LIGHT:
+                raise RuntimeError('No light bridge')
+            return msg.get_command_type() == CommandType.START_RECORDING
+        return False
+
+
+class TestCommands(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_dispatch_and_acknowledge(self):
+        """
+        ATC-2201: Test that messages reach the listeners of their type only and that commands are acknowledged by ID.
+        """
+        self.loop.run_until_complete(asyncio.wait_for(self.run_commands(), 10))
+
+    async def run_commands(self):
+        acks = []
+        commands = (
+            Command(CommandType.START_RECORDING, id='a'),
+            Command(CommandType.SET_LIGHT, {'on': True}, id='b'),
+            Command(CommandType.TRIGGER_WAKE, id='c'),
+            Command(CommandType.STOP_RECORDING),
+        )
+
+        async def on_connection(websocket, *args):
+            await websocket.send(json.dumps({'msgType': 9999}))
+            await websocket.send('{"msgType": %d, "dataDensity": 2}' % MessageType.SETTINGS.value)
+            for command in commands:
+                await websocket.send(command.serialize())
+            async for frame in websocket:
+                msg = JSON_CODEC.decode(frame)
+                if isinstance(msg, CommandAck):
+                    acks.append(msg)
+
+        server = await websockets.serve(on_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        outpost = Outpost(server_address='ws://127.0.0.1:{}'.format(port))
+        commanded, configured = RecordingListener(), RecordingListener()
+        outpost.register_listener(commanded, [MessageType.COMMAND])
+        outpost.register_listener(configured, [MessageType.SETTINGS])
+        task = asyncio.ensure_future(outpost.run())
+
+        while len(acks) < 3:
+            await asyncio.sleep(0.01)
+        outpost.stop()
+        await task
+        server.close()
+        await server.wait_closed()
+
+        self.assertEqual(['a', 'b', 'c'], [ack.id for ack in acks])
+        self.assertEqual([AckStatus.OK, AckStatus.FAILED, AckStatus.UNSUPPORTED], [ack.get_status() for ack in acks])
+        self.assertEqual('No light bridge', acks[1].error)
+        self.assertTrue(all(ack.duration >= 0 for ack in acks))
+
+        self.assertEqual(4, len(commanded.messages))
+        self.assertEqual(1, len(configured.messages))
+        self.assertIsInstance(configured.messages[0], Settings)
+        self.assertEqual(2, configured.messages[0].dataDensity)
+
+        statistics = outpost.get_command_statistics()
+        self.assertEqual((1, 1, 2), (statistics['ok'], statistics['failed'], statistics['unsupported']))
+        self.assertEqual(ConnectionState.DISCONNECTED, outpost.get_connection_state())
@@ -0,0 +1,178 @@
+from unittest import TestCase
+
+import asyncio
+import json
+import os
+import ssl
+import time
+
+import websockets
+
+from outpost.codec import JSON_CODEC
+from outpost.endpoint import EndpointPool, SessionReusingContext
+from outpost.enum import EventType, MessageType
+from outpost.message import Event, HelloMessage
+from outpost.outpost import Outpost
+
+
+CERTIFICATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'localhost.pem')
+
+
+class StandInServer:
+    """
+    Server receiving events, which can be killed without closing its connections properly.
+    """
+
+    def __init__(self, received: list, ssl_context: ssl.SSLContext = None):
+        self.received = received
+        self.ssl_context = ssl_context
+        self.connections = []
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await websockets.serve(self.on_connection, '127.0.0.1', 0, ssl=self.ssl_context)
+        port = self.server.sockets[0].getsockname()[1]
+        return '{}://localhost:{}'.format('wss' if self.ssl_context else 'ws', port)
+
+    async def on_connection(self, websocket, *args):
+        self.connections.append(websocket)
+        async for frame in websocket:
+            msg = JSON_CODEC.decode(frame)
+            if isinstance(msg, HelloMessage):
+                await websocket.send(json.dumps({'msgType': MessageType.HELLO.value, 'codec': JSON_CODEC.name}))
+            elif isinstance(msg, Event):
+                self.received.append(msg.value)
+
+    async def kill(self):
+        self.server.close(close_connections=False)
+        for websocket in self.connections:
+            websocket.transport.abort()
+        await self.server.wait_closed()
+
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+class TestEndpointPool(TestCase):
+
+    def test_order(self):
+        """
+        ATC-2401: Test that endpoints are tried by priority, unhealthy ones last, and the fastest one after a failover.
+        """
+        pool = EndpointPool(['ws://a', 'ws://b', 'ws://c'])
+        a, b, c = pool.get_endpoints()
+        self.assertEqual([a, b, c], pool.get_order())
+
+        # Connecting to the primary again after a failure is no failover
+        pool.report_success(a, 0.1)
+        pool.report_failure(a)
+        pool.report_success(a, 0.1)
+        self.assertEqual(0, pool.failovers)
+        self.assertIsNone(pool.get_preferred())
+
+        pool.report_failure(a)
+        pool.report_failure(a)
+        self.assertFalse(a.is_healthy())
+        self.assertEqual([b, c, a], pool.get_order())
+
+        pool.report_success(c, 0.05)
+        pool.report_failure(c)
+        pool.report_success(b, 0.2)
+        self.assertEqual(2, pool.failovers)
+        self.assertIs(c, pool.get_preferred())
+        self.assertEqual([c, b, a], pool.get_order())
+
+        # A failing preferred endpoint is no longer preferred
+        pool.report_failure(c)
+        self.assertIsNone(pool.get_preferred())
+        self.assertEqual(b, pool.get_order()[0])
+        self.assertIsNotNone(pool.recovery_time)
+
+
+class TestFailover(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_failover(self):
+        """
+        ATC-2402: Test that the Outpost fails over to the next server within half a second when its server is killed.
+        """
+        self.loop.run_until_complete(asyncio.wait_for(self.run_failover(), 10))
+
+    async def run_failover(self):
+        received = []
+        primary, secondary = StandInServer(received), StandInServer(received)
+        pool = EndpointPool([await primary.start(), await secondary.start()])
+
+        outpost = Outpost(endpoints=pool, backoff_base=0.05, backoff_cap=0.2, connect_timeout=1.0)
+        task = asyncio.ensure_future(outpost.run())
+
+        for value in range(5):
+            outpost.consume_log_message(Event(EventType.MOVEMENT, value=value))
+        await wait_for(lambda: len(received) == 5)
+        self.assertEqual([], secondary.connections)
+
+        killed = time.monotonic()
+        await primary.kill()
+        # Events sent before the Outpost notices would be lost with the connection
+        await wait_for(lambda: secondary.connections)
+        for value in range(5, 10):
+            outpost.consume_log_message(Event(EventType.MOVEMENT, value=value))
+        await wait_for(lambda: len(received) == 10)
+        time_to_recover = time.monotonic() - killed
+
+        outpost.stop()
+        await task
+        await secondary.kill()
+
+        self.assertEqual(list(range(10)), received)
+        self.assertEqual(1, len(secondary.connections))
+        self.assertLess(time_to_recover, 0.5)
+
+        statistics = outpost.get_endpoint_statistics()
+        self.assertEqual(1, statistics['failovers'])
+        self.assertEqual(pool.get_endpoints()[1].address, statistics['preferred'])
+        self.assertLess(statistics['recovery_time'], time_to_recover)
+
+    def test_tls_session_reuse(self):
+        """
+        ATC-2403: Test that reconnecting to a wss server resumes the previous TLS session.
+        """
+        self.loop.run_until_complete(asyncio.wait_for(self.run_tls_session_reuse(), 10))
+
+    async def run_tls_session_reuse(self):
+        received = []
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(CERTIFICATE)
+        server = StandInServer(received, server_context)
+        address = await server.start()
+
+        client_context = SessionReusingContext.create(cafile=CERTIFICATE)
+        outpost = Outpost(endpoints=EndpointPool([address], client_context), backoff_base=0.05, backoff_cap=0.2,
+                          connect_timeout=1.0)
+        task = asyncio.ensure_future(outpost.run())
+
+        outpost.consume_log_message(Event(EventType.MOVEMENT, value=0))
+        await wait_for(lambda: len(received) == 1)
+
+        # Drop the connection, the Outpost reconnects to the same server
+        server.connections[0].transport.abort()
+        await wait_for(lambda: len(server.connections) == 2)
+        outpost.consume_log_message(Event(EventType.MOVEMENT, value=1))
+        await wait_for(lambda: len(received) == 2)
+
+        outpost.stop()
+        await task
+        await server.kill()
+
+        self.assertEqual(2, len(server.connections))
+        self.assertEqual(2, client_context.handshakes)
+        self.assertEqual(1, client_context.resumed)
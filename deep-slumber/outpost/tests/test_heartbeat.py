@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+import asyncio
+
+import websockets
+
+from outpost.codec import JSON_CODEC
+from outpost.link import LinkStatistics
+from outpost.message import Heartbeat
+from outpost.outpost import Outpost
+
+
+class TestLinkStatistics(TestCase):
+
+    def test_rtt_and_jitter(self):
+        """
+        ATC-2301: Test that the round-trip time is averaged over the window and the jitter smoothed as in RFC 3550.
+        """
+        link = LinkStatistics(window=3)
+        self.assertIsNone(link.get_rtt())
+        for rtt in (0.1, 0.2, 0.1, 0.3):
+            link.add_rtt(rtt)
+
+        self.assertAlmostEqual(0.2, link.get_rtt())
+        jitter = 0.0
+        for difference in (0.1, 0.1, 0.2):
+            jitter += (difference - jitter) / 16
+        self.assertAlmostEqual(jitter, link.get_jitter())
+
+        link.add_queue_depth(7)
+        link.add_queue_depth(2)
+        statistics = link.as_dict()
+        self.assertEqual((2, 7), (statistics['queue'], statistics['queue_max']))
+        self.assertEqual((0.1, 0.3), (statistics['rtt_min'], statistics['rtt_max']))
+        self.assertEqual(4, statistics['answered'])
+
+
+class TestHeartbeat(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_stale_connection(self):
+        """
+        ATC-2302: Test that a connection the server stopped answering on is detected and re-established at once.
+        """
+        self.loop.run_until_complete(asyncio.wait_for(self.run_stale_connection(), 10))
+
+    async def run_stale_connection(self):
+        connections = []
+        heartbeats = []
+        released = asyncio.Event()
+
+        async def on_connection(websocket, *args):
+            connections.append(websocket)
+            first = len(connections) == 1
+            async for frame in websocket:
+                msg = JSON_CODEC.decode(frame)
+                if not isinstance(msg, Heartbeat):
+                    continue
+                heartbeats.append((len(connections), msg))
+                await websocket.send(Heartbeat(seq=msg.seq).serialize())
+                if first and msg.seq == 3:
+                    # Hang without closing, like a server behind a dropped NAT mapping.
+                    await released.wait()
+                    return
+
+        server = await websockets.serve(on_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        # A hold-off before reconnecting would exceed the test timeout.
+        outpost = Outpost(server_address='ws://127.0.0.1:{}'.format(port), backoff_base=30.0,
+                          heartbeat_interval=0.1, heartbeat_timeout=0.5)
+        task = asyncio.ensure_future(outpost.run())
+
+        while not any(connection == 2 for connection, _ in heartbeats):
+            await asyncio.sleep(0.01)
+        outpost.stop()
+        await task
+        released.set()
+        server.close()
+        await server.wait_closed()
+
+        first = [msg for connection, msg in heartbeats if connection == 1]
+        self.assertEqual([1, 2, 3], [msg.seq for msg in first])
+        self.assertIsNone(first[0].rtt)
+        self.assertIsNotNone(first[1].rtt)
+        self.assertEqual(0, first[0].queue)
+
+        statistics = outpost.get_link_statistics()
+        self.assertEqual(1, statistics['stale'])
+        self.assertGreaterEqual(statistics['answered'], 3)
+        self.assertGreater(statistics['rtt'], 0)
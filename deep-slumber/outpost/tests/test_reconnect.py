@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+import asyncio
+
+import websockets
+
+from outpost.buffer import EventBuffer
+from outpost.codec import JSON_CODEC
+from outpost.enum import ConnectionState, EventType
+from outpost.message import Event
+from outpost.outpost import Outpost
+
+
+class TestEventBuffer(TestCase):
+
+    def test_read_ack_and_overflow(self):
+        """
+        ATC-0701: Test that the buffer replays unacknowledged events after a rewind and drops the oldest when full.
+        """
+        buffer = EventBuffer(max_events=5)
+        for value in range(4):
+            buffer.append(Event(EventType.MOVEMENT, value=value))
+
+        events, sequence = buffer.read(2)
+        self.assertEqual([0, 1], [e.value for e in events])
+        buffer.ack(sequence)
+
+        events, sequence = buffer.read(10)
+        self.assertEqual([2, 3], [e.value for e in events])
+        buffer.rewind()
+
+        for value in range(4, 8):
+            buffer.append(Event(EventType.MOVEMENT, value=value))
+        events, sequence = buffer.read(10)
+        self.assertEqual([3, 4, 5, 6, 7], [e.value for e in events])
+        self.assertEqual(1, buffer.dropped)
+
+
+class TestReconnect(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def test_reconnect_after_server_restart(self):
+        """
+        ATC-0702: Test that events logged while the server is down are sent in order once it is back.
+        """
+        self.loop.run_until_complete(asyncio.wait_for(self.run_server_restart(), 20))
+
+    async def run_server_restart(self):
+        received = []
+        states = []
+
+        async def on_connection(websocket, *args):
+            async for frame in websocket:
+                msg = JSON_CODEC.decode(frame)
+                if isinstance(msg, Event):
+                    received.append(msg.value)
+
+        async def wait_for(condition):
+            while not condition():
+                await asyncio.sleep(0.01)
+
+        server = await websockets.serve(on_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        outpost = Outpost(server_address='ws://127.0.0.1:{}'.format(port), backoff_base=0.05, backoff_cap=0.2,
+                          connect_timeout=1.0)
+        outpost.add_connection_listener(states.append)
+        task = asyncio.ensure_future(outpost.run())
+
+        await wait_for(lambda: outpost.get_connection_state() == ConnectionState.CONNECTED)
+        for value in range(5):
+            outpost.consume_log_message(Event(EventType.MOVEMENT, value=value))
+        await wait_for(lambda: len(received) == 5)
+
+        # Server goes down, events keep being logged
+        server.close()
+        await server.wait_closed()
+        await wait_for(lambda: outpost.get_connection_state() != ConnectionState.CONNECTED)
+        for value in range(5, 10):
+            outpost.consume_log_message(Event(EventType.MOVEMENT, value=value))
+        await asyncio.sleep(0.3)
+
+        server = await websockets.serve(on_connection, '127.0.0.1', port)
+        await wait_for(lambda: len(received) >= 10)
+
+        outpost.stop()
+        await task
+        server.close()
+        await server.wait_closed()
+
+        self.assertEqual(list(range(10)), received)
+        self.assertEqual(ConnectionState.CONNECTED, states[1])
+        self.assertGreaterEqual(states.count(ConnectionState.CONNECTING), 3)
@@ -0,0 +1,137 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from outpost.enum import EventType
+from outpost.message import Event
+from outpost.spool import EventSpool
+
+
+class TestEventSpool(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def append_events(self, spool, values):
+        for value in values:
+            spool.append(Event(EventType.MOVEMENT, value=value))
+
+    def test_read_and_ack(self):
+        """
+        ATC-0601: Test that events are read in order and that unacknowledged events are read again after a rewind.
+        """
+        spool = EventSpool(self.directory)
+        self.append_events(spool, range(10))
+
+        events, offset = spool.read(4)
+        self.assertEqual([0, 1, 2, 3], [e.value for e in events])
+        spool.ack(offset)
+
+        events, offset = spool.read(4)
+        self.assertEqual([4, 5, 6, 7], [e.value for e in events])
+
+        # Connection lost before the events have been sent
+        spool.rewind()
+        events, offset = spool.read(100)
+        self.assertEqual(list(range(4, 10)), [e.value for e in events])
+        spool.ack(offset)
+
+        self.assertEqual(([], offset), spool.read(100))
+        self.assertEqual(0, spool.get_backlog_bytes())
+        spool.close()
+
+    def test_survives_restart(self):
+        """
+        ATC-0602: Test that unacknowledged events survive a restart and that a torn record is dropped.
+        """
+        spool = EventSpool(self.directory, sync_interval=0)
+        self.append_events(spool, range(5))
+        events, offset = spool.read(2)
+        spool.ack(offset)
+        spool.close()
+
+        # Simulate a power cut in the middle of a write.
+        segment = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))[-1]
+        with open(os.path.join(self.directory, segment), 'ab') as f:
+            f.write(b'\x10\x00\x00\x00\x00')
+
+        spool = EventSpool(self.directory)
+        events, offset = spool.read(100)
+        self.assertEqual([2, 3, 4], [e.value for e in events])
+
+        self.append_events(spool, [5])
+        events, offset = spool.read(100)
+        self.assertEqual([5], [e.value for e in events])
+        spool.close()
+
+    def test_segments_and_size_limit(self):
+        """
+        ATC-0603: Test that sent segments are removed and that the spool size is bounded.
+        """
+        spool = EventSpool(self.directory, segment_size=300, max_bytes=900)
+        self.append_events(spool, range(100))
+
+        segments = [name for name in os.listdir(self.directory) if name.endswith('.seg')]
+        self.assertLessEqual(len(segments), 5)
+        self.assertGreater(spool.dropped_bytes, 0)
+
+        # Only the most recent events are left, in order.
+        events, offset = spool.read(1000)
+        values = [e.value for e in events]
+        self.assertEqual(list(range(100 - len(values), 100)), values)
+
+        spool.ack(offset)
+        self.assertEqual(1, len([name for name in os.listdir(self.directory) if name.endswith('.seg')]))
+        spool.close()
+
+    def test_segment_removed_before_reading(self):
+        """
+        ATC-0604: Test that a segment is not removed by the size limit between listing and opening it for reading.
+        """
+        spool = EventSpool(self.directory, segment_size=100, max_bytes=300)
+        self.append_events(spool, range(10))
+        writers = []
+
+        def open_segment(path, mode='r', *args):
+            # Another thread appends enough events to drop all current segments right before the reader opens one.
+            if path.endswith(EventSpool.SEGMENT_SUFFIX) and 'r' in mode and not writers:
+                writers.append(threading.Thread(target=self.append_events, args=(spool, range(10, 40))))
+                writers[0].start()
+                writers[0].join(0.2)
+            return open(path, mode, *args)
+
+        with patch('outpost.spool.open', side_effect=open_segment, create=True):
+            events, offset = spool.read(3)
+        writers[0].join()
+        self.assertEqual([0, 1, 2], [e.value for e in events])
+
+        # The events of the dropped segments are skipped.
+        events, _ = spool.read(1000)
+        values = [e.value for e in events]
+        self.assertEqual(list(range(40 - len(values), 40)), values)
+        self.assertGreater(spool.dropped_bytes, 0)
+        spool.close()
+
+    def test_synced_without_further_appends(self):
+        """
+        ATC-0605: Test that an event appended within the sync interval is synced once the interval has passed.
+        """
+        spool = EventSpool(self.directory, sync_interval=0.1)
+        with patch('outpost.spool.os.fsync', wraps=os.fsync) as fsync:
+            self.append_events(spool, [0])
+            self.assertEqual(1, fsync.call_count)
+            # No further appends follow, e.g. because the deadband holds back readings during an outage.
+            self.append_events(spool, [1])
+            self.assertEqual(1, fsync.call_count)
+            time.sleep(0.3)
+            self.assertEqual(2, fsync.call_count)
+        spool.close()
+
@@ -0,0 +1,91 @@
+from unittest import TestCase
+
+from datetime import datetime
+import json
+
+from outpost.codec import BINARY_CODEC, JSON_CODEC
+from outpost.enum import EventType
+from outpost.message import Event, EventBatch, MovementInterval
+from outpost.timing import NS_PER_S, SEQUENCE_BITS, EventClock, create_sequence
+
+
+class FakeTime:
+
+    def __init__(self, monotonic_ns: int, wall_ns: int):
+        self.monotonic = monotonic_ns
+        self.wall = wall_ns
+
+    def advance(self, seconds: float):
+        self.monotonic += int(seconds * NS_PER_S)
+        self.wall += int(seconds * NS_PER_S)
+
+    def monotonic_ns(self) -> int:
+        return self.monotonic
+
+    def wall_ns(self) -> int:
+        return self.wall
+
+
+class TestEventClock(TestCase):
+
+    def test_stamp(self):
+        """
+        ATC-2501: Test that events are stamped in order across wall-clock steps, which apply at the next sync only.
+        """
+        fake = FakeTime(5 * NS_PER_S, 1546380000 * NS_PER_S)
+        clock = EventClock(fake.monotonic_ns, fake.wall_ns, sequence=create_sequence(fake.wall), sync_interval=60)
+
+        first = clock.stamp()
+        self.assertEqual((5 * NS_PER_S, 1546380000000, 1546380000 << SEQUENCE_BITS), first)
+
+        # NTP steps the wall clock back by an hour
+        fake.advance(0.25)
+        fake.wall -= 3600 * NS_PER_S
+        second = clock.stamp()
+        self.assertEqual(1546380000250, second[1])
+        self.assertEqual(first[2] + 1, second[2])
+        self.assertEqual(0, clock.steps)
+
+        fake.advance(60)
+        third = clock.stamp()
+        self.assertEqual(1546380060250 - 3600000, third[1])
+        self.assertEqual((2, 1), (clock.syncs, clock.steps))
+        self.assertGreater(third[2], second[2])
+        self.assertEqual(third[1], clock.to_epoch_ms(third[0]))
+
+        # Sequence numbers of a boot a second later are greater
+        self.assertGreater(next(create_sequence(1546380001 * NS_PER_S)), third[2])
+
+    def test_serialization(self):
+        """
+        ATC-2502: Test that events are serialized with epoch milliseconds and sequence numbers, and legacy ones parsed.
+        """
+        event = Event(EventType.TEMPERATURE, value=21.5)
+        event.timestamp = datetime(2019, 1, 2, 3, 4, 5, 678000)
+        payload = json.loads(event.serialize())
+        self.assertEqual((event.epoch_ms, event.seq), (payload['timestamp'], payload['seq']))
+        self.assertEqual(678, payload['timestamp'] % 1000)
+        self.assertGreater(Event().seq, event.seq)
+
+        legacy = JSON_CODEC.decode(json.dumps({
+            'msgType': 4, 'event_type': EventType.MOVEMENT_INTERVAL.value, 'timestamp': '2019-01-02 03:04:05',
+            'value': 0.5, 'duration': 1500
+        }))
+        self.assertIsInstance(legacy, MovementInterval)
+        self.assertEqual((datetime(2019, 1, 2, 3, 4, 5), 1.5, None), (legacy.timestamp, legacy.get_duration(), legacy.seq))
+
+    def test_rebuilt_events(self):
+        """
+        ATC-2505: Test that events rebuilt by decoding or expanding do not use up sequence numbers.
+        """
+        first = Event(EventType.TEMPERATURE, value=21.5)
+        interval = MovementInterval(intensity=0.5)
+        frame = BINARY_CODEC.encode(EventBatch(hwid='test', events=[first, interval]))
+        rebuilt = BINARY_CODEC.decode(frame).events + [JSON_CODEC.decode(interval.serialize())]
+        expanded = interval.expand()
+        second = Event(EventType.TEMPERATURE, value=21.5)
+
+        self.assertEqual(interval.seq + 1, second.seq)
+        self.assertEqual([first.seq, interval.seq, interval.seq], [event.seq for event in rebuilt])
+        self.assertEqual([None] * 3, [event.seq for event in expanded])
+        self.assertIsNone(Event.from_payload({'event_type': EventType.TEMPERATURE.value, 'timestamp': 0}).seq)
@@ -0,0 +1,138 @@
+"""
+Timing module.
+
+Timestamps of events. An event captures a monotonic nanosecond counter, which
+neither NTP steps nor DST changes can move, and its sequence number. The wall
+clock is read only when the offset between both clocks is synchronised, every
+minute, so wall-clock steps reach the timestamps at the next synchronisation
+at the earliest and never reorder events stamped in between.
+
+Sequence numbers are unique per device across restarts: they start at the
+boot time in seconds shifted by ``SEQUENCE_BITS``, so the server can order
+and deduplicate events of a device by them.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from datetime import datetime
+import itertools
+import threading
+import time
+from typing import Callable, Iterator, Tuple
+
+
+NS_PER_MS = 1000000
+NS_PER_S = 1000000000
+
+# Bits of the sequence number counting events within a boot
+SEQUENCE_BITS = 20
+
+
+def create_sequence(boot_ns: int = None) -> Iterator[int]:
+    """
+    :param boot_ns: {int} Wall-clock time of the boot in ns since the epoch. Defaults to now.
+    :return: {Iterator[int]} Thread-safe sequence of increasing numbers, greater than those of earlier boots.
+    """
+    boot_ns = boot_ns if boot_ns is not None else time.time_ns()
+    return itertools.count((boot_ns // NS_PER_S) << SEQUENCE_BITS)
+
+
+# Sequence shared by all event clocks of the device
+DEVICE_SEQUENCE = create_sequence()
+
+
+class EventClock:
+
+    # Time in seconds between two synchronisations of the wall-clock offset
+    SYNC_INTERVAL = 60.0
+    # Changes of the offset beyond this are counted as wall-clock steps
+    STEP_THRESHOLD = 0.1
+
+    __monotonic_ns: Callable[[], int] = None
+    __wall_ns: Callable[[], int] = None
+    __sequence: Iterator[int] = None
+    __sync_interval_ns = 0
+    __lock: threading.Lock = None
+
+    __offset_ns = 0
+    __synced_at: int = None
+
+    # Counters
+    syncs = 0
+    steps = 0
+
+    def __init__(self, monotonic_ns: Callable[[], int] = time.monotonic_ns, wall_ns: Callable[[], int] = time.time_ns,
+                 sequence: Iterator[int] = None, sync_interval: float = SYNC_INTERVAL):
+        """
+        :param monotonic_ns: {Callable[[], int]} Monotonic time source in ns.
+        :param wall_ns: {Callable[[], int]} Wall-clock time source in ns since the epoch.
+        :param sequence: {Iterator[int]} Sequence numbers of the events. Defaults to the device's sequence.
+        :param sync_interval: {float} Time in seconds between two synchronisations of the wall-clock offset.
+        """
+        self.__monotonic_ns = monotonic_ns
+        self.__wall_ns = wall_ns
+        self.__sequence = sequence if sequence is not None else DEVICE_SEQUENCE
+        self.__sync_interval_ns = int(sync_interval * NS_PER_S)
+        self.__lock = threading.Lock()
+        self.syncs = self.steps = 0
+        self.sync()
+
+    def sync(self):
+        """
+        Synchronise the offset of the wall clock to the monotonic clock.
+        """
+        with self.__lock:
+            before = self.__monotonic_ns()
+            wall = self.__wall_ns()
+            after = self.__monotonic_ns()
+            offset = wall - (before + after) // 2
+            if self.__synced_at is not None and abs(offset - self.__offset_ns) > self.STEP_THRESHOLD * NS_PER_S:
+                self.steps += 1
+            self.__offset_ns = offset
+            self.__synced_at = after
+            self.syncs += 1
+
+    def stamp(self) -> Tuple[int, int, int]:
+        """
+        :return: {Tuple[int, int, int]} Monotonic time in ns, wall-clock time in ms since the epoch and sequence number
+        of an event happening now.
+        """
+        monotonic_ns = self.__monotonic_ns()
+        if monotonic_ns - self.__synced_at >= self.__sync_interval_ns:
+            self.sync()
+        return monotonic_ns, (monotonic_ns + self.__offset_ns) // NS_PER_MS, next(self.__sequence)
+
+    def to_epoch_ms(self, monotonic_ns: int) -> int:
+        """
+        :param monotonic_ns: {int} Monotonic time in ns.
+        :return: {int} Wall-clock time in ms since the epoch, at the current offset.
+        """
+        return (monotonic_ns + self.__offset_ns) // NS_PER_MS
+
+    def get_offset(self) -> float:
+        """
+        :return: {float} Offset in seconds of the wall clock to the monotonic clock.
+        """
+        return self.__offset_ns / NS_PER_S
+
+
+def to_datetime(epoch_ms: int) -> datetime:
+    """
+    :param epoch_ms: {int} Time in ms since the epoch.
+    :return: {datetime} Local time.
+    """
+    return datetime.fromtimestamp(epoch_ms / 1000)
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """
+    :param timestamp: {datetime} Local time.
+    :return: {int} Time in ms since the epoch.
+    """
+    return int(round(timestamp.timestamp() * 1000))
+
+
+# Clock of the events not stamped by a clock of their own
+EVENT_CLOCK = EventClock()
@@ -0,0 +1,300 @@
+"""
+Decision module.
+
+Decides when to start waking between the earliest and the latest wake time.
+Movement samples are scored incrementally over rolling windows; more movement
+than usual indicates light sleep, which is the best moment to wake up.
+The estimators can be selected by name through the user settings.
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from abc import ABCMeta, abstractmethod
+from collections import deque
+import threading
+from typing import Callable, Dict, Type
+
+from orchestra.enums import SleepStage
+from orchestra.sleep import SleepStageClassifier
+
+
+class RollingWindow:
+    """
+    Sum and count of the samples of the last ``length`` seconds.
+    Adding a sample costs amortised O(1).
+    """
+
+    __length = 0.0
+    __samples: deque = None
+    __sum = 0.0
+
+    def __init__(self, length: float):
+        """
+        :param length: {float} Length of the window in seconds.
+        """
+        self.__length = length
+        self.__samples = deque()
+        self.__sum = 0.0
+
+    def add(self, t: float, value: float):
+        self.__samples.append((t, value))
+        self.__sum += value
+        self.evict(t)
+
+    def evict(self, now: float):
+        """
+        Remove the samples that have left the window.
+        :param now: {float} Current time in seconds.
+        """
+        samples = self.__samples
+        while samples and samples[0][0] <= now - self.__length:
+            self.__sum -= samples.popleft()[1]
+        if not samples:
+            # Do not let rounding errors accumulate
+            self.__sum = 0.0
+
+    def get_sum(self) -> float:
+        return self.__sum
+
+    def get_count(self) -> int:
+        return len(self.__samples)
+
+    def get_length(self) -> float:
+        return self.__length
+
+
+class WakeEstimator:
+    """
+    Scores movement samples to detect light sleep.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def add_sample(self, t: float, intensity: float):
+        """
+        :param t: {float} Monotonic time of the sample in seconds.
+        :param intensity: {float} Movement intensity of the sample.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def is_light_sleep(self, t: float) -> bool:
+        """
+        :param t: {float} Current monotonic time in seconds.
+        :return: {bool} True if this is a good moment to wake up.
+        """
+        raise NotImplementedError()
+
+
+class ImmediateEstimator(WakeEstimator):
+    """
+    Always wakes at the earliest wake time.
+    """
+
+    def add_sample(self, t: float, intensity: float):
+        pass
+
+    def is_light_sleep(self, t: float) -> bool:
+        return True
+
+
+class ActivityEstimator(WakeEstimator):
+    """
+    Light sleep if there have been a few movements within the last minutes.
+    A movement lasting several samples counts once.
+    """
+
+    __threshold = 0.0
+    __min_movements = 0
+    __movements: RollingWindow = None
+    __moving = False
+
+    def __init__(self, window: float = 10 * 60, threshold: float = 0.04, min_movements: int = 3):
+        """
+        :param window: {float} Length of the window in seconds.
+        :param threshold: {float} Minimum intensity of a movement.
+        :param min_movements: {int} Minimum number of movements within the window.
+        """
+        self.__threshold = threshold
+        self.__min_movements = min_movements
+        self.__movements = RollingWindow(window)
+
+    def add_sample(self, t: float, intensity: float):
+        moving = intensity > self.__threshold
+        if moving and not self.__moving:
+            self.__movements.add(t, 1.0)
+        self.__moving = moving
+
+    def is_light_sleep(self, t: float) -> bool:
+        self.__movements.evict(t)
+        return self.__movements.get_count() >= self.__min_movements
+
+
+class TrendEstimator(WakeEstimator):
+    """
+    Light sleep if the rate of movements of the last minutes exceeds that of the
+    last half hour by a factor, i.e. relative to the sleeper's own baseline.
+    A movement lasting several samples counts once.
+    """
+
+    __threshold = 0.0
+    __ratio = 1.0
+    __min_movements = 0
+    __short: RollingWindow = None
+    __long: RollingWindow = None
+    __moving = False
+
+    def __init__(self, short: float = 5 * 60, long: float = 30 * 60, ratio: float = 1.5,
+                 threshold: float = 0.04, min_movements: int = 2):
+        """
+        :param short: {float} Length of the recent window in seconds.
+        :param long: {float} Length of the baseline window in seconds.
+        :param ratio: {float} Factor by which the recent rate must exceed the baseline rate.
+        :param threshold: {float} Minimum intensity of a movement.
+        :param min_movements: {int} Minimum number of movements within the recent window.
+        """
+        self.__ratio = ratio
+        self.__threshold = threshold
+        self.__min_movements = min_movements
+        self.__short = RollingWindow(short)
+        self.__long = RollingWindow(long)
+
+    def add_sample(self, t: float, intensity: float):
+        moving = intensity > self.__threshold
+        if moving and not self.__moving:
+            self.__short.add(t, 1.0)
+            self.__long.add(t, 1.0)
+        self.__moving = moving
+
+    def is_light_sleep(self, t: float) -> bool:
+        self.__short.evict(t)
+        self.__long.evict(t)
+        recent = self.__short.get_count() / self.__short.get_length()
+        baseline = self.__long.get_count() / self.__long.get_length()
+        return self.__short.get_count() >= self.__min_movements and recent >= self.__ratio * baseline
+
+
+class SleepStageEstimator(WakeEstimator):
+    """
+    Light sleep if the latest epoch classified by the sleep stage classifier is not deep sleep.
+    """
+
+    __classifier: SleepStageClassifier = None
+    # Whether the classifier is fed by its owner rather than by this estimator
+    __shared = False
+
+    def __init__(self, classifier: SleepStageClassifier = None):
+        """
+        :param classifier: {SleepStageClassifier} Classifier fed by someone else, e.g. the Orchestra's, whose stages
+        are used as they are. Defaults to a classifier of its own fed with the samples.
+        """
+        self.__shared = classifier is not None
+        self.__classifier = classifier if classifier is not None else SleepStageClassifier()
+
+    def add_sample(self, t: float, intensity: float):
+        if not self.__shared:
+            self.__classifier.add_sample(t, intensity)
+
+    def is_light_sleep(self, t: float) -> bool:
+        return self.__classifier.get_stage() in (SleepStage.LIGHT, SleepStage.WAKE)
+
+
+ESTIMATORS: Dict[str, Type[WakeEstimator]] = {
+    'immediate': ImmediateEstimator,
+    'activity': ActivityEstimator,
+    'trend': TrendEstimator,
+    'stage': SleepStageEstimator,
+}
+DEFAULT_ESTIMATOR = 'trend'
+
+
+def create_estimator(name: str = None, classifier: SleepStageClassifier = None) -> WakeEstimator:
+    """
+    :param name: {str} Name of the estimator, see ``ESTIMATORS``. Unknown names select the default estimator.
+    :param classifier: {SleepStageClassifier} Classifier shared with the sleep stage estimator, see
+    ``SleepStageEstimator``.
+    :return: {WakeEstimator} New estimator.
+    """
+    estimator_class = ESTIMATORS.get(name or DEFAULT_ESTIMATOR, ESTIMATORS[DEFAULT_ESTIMATOR])
+    if estimator_class is SleepStageEstimator:
+        return SleepStageEstimator(classifier)
+    return estimator_class()
+
+
+class WakeDecisionEngine:
+    """
+    Feeds movement samples to an estimator at all times and, once the decision
+    window has been opened, starts waking as soon as the estimator detects light
+    sleep or the window is forced to close.
+    """
+
+    __estimator: WakeEstimator = None
+    __on_wake: Callable[[], None] = None
+    __lock: threading.Lock = None
+    __open = False
+
+    # Time the decision has been made at, None while undecided
+    decided_at: float = None
+    samples = 0
+
+    def __init__(self, estimator: WakeEstimator, on_wake: Callable[[], None]):
+        """
+        :param estimator: {WakeEstimator} Estimator to detect light sleep with.
+        :param on_wake: {Callable[[], None]} Called once when waking is to start.
+        """
+        self.__estimator = estimator
+        self.__on_wake = on_wake
+        self.__lock = threading.Lock()
+        self.samples = 0
+
+    def set_estimator(self, estimator: WakeEstimator):
+        with self.__lock:
+            self.__estimator = estimator
+
+    def get_estimator(self) -> WakeEstimator:
+        return self.__estimator
+
+    def is_open(self) -> bool:
+        return self.__open
+
+    def add_sample(self, t: float, intensity: float):
+        """
+        :param t: {float} Monotonic time of the sample in seconds.
+        :param intensity: {float} Movement intensity of the sample.
+        """
+        with self.__lock:
+            self.samples += 1
+            self.__estimator.add_sample(t, intensity)
+            decide = self.__open and self.__estimator.is_light_sleep(t)
+        if decide:
+            self.__decide(t)
+
+    def open(self, t: float):
+        """
+        Open the decision window, e.g. at the earliest wake time.
+        :param t: {float} Current monotonic time in seconds.
+        """
+        with self.__lock:
+            self.__open = True
+            self.decided_at = None
+            decide = self.__estimator.is_light_sleep(t)
+        if decide:
+            self.__decide(t)
+
+    def force(self, t: float):
+        """
+        Start waking now unless it has been started already, e.g. because the latest start has been reached.
+        :param t: {float} Current monotonic time in seconds.
+        """
+        self.__decide(t)
+
+    def __decide(self, t: float):
+        with self.__lock:
+            if not self.__open:
+                return
+            self.__open = False
+            self.decided_at = t
+        self.__on_wake()
@@ -0,0 +1,18 @@
+"""
+Rise N Shine enums
+"""
+
+__author__ = 'Samuel Blattner'
+__version__ = '1.0.0'
+
+
+from enum import Enum
+
+
+class RampCurve(Enum):
+    # Brightness grows linearly with time.
+    LINEAR = 0
+    # Perceived brightness grows linearly with time (gamma 2.2).
+    PERCEPTUAL = 1
+    # Slow dawn, fastest brightening halfway and a gentle approach of full brightness.
+    SUNRISE = 2
@@ -5,33 +5,66 @@ Handles waking procedures.
 """
 
 
-from threading import Thread
 from datetime import datetime, timedelta
 
+from hardware.clock import SystemClock
 from logger.logger import Logger
 from orchestra.orchestra import Orchestra
-from outpost.enum import MessageType
+from outpost.enum import CommandType, MessageType
 from outpost.interfaces import OutpostListener
-from outpost.message import AbstractMessage, Settings
+from outpost.message import AbstractMessage, Command, Settings
+from orchestra.sleep import SleepStageClassifier
+from risenshine.decision import create_estimator, DEFAULT_ESTIMATOR, WakeDecisionEngine
+from risenshine.enum import RampCurve
 from risenshine.waking import WakeTimerThread, WakeThread
 
 
 class RiseNShine(OutpostListener):
 
     DEFAULT_WAKE_DURATION_SEC = 3600
-
-    __alarm_thread: Thread = None
-    __wake_thread: Thread = None
+    # The wake ramp takes at least this long, so waking starts at the latest this long before the latest wake time.
+    MIN_WAKE_DURATION_SEC = 5 * 60
+    DECISION_ALARM = 'decision'
+    LATEST_START_ALARM = 'latest_start'
+
+    __clock = None
+    __wake_timer: WakeTimerThread = None
+    __decision_engine: WakeDecisionEngine = None
+    __estimator_name: str = DEFAULT_ESTIMATOR
+    # The Orchestra's sleep stage classifier, shared with the sleep stage estimator
+    __sleep_stage_classifier: SleepStageClassifier = None
+    __wake_thread: WakeThread = None
     __orchestra: Orchestra = None
     __logger: Logger = None
 
     __latest_wake_time: datetime = None
     __earliest_wake_time: datetime = None
     __wake_max_span: int = DEFAULT_WAKE_DURATION_SEC
+    __wake_curve: RampCurve = RampCurve.LINEAR
 
-    def __init__(self, orchestra, logger):
+    def __init__(self, orchestra, logger, wake_curve: RampCurve = RampCurve.LINEAR, clock=None):
+        """
+        :param orchestra: {Orchestra} Orchestra operating the wake light and providing the movement samples.
+        :param logger: {Logger} Logger to log waking events with.
+        :param wake_curve: {RampCurve} Curve of the wake light's brightness over time.
+        :param clock: {Clock} Clock to time waking with, on the same monotonic time as the orchestra's clock.
+        Defaults to the system clock.
+        """
         self.__orchestra = orchestra
         self.__logger = logger
+        self.__wake_curve = wake_curve
+        self.__clock = clock if clock is not None else SystemClock()
+        self.__wake_timer = WakeTimerThread(clock=self.__clock, name='WakeTimer')
+        self.__wake_timer.start()
+
+        self.__estimator_name = DEFAULT_ESTIMATOR
+        self.__sleep_stage_classifier = orchestra.get_sleep_stage_classifier() if orchestra is not None else None
+        self.__decision_engine = WakeDecisionEngine(
+            create_estimator(self.__estimator_name, self.__sleep_stage_classifier), self.__on_wake_decision)
+        if orchestra is not None:
+            orchestra.add_movement_listener(self.__decision_engine.add_sample)
+            # Someone moving about the room is up already.
+            orchestra.add_occupancy_listener(lambda start: self.abort_waking())
 
     def set_decision_time(self, latest_wake_time, earliest_wake_time=None):
         """
@@ -41,47 +74,92 @@ class RiseNShine(OutpostListener):
         :param earliest_wake_time: {datetime} Earliest wake-up time
         """
 
-        if self.__alarm_thread is not None and self.__alarm_thread.is_alive():
-            self.__alarm_thread.join()
-
         self.__earliest_wake_time = WakeTimerThread.place_waketime_ahead(earliest_wake_time)
         self.__latest_wake_time = WakeTimerThread.place_waketime_ahead(latest_wake_time)
 
+        # Replacing the alarm wakes the timer thread right away.
         if latest_wake_time is not None:
-            self.__alarm_thread = WakeTimerThread(
-                wake_time=earliest_wake_time if earliest_wake_time else latest_wake_time - timedelta(seconds=self.__wake_max_span),
-                wake_callback=self.on_decision_time
-            )
-            self.__alarm_thread.start()
+            decision_time = earliest_wake_time if earliest_wake_time else latest_wake_time - timedelta(seconds=self.__wake_max_span)
+            self.__wake_timer.set_alarm(self.DECISION_ALARM, self.on_decision_time, time_of_day=decision_time.time())
+        else:
+            self.__wake_timer.cancel_alarm(self.DECISION_ALARM)
+
+    def get_wake_timer(self) -> WakeTimerThread:
+        """
+        :return: {WakeTimerThread} Timer holding the alarms, e.g. to add nap or weekend alarms.
+        """
+        return self.__wake_timer
 
     def get_decision_time(self) -> datetime:
         return self.__earliest_wake_time if self.__earliest_wake_time else self.__latest_wake_time - timedelta(seconds=self.__wake_max_span)
 
+    def get_decision_engine(self) -> WakeDecisionEngine:
+        return self.__decision_engine
+
     def on_decision_time(self):
         """
         Called when system needs to decide when to start the waking process.
-        This is currently not yet implemented and the waking process is started immediately.
+        Waking starts as soon as the decision engine detects light sleep, at the latest
+        such that the wake ramp can still take its minimum duration.
         """
+        latest_start = max(self.get_wake_duration() - self.MIN_WAKE_DURATION_SEC, 0.0)
+        self.__wake_timer.set_alarm(
+            self.LATEST_START_ALARM, self.__on_latest_start, at=self.__clock.now() + timedelta(seconds=latest_start))
+        self.__decision_engine.open(self.__clock.monotonic())
+
+    def __on_latest_start(self):
+        self.__decision_engine.force(self.__clock.monotonic())
+
+    def __on_wake_decision(self):
+        self.__wake_timer.cancel_alarm(self.LATEST_START_ALARM)
         self.perform_waking()
-        # TODO: Implement evaluation of waking process start based on trained ML model.
+
+    def get_wake_duration(self) -> float:
+        """
+        :return: {float} Duration of the wake ramp in seconds if started now, i.e. the time until the latest wake time.
+        """
+        if self.__latest_wake_time is None:
+            return float(self.__wake_max_span)
+        now = self.__clock.now()
+        latest_wake_time = WakeTimerThread.place_waketime_ahead(self.__latest_wake_time, now)
+        return max((latest_wake_time - now).total_seconds(), float(self.MIN_WAKE_DURATION_SEC))
 
     def perform_waking(self):
         if self.__orchestra and self.__wake_thread is None or self.__wake_thread is not None and not self.__wake_thread.is_alive():
             self.__wake_thread = WakeThread(
                 wake_step_fn=self.__orchestra.set_wake_light_step,
-                duration=(self.__latest_wake_time - self.__earliest_wake_time).seconds,
-                logger=self.__logger
+                duration=self.get_wake_duration(),
+                logger=self.__logger,
+                curve=self.__wake_curve,
+                clock=self.__clock
             )
             self.__wake_thread.start()
 
+    def abort_waking(self):
+        """
+        Stop a running wake ramp, e.g. because the user is up already. Logs USER_ABORT_WAKING.
+        Called on IR activity and on the ABORT_WAKE command.
+        """
+        if self.__wake_thread is not None and self.__wake_thread.is_alive():
+            self.__wake_thread.abort()
+
     # =========================== ifOutpostListener Methods =============================
     def on_message(self, msg: AbstractMessage):
         """
         Handle incoming messages from server
         :param msg: {AbstractMessage} Message from server
+        :return: {bool} True if the message is a command that has been handled.
         """
         if msg.get_message_type() == MessageType.SETTINGS:
             self.digest_settings(msg)
+        elif isinstance(msg, Command) and msg.get_command_type() == CommandType.TRIGGER_WAKE:
+            self.__wake_timer.cancel_alarm(self.LATEST_START_ALARM)
+            self.perform_waking()
+            return True
+        elif isinstance(msg, Command) and msg.get_command_type() == CommandType.ABORT_WAKE:
+            self.abort_waking()
+            return True
+        return False
 
     def digest_settings(self, settings: Settings):
         """
@@ -89,4 +167,9 @@ class RiseNShine(OutpostListener):
         :param settings: {Settings} Settings received from the server.
         """
         self.__wake_max_span = settings.wakeMaxSpan if settings.wakeMaxSpan else self.__wake_max_span
+        estimator_name = settings.wakeOffsetEstimator if isinstance(settings.wakeOffsetEstimator, str) else None
+        estimator_name = estimator_name or DEFAULT_ESTIMATOR
+        if estimator_name != self.__estimator_name:
+            self.__estimator_name = estimator_name
+            self.__decision_engine.set_estimator(create_estimator(estimator_name, self.__sleep_stage_classifier))
         self.set_decision_time(settings.latestWakeTime, settings.earliestWakeTime)
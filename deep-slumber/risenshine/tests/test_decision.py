@@ -0,0 +1,96 @@
+from unittest import TestCase
+
+from orchestra.sleep import SleepStageClassifier
+from outpost.message import Settings
+from risenshine.decision import ActivityEstimator, create_estimator, ImmediateEstimator, SleepStageEstimator, \
+    TrendEstimator, WakeDecisionEngine
+from risenshine.risenshine import RiseNShine
+
+
+class StageOrchestra:
+    """
+    Provides the sleep stage classifier and movement samples like the Orchestra.
+    """
+
+    def __init__(self):
+        self.classifier = SleepStageClassifier()
+        self.listeners = []
+
+    def get_sleep_stage_classifier(self) -> SleepStageClassifier:
+        return self.classifier
+
+    def add_movement_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_occupancy_listener(self, listener):
+        pass
+
+
+class TestWakeDecision(TestCase):
+
+    def test_wakes_on_light_sleep(self):
+        """
+        ATC-1801: Test that waking starts on the first restless phase after the window opened, or when forced.
+        """
+        for estimator in (TrendEstimator(), ActivityEstimator()):
+            decisions = []
+            engine = WakeDecisionEngine(estimator, lambda: decisions.append(True))
+            t = 0
+            # Quiet sleep with a single movement every 10 minutes, the window opens after an hour
+            for t in range(0, 7200):
+                if t == 3600:
+                    engine.open(t)
+                engine.add_sample(t, 0.1 if t % 600 == 0 else 0.0)
+            self.assertIsNone(engine.decided_at)
+
+            # Restless phase
+            for t in range(7200, 7500):
+                engine.add_sample(t, 0.1 if t % 30 == 0 else 0.0)
+            self.assertLess(7200, engine.decided_at)
+            self.assertGreater(7500, engine.decided_at)
+            engine.force(7600)
+            self.assertEqual([True], decisions)
+
+        engine = WakeDecisionEngine(TrendEstimator(), lambda: None)
+        engine.open(0)
+        engine.force(100)
+        self.assertEqual(100, engine.decided_at)
+
+    def test_estimator_selection(self):
+        """
+        ATC-1802: Test that the estimator is selected through the settings, falling back to the default.
+        """
+        self.assertIsInstance(create_estimator('immediate'), ImmediateEstimator)
+        self.assertIsInstance(create_estimator('unknown'), TrendEstimator)
+
+        risenshine = RiseNShine(None, None)
+        settings = Settings()
+        settings.wakeOffsetEstimator = 'activity'
+        risenshine.on_message(settings)
+        self.assertIsInstance(risenshine.get_decision_engine().get_estimator(), ActivityEstimator)
+
+        settings.wakeOffsetEstimator = None
+        risenshine.on_message(settings)
+        self.assertIsInstance(risenshine.get_decision_engine().get_estimator(), TrendEstimator)
+
+    def test_shared_classifier(self):
+        """
+        ATC-1903: Test that the sleep stage estimator uses the Orchestra's classifier instead of classifying on its own.
+        """
+        orchestra = StageOrchestra()
+        risenshine = RiseNShine(orchestra, None)
+        settings = Settings()
+        settings.wakeOffsetEstimator = 'stage'
+        risenshine.on_message(settings)
+        estimator = risenshine.get_decision_engine().get_estimator()
+        self.assertIsInstance(estimator, SleepStageEstimator)
+
+        # Samples reach the estimator, but only the Orchestra feeds its classifier.
+        for t in range(0, 300):
+            orchestra.listeners[0](t, 0.6)
+        self.assertIsNone(orchestra.classifier.get_stage())
+        self.assertFalse(estimator.is_light_sleep(300))
+
+        for t in range(0, 300):
+            orchestra.classifier.add_sample(t, 0.6)
+        self.assertTrue(estimator.is_light_sleep(300))
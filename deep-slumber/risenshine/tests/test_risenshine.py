@@ -1,12 +1,41 @@
 from unittest import TestCase
 
 from datetime import datetime
+import time
 
-from outpost.message import Settings
+from hardware.simulated import SimulatedBackend
+from hardware.trace import SensorTrace
+from logger.logger import Logger
+from orchestra.orchestra import Orchestra
+from outpost.enum import CommandType, EventType
+from outpost.message import Command, Settings
 from risenshine.risenshine import RiseNShine
+from risenshine.tests.test_waking import RecordingLogger
 from risenshine.waking import WakeTimerThread
 
 
+class WakeLightOrchestra:
+    """
+    Operates the wake light and reports occupancy like the Orchestra.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.occupancy_listeners = []
+
+    def set_wake_light_step(self, step):
+        self.steps.append(step)
+
+    def add_movement_listener(self, listener):
+        pass
+
+    def add_occupancy_listener(self, listener):
+        self.occupancy_listeners.append(listener)
+
+    def get_sleep_stage_classifier(self):
+        return None
+
+
 class TestRiseNShine(TestCase):
 
     # Expected Waking Times
@@ -44,3 +73,39 @@ class TestRiseNShine(TestCase):
             self.assertEqual(exp_decision_time[0], decision_time.hour)
             self.assertEqual(exp_decision_time[1], decision_time.minute)
             self.assertEqual(exp_decision_time[2], placed_ahead_latest_wake_time.day - exp_decision_day)
+
+    def test_abort_waking(self):
+        """
+        ATC-1603: Test that a running wake ramp is aborted by the abort command and by IR activity.
+        """
+        backend = SimulatedBackend(SensorTrace.synthesize(hours=1, seed=2))
+        logger = Logger(consumers=[])
+        orchestra = Orchestra(logger=logger, backend=backend)
+        occupancies = []
+        orchestra.add_occupancy_listener(occupancies.append)
+        backend.gpio.schedule_edges(Orchestra.IR_SENSOR_PIN, ((10.0, 1), (12.0, 0)))
+        backend.run(20)
+        logger.close()
+        self.assertEqual([10.0], occupancies)
+
+        for abort in ('command', 'occupancy'):
+            orchestra = WakeLightOrchestra()
+            logger = RecordingLogger()
+            risenshine = RiseNShine(orchestra, logger)
+            self.assertTrue(risenshine.on_message(Command(CommandType.TRIGGER_WAKE)))
+            self.wait_for(lambda: orchestra.steps)
+
+            if abort == 'command':
+                self.assertTrue(risenshine.on_message(Command(CommandType.ABORT_WAKE)))
+            else:
+                for listener in orchestra.occupancy_listeners:
+                    listener(0.0)
+            self.wait_for(lambda: len(logger.events) == 2)
+            self.assertEqual([EventType.START_WAKING, EventType.USER_ABORT_WAKING], logger.events)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
@@ -0,0 +1,134 @@
+from datetime import datetime, time as time_of_day
+import os
+import threading
+import time
+from unittest import TestCase
+
+from hardware.clock import SimulationEnd, VirtualClock
+from outpost.enum import EventType
+from risenshine.enum import RampCurve
+from risenshine.waking import Alarm, WakeRamp, WakeThread, WakeTimerThread
+
+
+class RecordingLogger:
+
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(event.event_type)
+
+
+class TestWakeRamp(TestCase):
+
+    def run_ramp(self, duration, curve, abort_after=None, step_time=0.0):
+        """
+        Run a wake ramp on a virtual clock. Every update of the lights takes ``step_time`` seconds.
+        """
+        clock = VirtualClock()
+        logger = RecordingLogger()
+        steps = []
+
+        def set_step(step):
+            steps.append((clock.monotonic(), step))
+            clock.advance(step_time)
+
+        thread = WakeThread(set_step, duration, logger, curve=curve, clock=clock)
+        if abort_after is not None:
+            clock.call_later(abort_after, thread.abort)
+        thread.run()
+        return clock, thread, logger, steps
+
+    def test_drift_free_ramp(self):
+        """
+        ATC-1601: Test that every curve ends exactly on time with one update per brightness level, however slow the lights are.
+        """
+        for curve in RampCurve:
+            clock, thread, logger, steps = self.run_ramp(3600, curve, step_time=0.5)
+
+            self.assertEqual(WakeRamp.LEVELS + 1, thread.updates)
+            self.assertEqual([i / WakeRamp.LEVELS for i in range(WakeRamp.LEVELS + 1)], [step for _, step in steps])
+            self.assertAlmostEqual(3600, steps[-1][0], delta=0.5)
+            self.assertEqual([EventType.START_WAKING, EventType.END_WAKING], logger.events)
+
+        # Halfway, the perceptual ramp is darker than the linear one
+        self.assertLess(WakeRamp(3600, RampCurve.PERCEPTUAL).level_at(1800), WakeRamp(3600, RampCurve.LINEAR).level_at(1800))
+
+    def test_abort_and_zero_duration(self):
+        """
+        ATC-1602: Test that an aborted ramp stops at its current brightness and that a ramp without duration starts at full brightness.
+        """
+        clock, thread, logger, steps = self.run_ramp(3600, RampCurve.LINEAR, abort_after=900)
+        self.assertEqual(900, clock.monotonic())
+        self.assertAlmostEqual(0.25, steps[-1][1], delta=0.01)
+        self.assertEqual([EventType.START_WAKING, EventType.USER_ABORT_WAKING], logger.events)
+
+        clock, thread, logger, steps = self.run_ramp(0, RampCurve.SUNRISE)
+        self.assertEqual([(0.0, 1.0)], steps)
+
+
+class TestWakeTimer(TestCase):
+
+    def test_alarms_across_month_end(self):
+        """
+        ATC-1701: Test that weekday, weekend and one-off alarms go off in order across a month end.
+        """
+        clock = VirtualClock(start=datetime(2019, 1, 30, 22, 0), limit=5 * 86400)
+        timer = WakeTimerThread(clock=clock)
+        fired = []
+        for name, kwargs in (('weekday', dict(time_of_day=time_of_day(6, 30), weekdays=range(5))),
+                             ('weekend', dict(time_of_day=time_of_day(8, 0), weekdays=(5, 6))),
+                             ('nap', dict(at=datetime(2019, 1, 31, 14, 0)))):
+            timer.set_alarm(name, lambda name=name: fired.append((name, clock.now())), **kwargs)
+
+        with self.assertRaises(SimulationEnd):
+            timer.run()
+
+        self.assertEqual([
+            ('weekday', datetime(2019, 1, 31, 6, 30)),
+            ('nap', datetime(2019, 1, 31, 14, 0)),
+            ('weekday', datetime(2019, 2, 1, 6, 30)),
+            ('weekend', datetime(2019, 2, 2, 8, 0)),
+            ('weekend', datetime(2019, 2, 3, 8, 0)),
+            ('weekday', datetime(2019, 2, 4, 6, 30)),
+        ], fired)
+        self.assertIsNone(timer.get_next_alarm('nap'))
+        self.assertEqual(datetime(2019, 2, 1, 6, 0),
+                         WakeTimerThread.place_waketime_ahead(datetime(2019, 1, 31, 6, 0), now=datetime(2019, 1, 31, 23, 0)))
+
+    def test_dst_change(self):
+        """
+        ATC-1702: Test that a daily alarm keeps its local time across a DST change and the waiting time accounts for it.
+        """
+        previous = os.environ.get('TZ')
+        os.environ['TZ'] = 'Europe/Zurich'
+        time.tzset()
+        try:
+            now = datetime(2019, 3, 30, 7, 0)
+            due = Alarm('daily', None, time_of_day=time_of_day(6, 30)).next_due(now)
+            self.assertEqual(datetime(2019, 3, 31, 6, 30), due)
+            self.assertEqual(22.5 * 3600, WakeTimerThread.seconds_until(now, due))
+        finally:
+            if previous is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = previous
+            time.tzset()
+
+    def test_settings_change_wakes_timer(self):
+        """
+        ATC-1703: Test that replacing an alarm takes effect immediately on a sleeping timer thread.
+        """
+        timer = WakeTimerThread()
+        timer.start()
+        fired = threading.Event()
+        replaced = []
+
+        timer.set_alarm('decision', lambda: replaced.append(True), time_of_day=time_of_day(0, 0))
+        started = time.monotonic()
+        timer.set_alarm('decision', fired.set, at=datetime.now())
+        self.assertTrue(fired.wait(1))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual([], replaced)
+        timer.join(1)
+        self.assertFalse(timer.is_alive())
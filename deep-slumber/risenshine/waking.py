@@ -1,93 +1,348 @@
 from threading import Thread, Event as ThreadEvent
-from datetime import datetime
-import time
+from datetime import datetime, time, timedelta
+import heapq
+import math
+import threading
+import traceback
+from typing import Callable, Dict, Iterable, List
 
+from hardware.clock import SystemClock
 from outpost.enum import EventType
 from outpost.message import Event
+from outpost.timing import EventClock
+from risenshine.enum import RampCurve
+
+
+class Alarm:
+    """
+    Alarm of the wake timer. Either recurs daily at a time of day, optionally
+    only on some weekdays, or goes off once at a given time.
+    """
+
+    __slots__ = ('name', 'callback', 'time_of_day', 'weekdays', 'at', 'due', 'cancelled')
+
+    def __init__(self, name: str, callback: Callable[[], None], time_of_day: time = None,
+                 weekdays: Iterable[int] = None, at: datetime = None):
+        """
+        :param name: {str} Name of the alarm. Setting an alarm replaces the alarm of the same name.
+        :param callback: {Callable[[], None]} Called when the alarm goes off.
+        :param time_of_day: {time} Local time at which a recurring alarm goes off.
+        :param weekdays: {Iterable[int]} Weekdays (Monday is 0) on which a recurring alarm goes off. Every day if omitted.
+        :param at: {datetime} Time at which a one-off alarm goes off.
+        """
+        if (time_of_day is None) == (at is None):
+            raise ValueError('An alarm needs either a time of day or a time to go off at')
+        self.name = name
+        self.callback = callback
+        self.time_of_day = time_of_day
+        self.weekdays = frozenset(weekdays) if weekdays else None
+        self.at = at
+        self.due = None
+        self.cancelled = False
+
+    def next_due(self, after: datetime):
+        """
+        :param after: {datetime} Local time after which the alarm is due.
+        :return: {datetime} Next local time the alarm goes off, None if it does not go off anymore.
+        A one-off alarm is due at its time even if that has passed already.
+        """
+        if self.at is not None:
+            return self.at if self.due is None else None
+
+        # Counting in days keeps the local time of day across month ends and DST changes.
+        day = after.date()
+        for _ in range(8):
+            candidate = datetime.combine(day, self.time_of_day)
+            if candidate > after and (self.weekdays is None or candidate.weekday() in self.weekdays):
+                return candidate
+            day += timedelta(days=1)
+        return None
 
 
 class WakeTimerThread(Thread):
     """
-    Special Thread to handle waking.
+    Special Thread to handle waking. Holds any number of alarms and sleeps
+    until the earliest one is due, or until the alarms change.
     """
 
-    __abort_event: ThreadEvent
-    __wake_callback = None
-    __wake_time: datetime = None
+    # The wall clock may be set while waiting, e.g. on the first time sync after booting.
+    # Deadlines are therefore re-evaluated at least this often, in seconds.
+    MAX_WAIT = 300
+
+    __clock = None
+    __alarms: Dict[str, Alarm] = None
+    __queue: list = None
+    __sequence = 0
+    __lock: threading.Lock = None
+    __changed: ThreadEvent = None
+    __stopped = False
 
-    def __init__(self, wake_time, wake_callback, *args, **kwargs):
+    # Number of times the thread has gone to sleep
+    wakeups = 0
+
+    def __init__(self, clock=None, *args, **kwargs):
+        """
+        :param clock: {Clock} Clock to tell the time with. Defaults to the system clock.
+        """
+        kwargs.setdefault('daemon', True)
         super(WakeTimerThread, self).__init__(*args, **kwargs)
-        self.__wake_callback = wake_callback
-        self.__wake_time = wake_time
-        self.__abort_event = ThreadEvent()
-        self.__wake_time = WakeTimerThread.place_waketime_ahead(self.__wake_time)
+        self.__clock = clock if clock is not None else SystemClock()
+        self.__alarms = {}
+        self.__queue = []
+        self.__lock = threading.Lock()
+        self.__changed = ThreadEvent()
+        self.wakeups = 0
 
     @staticmethod
-    def place_waketime_ahead(waketime: datetime):
+    def place_waketime_ahead(waketime: datetime, now: datetime = None):
         """
         Re-schedule a given waking datetime in the future if it's
         before now().
         :param waketime: {datetime} Waking time to be re-scheduled.
+        :param now: {datetime} Current time. Defaults to now().
         """
         if waketime is None:
             return waketime
-        if waketime < datetime.now():
-            waketime = waketime.replace(day=datetime.now().day + 1)
+        now = now if now is not None else datetime.now()
+        if waketime < now:
+            waketime = datetime.combine(now.date(), waketime.time())
+            if waketime < now:
+                waketime += timedelta(days=1)
         return waketime
 
-    def runWakeTimer(self, wakeTime):
+    @staticmethod
+    def seconds_until(now: datetime, deadline: datetime) -> float:
         """
-        Main timer loop.
-        :param wakeTime:
+        :return: {float} Seconds from ``now`` to ``deadline``, both local times. Accounts for DST changes in between.
         """
-        while not self.__abort_event.is_set():
-            if datetime.now() > self.__wake_time:
-                self.__wake_callback()
-                self.__wake_time = WakeTimerThread.place_waketime_ahead(self.__wake_time)
-            time.sleep(1)
+        return deadline.timestamp() - now.timestamp()
+
+    def set_alarm(self, name: str, callback: Callable[[], None], time_of_day: time = None,
+                  weekdays: Iterable[int] = None, at: datetime = None) -> datetime:
+        """
+        Set an alarm, replacing the alarm of the same name. See ``Alarm`` for the parameters.
+        :return: {datetime} Time the alarm goes off next.
+        """
+        alarm = Alarm(name, callback, time_of_day, weekdays, at)
+        with self.__lock:
+            self.__remove(name)
+            self.__schedule(alarm, self.__clock.now())
+            self.__alarms[name] = alarm
+            self.__changed.set()
+        return alarm.due
+
+    def cancel_alarm(self, name: str) -> bool:
+        """
+        :return: {bool} True if there was an alarm of that name.
+        """
+        with self.__lock:
+            removed = self.__remove(name)
+            self.__changed.set()
+        return removed
+
+    def get_next_alarm(self, name: str = None):
+        """
+        :param name: {str} Name of the alarm. The earliest of all alarms if omitted.
+        :return: {datetime} Time the alarm goes off next, None if there is none.
+        """
+        with self.__lock:
+            if name is not None:
+                alarm = self.__alarms.get(name)
+                return alarm.due if alarm is not None else None
+            return min((alarm.due for alarm in self.__alarms.values()), default=None)
+
+    def __remove(self, name: str) -> bool:
+        alarm = self.__alarms.pop(name, None)
+        if alarm is None:
+            return False
+        alarm.cancelled = True
+        return True
+
+    def __schedule(self, alarm: Alarm, after: datetime):
+        alarm.due = alarm.next_due(after)
+        if alarm.due is None:
+            self.__alarms.pop(alarm.name, None)
+            return
+        self.__sequence += 1
+        heapq.heappush(self.__queue, (alarm.due, self.__sequence, alarm))
+
+    def __take_due(self, now: datetime) -> List[Alarm]:
+        due = []
+        while self.__queue and (self.__queue[0][2].cancelled or self.__queue[0][0] <= now):
+            _, _, alarm = heapq.heappop(self.__queue)
+            if alarm.cancelled:
+                continue
+            due.append(alarm)
+            self.__schedule(alarm, max(now, alarm.due))
+        return due
 
     def run(self):
-        self.runWakeTimer(self.__wake_time)
+        while not self.__stopped:
+            with self.__lock:
+                now = self.__clock.now()
+                due = self.__take_due(now)
+                timeout = None
+                if self.__queue:
+                    timeout = min(max(self.seconds_until(now, self.__queue[0][0]), 0.0), self.MAX_WAIT)
+                self.__changed.clear()
+
+            for alarm in due:
+                try:
+                    alarm.callback()
+                except Exception:
+                    traceback.print_exc()
+
+            if not due:
+                self.wakeups += 1
+                self.__clock.wait(self.__changed, timeout)
+
+    def stop(self):
+        self.__stopped = True
+        self.__changed.set()
 
     def join(self, timeout=None):
-        self.__abort_event.set()
+        self.stop()
         Thread.join(self, timeout)
 
 
+class WakeRamp:
+    """
+    Brightness of the wake light as a function of the time elapsed since the
+    start of the ramp, quantised to the levels the lights support.
+    """
+
+    LEVELS = 255
+    GAMMA = 2.2
+
+    __duration = 0.0
+    __curve: RampCurve = RampCurve.LINEAR
+
+    def __init__(self, duration: float, curve: RampCurve = RampCurve.LINEAR):
+        """
+        :param duration: {float} Duration of the ramp in seconds. Ramps of zero duration start at full brightness.
+        :param curve: {RampCurve} Curve of the brightness over time.
+        """
+        self.__duration = max(duration, 0.0)
+        self.__curve = curve
+
+    def get_duration(self) -> float:
+        return self.__duration
+
+    def brightness(self, progress: float) -> float:
+        """
+        :param progress: {float} Fraction of the ramp elapsed, between 0 and 1.
+        :return: {float} Brightness between 0 and 1.
+        """
+        if self.__curve == RampCurve.PERCEPTUAL:
+            return progress ** self.GAMMA
+        if self.__curve == RampCurve.SUNRISE:
+            return ((1.0 - math.cos(math.pi * progress)) / 2.0) ** self.GAMMA
+        return progress
+
+    def progress(self, brightness: float) -> float:
+        """
+        Inverse of ``brightness()``.
+        """
+        if self.__curve == RampCurve.PERCEPTUAL:
+            return brightness ** (1.0 / self.GAMMA)
+        if self.__curve == RampCurve.SUNRISE:
+            return math.acos(1.0 - 2.0 * brightness ** (1.0 / self.GAMMA)) / math.pi
+        return brightness
+
+    def level_at(self, elapsed: float) -> int:
+        """
+        :param elapsed: {float} Time in seconds since the start of the ramp.
+        :return: {int} Quantised brightness between 0 and ``LEVELS``.
+        """
+        if elapsed >= self.__duration:
+            return self.LEVELS
+        progress = max(elapsed, 0.0) / self.__duration
+        return min(int(self.LEVELS * self.brightness(progress) + 1e-9), self.LEVELS)
+
+    def time_of_level(self, level: int):
+        """
+        :param level: {int} Quantised brightness.
+        :return: {float} Time in seconds since the start of the ramp at which ``level`` is reached,
+        None if the level is beyond full brightness.
+        """
+        if level > self.LEVELS:
+            return None
+        return self.progress(max(level, 0) / self.LEVELS) * self.__duration
+
+
 class WakeThread(Thread):
     """
-    Special thread to run the waking process.
+    Special thread to run the waking process. The brightness is computed from the
+    time elapsed since the start, so slow updates of the lights do not delay the
+    ramp. Updates are only sent when the quantised brightness changes.
     """
 
-    __wake_step = 0.0
+    # Minimum time between two updates in seconds
+    MIN_WAIT = 0.01
+
+    __ramp: WakeRamp = None
     __wake_step_fn = None
     __logger = None
-    __duration = 0
+    __clock = None
+    __event_clock: EventClock = None
+    __abort_event: ThreadEvent = None
 
-    def __init__(self, wake_step_fn, duration, logger, *args, **kwargs):
+    # Number of brightness updates sent
+    updates = 0
+
+    def __init__(self, wake_step_fn, duration, logger, curve: RampCurve = RampCurve.LINEAR, clock=None, *args, **kwargs):
+        """
+        :param wake_step_fn: {Callable[[float], None]} Called with the brightness between 0 and 1 on every change.
+        :param duration: {float} Duration of the ramp in seconds.
+        :param logger: {Logger} Logger to log the start and end of waking with.
+        :param curve: {RampCurve} Curve of the brightness over time.
+        :param clock: {Clock} Clock to time the ramp with. Defaults to the system clock.
+        """
         self.__wake_step_fn = wake_step_fn
         self.__logger = logger
-        self.__duration = duration
+        self.__ramp = WakeRamp(duration, curve)
+        self.__clock = clock if clock is not None else SystemClock()
+        self.__event_clock = EventClock(self.__clock.monotonic_ns, self.__clock.time_ns)
+        self.__abort_event = ThreadEvent()
+        self.updates = 0
         super(WakeThread, self).__init__(*args, **kwargs)
 
+    def abort(self):
+        """
+        Stop the ramp at the current brightness, e.g. because the user is awake already.
+        """
+        self.__abort_event.set()
+
+    def is_aborted(self) -> bool:
+        return self.__abort_event.is_set()
+
     def run(self):
 
-        self.__logger.log_event(
-            Event(
-                EventType.START_WAKING
-            )
-        )
+        self.__log(EventType.START_WAKING)
 
-        step_size_per_second = 1.0 / self.__duration
+        start = self.__clock.monotonic()
+        level = None
+        while True:
+            elapsed = self.__clock.monotonic() - start
+            current_level = self.__ramp.level_at(elapsed)
+            if current_level != level:
+                level = current_level
+                self.__wake_step_fn(level / WakeRamp.LEVELS)
+                self.updates += 1
 
-        while self.__wake_step < 1.0:
-            self.__wake_step += step_size_per_second
-            self.__wake_step_fn(self.__wake_step)
+            next_change = self.__ramp.time_of_level(level + 1)
+            if next_change is None:
+                break
+            if self.__clock.wait(self.__abort_event, max(next_change - elapsed, self.MIN_WAIT)):
+                break
 
-            time.sleep(1)
+        self.__log(EventType.USER_ABORT_WAKING if self.is_aborted() else EventType.END_WAKING)
 
-        self.__logger.log_event(
-            Event(
-                EventType.END_WAKING
+    def __log(self, event_type: EventType):
+        if self.__logger is not None:
+            self.__logger.log_event(
+                Event(
+                    event_type,
+                    clock=self.__event_clock
+                )
             )
-        )